@@ -27,7 +27,9 @@ from glbl_ecsse_low_level_fns_sv import fetch_soil_metrics
 
 from hwsd_mu_globals_fns import HWSD_mu_globals_csv
 from weather_datasets import change_weather_resource
-from wthr_generation_fns import generate_all_weather, make_wthr_coords_lookup
+from wthr_generation_fns import (generate_all_weather, generate_all_scenarios, make_wthr_coords_lookup,
+                                                                                            explode_wthr_archives)
+from nc_rechunk_fns import rechunk_wthr_sets
 from set_up_logging import OutLog
 
 STD_BTN_SIZE_120 = 120
@@ -218,6 +220,54 @@ class Form(QWidget):
         w_soil_nc.clicked.connect(self.genSoilNcClicked)
         self.w_soil_nc = w_soil_nc
 
+        # weather generation options
+        # ==========================
+        irow += 1
+        lbl07 = QLabel('Weather options:')
+        lbl07.setAlignment(Qt.AlignRight)
+        grid.addWidget(lbl07, irow, 0)
+
+        w_strm_bands = QCheckBox('Stream by latitude band')
+        helpText = 'Read, join and write weather one latitude band at a time, from the start band to the end band,\n' \
+                   ' so that memory use is bounded by the size of a band rather than the size of the AOI'
+        w_strm_bands.setToolTip(helpText)
+        grid.addWidget(w_strm_bands, irow, 1, 1, 2)
+        self.w_strm_bands = w_strm_bands
+
+        w_rechunk = QPushButton('Rechunk weather')
+        helpText = 'Report chunk layout of the historic and future weather NetCDF files for the selected resource\n' \
+                   ' and write copies chunked for time series access which are then used in preference'
+        w_rechunk.setToolTip(helpText)
+        w_rechunk.setFixedWidth(STD_BTN_SIZE_120)
+        grid.addWidget(w_rechunk, irow, 3)
+        w_rechunk.clicked.connect(self.rechunkWthrClicked)
+        self.w_rechunk = w_rechunk
+
+        w_explode = QPushButton('Explode weather')
+        helpText = 'Restore the directory of met files for each weather cell of the selected project and scenario\n' \
+                   ' which has been written as a single archive - ECOSSE requires the directory layout'
+        w_explode.setToolTip(helpText)
+        w_explode.setFixedWidth(STD_BTN_SIZE_120)
+        grid.addWidget(w_explode, irow, 4)
+        w_explode.clicked.connect(self.explodeWthrClicked)
+        self.w_explode = w_explode
+
+        w_resume = QCheckBox('Resume run')
+        helpText = 'Resume an interrupted weather generation run: latitude bands and cells recorded as complete\n' \
+                   ' in the journal of the previous run are skipped'
+        w_resume.setToolTip(helpText)
+        grid.addWidget(w_resume, irow, 5)
+        self.w_resume = w_resume
+
+        w_all_wthr = QPushButton('Create all weather')
+        helpText = 'Generate weather for every GCM and SSP linked to the weather resource - historic weather\n' \
+                   ' is read once and joined to each future dataset in turn'
+        w_all_wthr.setToolTip(helpText)
+        w_all_wthr.setFixedWidth(STD_BTN_SIZE_120)
+        grid.addWidget(w_all_wthr, irow, 6)
+        w_all_wthr.clicked.connect(self.gnrtAllWthrClicked)
+        self.w_all_wthr = w_all_wthr
+
         # LH vertical box consists of png image
         # =====================================
         lh_vbox = QVBoxLayout()
@@ -314,6 +364,24 @@ class Form(QWidget):
         """
         generate_all_weather(self)
 
+    def gnrtAllWthrClicked(self):
+        """
+        generate weather for all GCMs and scenarios, reading historic weather once
+        """
+        generate_all_scenarios(self)
+
+    def rechunkWthrClicked(self):
+        """
+        write copies of weather NetCDF files chunked for time series access
+        """
+        rechunk_wthr_sets(self)
+
+    def explodeWthrClicked(self):
+        """
+        restore directory layout for weather cells written as archives
+        """
+        explode_wthr_archives(self)
+
     def genSoilCsvClicked(self):
         """
         C
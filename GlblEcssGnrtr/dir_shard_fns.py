@@ -0,0 +1,67 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        dir_shard_fns.py
+# Purpose:     sharded layout of weather cell and simulation directories by block of granular latitude
+#              so that no one directory holds hundreds of thousands of entries
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+__prog__ = 'dir_shard_fns.py'
+__version__ = '0.0.1'
+__author__ = 's03mm5'
+
+from os.path import join, isdir
+from os import scandir
+
+SHARD_PREFIX = 'glat'       # shard names e.g. glat04320 holds cells with gran_lat 4320 to 4320 + shard_size - 1
+SHARD_NAME_LEN = len(SHARD_PREFIX) + 5
+
+def shard_name(gran_lat, shard_size):
+    """
+    name of shard directory for a granular latitude
+    """
+    return SHARD_PREFIX + '{:0=5d}'.format((int(gran_lat)//shard_size)*shard_size)
+
+def is_shard_name(name):
+    """
+    C
+    """
+    return len(name) == SHARD_NAME_LEN and name.startswith(SHARD_PREFIX) and name[len(SHARD_PREFIX):].isdigit()
+
+def cell_rel_dir(gran_coord, shard_size=0):
+    """
+    path of a weather cell directory relative to the scenario directory e.g. glat04320/04325_22080
+    if shard_size is zero or less then the layout is flat i.e. the cell directory sits in the scenario directory
+    """
+    if shard_size is None or shard_size <= 0:
+        return gran_coord
+
+    return join(shard_name(gran_coord.split('_')[0], shard_size), gran_coord)
+
+def sim_rel_dir(identifer, gran_lat, shard_size=0):
+    """
+    path of a simulation directory relative to the study directory
+    """
+    if shard_size is None or shard_size <= 0:
+        return identifer
+
+    return join(shard_name(gran_lat, shard_size), identifer)
+
+def cell_parent_dirs(root_dir):
+    """
+    return directories which may directly hold cells: the root directory itself, for the flat layout,
+    followed by any shard directories - the layout is detected so that either may be read regardless of settings
+    """
+    if not isdir(root_dir):
+        return []
+
+    parent_dirs = [root_dir]
+    with scandir(root_dir) as entries:
+        for entry in entries:
+            if entry.is_dir() and is_shard_name(entry.name):
+                parent_dirs.append(entry.path)
+
+    return sorted(parent_dirs)
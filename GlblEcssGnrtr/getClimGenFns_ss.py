@@ -11,57 +11,57 @@
 __prog__ = 'getClimGenFns.py'
 __author__ = 's03mm5'
 
-from numpy.ma.core import MaskedConstant, MaskError
+from numpy import flatnonzero, asarray, argsort, zeros, ma
 from netCDF4 import Dataset
-from warnings import filterwarnings
+from warnings import filterwarnings, catch_warnings
 from PyQt5.QtWidgets import QApplication
 
+from gridded_weather import WthrTimeline
+from wthr_grid_align import fetch_grid_alignment
+
 GRANULARITY = 120
+BLOCK_ROWS = 16     # maximum extent of hyperslabs read by fetch_WrldClim_data_batch
+BLOCK_COLS = 128
 
 ERROR_STR = '*** Error *** '
 WARNING = '*** Warning *** '
 
-def join_hist_fut_to_all_wthr(climgen, pettmp_hist, pettmp_fut):
+def join_hist_fut_to_all_wthr(climgen, wthr_hist, wthr_fut):
     """
-    join historic and future weather
+    join historic and future weather, both GriddedWeather objects, to create a WthrTimeline comprising historic
+    cells which are also present in the future weather - the timeline references, rather than copies, the weather
+    historic months from the start year of the future weather onwards are discarded
+    cells are paired using the alignment of the two dataset grids, built once per pair of weather sets
      """
-    fut_yr_strt = climgen.fut_wthr_set_defn['year_start']
-    hist_yr_end = climgen.hist_wthr_set_defn['year_end']
-    overlap_yrs = hist_yr_end - fut_yr_strt + 1
-    if overlap_yrs < 0:
+    indx_hist_end = (wthr_fut.year_start - wthr_hist.year_start)*12
+    if indx_hist_end > wthr_hist.nmnths or indx_hist_end < 0:
         mess = ERROR_STR + 'historic and future weather datasets are not contiguous or do not overlap'
         print(mess + '  - cannot proceed')
         QApplication.processEvents()
         return
 
-    indx_hist_abbrev = overlap_yrs*12
-
-    pettmp_all = {}
-    for metric in pettmp_fut:
-        pettmp_all[metric] = {}
-
-    for gran_coord in pettmp_hist['precipitation']:
-
-        if gran_coord not in pettmp_fut['precipitation']:
-            lat, lon = pettmp_hist['lat_lons'][gran_coord]
-            mess = WARNING + 'granular coordinate {} with lat: {}\tlong: {}'.format(gran_coord, lat, lon)
-            print(mess + ' not present in future weather')
-            QApplication.processEvents()
-            continue
-
-        for metric in pettmp_hist:
-            if metric == 'lat_lons':
-                continue
-
-            if pettmp_hist[metric][gran_coord] is None:
-                continue
-
-            hist_seg = pettmp_hist[metric][gran_coord][:-indx_hist_abbrev]
-            fut_seg = pettmp_fut[metric][gran_coord][:]
-
-            pettmp_all[metric][gran_coord] = hist_seg + fut_seg
+    # pair cells by array indexing, cells without a valid counterpart are masked
+    # ==========================================================================
+    if climgen is None:
+        cell_map = wthr_fut.cell_indices(wthr_hist.cell_keys(valid_only=False))
+    else:
+        alignment = fetch_grid_alignment(climgen.hist_wthr_set_defn, climgen.fut_wthr_set_defn)
+        cell_map = alignment.cell_map(wthr_hist, wthr_fut)
+
+    matched = wthr_hist.valid & (cell_map >= 0)
+    indices_hist = flatnonzero(matched)
+    indices_fut = cell_map[indices_hist]
+
+    # report numbers of unmatched cells rather than each cell
+    # =======================================================
+    num_not_in_fut = int(wthr_hist.valid.sum()) - len(indices_hist)
+    num_not_in_hist = int(wthr_fut.valid.sum()) - len(indices_fut)
+    if num_not_in_fut > 0 or num_not_in_hist > 0:
+        print(WARNING + '{} historic cells not present in future weather and {} future cells not present in '
+                                                    'historic weather'.format(num_not_in_fut, num_not_in_hist))
+        QApplication.processEvents()
 
-    return pettmp_all
+    return WthrTimeline(wthr_hist, wthr_fut, indx_hist_end, indices_hist, indices_fut)
 
 def fetch_wthr_dset_overlap(wthr_set1, wthr_set2):
     """
@@ -149,6 +149,8 @@ def _apply_start_year_correction(sim_strt_yr, hist_dset_defn, pettmp):
 def _fetch_wthrset_indices(wthr_set_defn, sim_strt_yr, sim_end_yr):
     """
     get indices for simulation years for monthly weather set
+    returns start month index, end month index for use in a slice, None signifying to the end of the dataset,
+    and the start year for the following dataset, -1 if not required
     """
     wthr_yr_strt = wthr_set_defn['year_start']
     wthr_yr_end = wthr_set_defn['year_end']
@@ -160,7 +162,7 @@ def _fetch_wthrset_indices(wthr_set_defn, sim_strt_yr, sim_end_yr):
 
     # simulation start year is after end of this dataset - nothing to do
     # ===================================================================
-    if wthr_yr_strt > sim_end_yr:
+    if sim_strt_yr > wthr_yr_end:
         return 3 * [None]
 
     indx_strt = max(0, (sim_strt_yr - wthr_yr_strt)*12)
@@ -169,12 +171,12 @@ def _fetch_wthrset_indices(wthr_set_defn, sim_strt_yr, sim_end_yr):
 
         # simulation end year is in future and beyond this dataset end year
         # =================================================================
-        indx_end = -1
+        indx_end = None
         next_strt_yr = wthr_yr_end + 1
     else:
         # simulation end year is before this dataset end year
         # ===================================================
-        indx_end = (sim_end_yr - wthr_yr_end)*12
+        indx_end = (sim_end_yr - wthr_yr_strt + 1)*12
         next_strt_yr = -1
 
     return indx_strt, indx_end, next_strt_yr
@@ -194,34 +196,76 @@ def open_wthr_NC_sets(climgen):
 
 def fetch_WrldClim_data(lgr, lat, lon, climgen, nc_dsets, lat_indx, lon_indx, hist_flag=False):
     """
-    C
+    single site version of fetch_WrldClim_data_batch - returns dictionary of lists or None if there is no data
+    """
+    pettmp_sites, valid = fetch_WrldClim_data_batch(lgr, [lat], [lon], climgen, nc_dsets, [lat_indx], [lon_indx],
+                                                                                                        hist_flag)
+    if pettmp_sites is None or not valid[0]:
+        return None
+
+    return {metric: pettmp_sites[metric][0].tolist() for metric in pettmp_sites}
+
+def _site_blocks(lat_indices, lon_indices, block_rows=BLOCK_ROWS, block_cols=BLOCK_COLS):
+    """
+    group sites into fixed blocks of block_rows latitude rows by block_cols longitude columns
+    returns list of site numbers for each occupied block ordered by latitude then longitude
     """
-    filterwarnings("error")
-
-    pettmp = {}
-    for metric in list(['precip', 'tas']):
-        if hist_flag:
-            varname = climgen.hist_wthr_set_defn[metric]
-            try:
-                slice = nc_dsets[metric].variables[varname][:, lat_indx, lon_indx]
-            except BaseException as err:
-                print(ERROR_STR + str(err))
-                return None
-        else:
-            varname = climgen.fut_wthr_set_defn[metric]
-            slice = nc_dsets[metric].variables[varname][:, lat_indx, lon_indx]
-
-        # test to see if cell data is valid, if not then this location is probably sea
-        # =============================================================================
-        if type(slice[0]) is MaskedConstant:
-            pettmp = None
-            mess = 'No data at lat: {} {}\tlon: {} {}\thist_flag: {}'.format(lat, lat_indx, lon, lon_indx, hist_flag)
-            lgr.info(mess)
-            print(mess)
-        else:
-            pettmp[metric] = [float(val) for val in slice]
-
-    return pettmp
+    blocks = {}
+    for isite in argsort(lat_indices*(max(lon_indices, default=0) + 1) + lon_indices, kind='stable'):
+        block_key = (lat_indices[isite]//block_rows, lon_indices[isite]//block_cols)
+        blocks.setdefault(block_key, []).append(isite)
+
+    return [blocks[block_key] for block_key in sorted(blocks)]
+
+def fetch_WrldClim_data_batch(lgr, lats, lons, climgen, nc_dsets, lat_indices, lon_indices, hist_flag=False):
+    """
+    fetch monthly series for many sites using open datasets from open_wthr_NC_sets and indices from
+    get_wthr_nc_coords - sites are grouped into blocks of rows and columns, each read as one hyperslab
+    returns dictionary of arrays shaped [site, month] and validity flags - sites with no data e.g. sea or with
+    indices of -1 are flagged invalid and their values are undefined
+    """
+    lat_indices = asarray(lat_indices, dtype=int)
+    lon_indices = asarray(lon_indices, dtype=int)
+    nsites = len(lat_indices)
+    valid = (lat_indices >= 0) & (lon_indices >= 0)
+    indices_ok = flatnonzero(valid)
+
+    if hist_flag:
+        wthr_set_defn = climgen.hist_wthr_set_defn
+    else:
+        wthr_set_defn = climgen.fut_wthr_set_defn
+
+    pettmp_sites = {}
+    with catch_warnings():
+        filterwarnings('error')
+        for metric in list(['precip', 'tas']):
+            var = nc_dsets[metric].variables[wthr_set_defn[metric]]
+            pettmp_sites[metric] = zeros((nsites, var.shape[0]))
+            for block in _site_blocks(lat_indices[indices_ok], lon_indices[indices_ok]):
+                isites = indices_ok[block]
+                lat_min, lat_max = lat_indices[isites].min(), lat_indices[isites].max()
+                lon_min, lon_max = lon_indices[isites].min(), lon_indices[isites].max()
+                try:
+                    vals = var[:, lat_min:lat_max + 1, lon_min:lon_max + 1]
+                except BaseException as err:
+                    print(ERROR_STR + str(err))
+                    if hist_flag:
+                        return None, None
+                    raise
+
+                vals_sites = vals[:, lat_indices[isites] - lat_min, lon_indices[isites] - lon_min]
+                valid[isites] &= ~ma.getmaskarray(vals_sites)[0]
+                pettmp_sites[metric][isites] = ma.getdata(vals_sites).T
+
+    # test to see if cell data is valid, if not then this location is probably sea
+    # =============================================================================
+    for isite in flatnonzero(~valid):
+        mess = 'No data at lat: {} {}\tlon: {} {}\thist_flag: {}'.format(lats[isite], lat_indices[isite],
+                                                                    lons[isite], lon_indices[isite], hist_flag)
+        lgr.info(mess)
+        print(mess)
+
+    return pettmp_sites, valid
 
 def get_wthr_nc_coords(dset_defn, latitude, longitude):
     """
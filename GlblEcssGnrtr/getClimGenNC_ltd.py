@@ -15,19 +15,18 @@ __author__ = 's03mm5'
 #
 from os.path import normpath, isfile, join, split, isdir
 from os import makedirs
-from calendar import monthrange
-from netCDF4 import Dataset
 from math import ceil
 from numpy import arange, seterr, ma
-from time import time
-import warnings
 import csv
 from pandas import read_csv
 from PyQt5.QtWidgets import QApplication
 
-from prepare_ecosse_files import update_progress
-from getClimGenFns import fetch_days_per_month
-from thornthwaite import thornthwaite
+from thornthwaite_batch import thornthwaite_batch
+from wthr_nc_extract import WthrDsetDescr, fetch_gridded_weather
+from wthr_tile_cache import open_tile_cache
+from getClimGenFns_ss import _fetch_wthrset_indices
+from wthr_cell_index import load_cell_index
+from wthr_coords_lookup import COORDS_BIN_FN, read_coords_lookup, sync_coords_lookup, coords_lookup_dict
 
 null_value = -9999
 set_spacer_len = 12
@@ -41,36 +40,6 @@ weather_resource_permitted = list(['CRU', 'EObs', 'EWEMBI'])
 WARNING = '*** Warning *** '
 ERROR_STR = '*** Error *** '
 
-def _consistency_check(pettmp, varnams_mapped):
-    """
-    make sure for a each key if one metric is zero length then all other metrics for that key are also blank
-    TODO: this function only works for two metrics and is unpythonic!
-    """
-    metric_list = list(varnams_mapped.values())
-    metric0 = metric_list[0]
-    metric1 = metric_list[1]
-    for key in pettmp[metric0]:
-        len_key0 = len(pettmp[metric0][key])
-
-        if len_key0 == 0:
-            pettmp[metric1][key] = []
-
-        len_key1 = len(pettmp[metric1][key])
-        if len_key1 == 0:
-            pettmp[metric0][key] = []
-
-    return pettmp
-
-def _check_list_for_none(metric_list):
-    """
-    if a None is found then return an empty list
-    """
-    for indx, val in enumerate(metric_list):
-        if val is None:
-            return []
-
-    return metric_list
-
 def _input_txt_line_layout(data, comment):
     """
     C
@@ -83,7 +52,7 @@ class ClimGenNC(object,):
     """
     C
     """
-    def __init__(self, form, fut_clim_scen=None):
+    def __init__(self, form, fut_clim_scen=None, fut_wthr_set_nm=None):
 
         func_name =  __prog__ +  ' ClimGenNC __init__'
 
@@ -99,6 +68,8 @@ class ClimGenNC(object,):
         wthr_rsrce = form.combo10w.currentText()
         dset_hist = form.weather_set_linkages[wthr_rsrce][0]
         dset_fut = form.weather_set_linkages[wthr_rsrce][1]
+        if fut_wthr_set_nm is not None:
+            dset_fut = fut_wthr_set_nm      # a specific future dataset e.g. one GCM and SSP of a batch run
 
         if fut_clim_scen is None:
             fut_clim_scen = form.combo10.currentText()
@@ -113,7 +84,10 @@ class ClimGenNC(object,):
         self.wthr_out_dir = wthr_out_dir
 
         self.coords_lookup = None
+        self.coords_index = None
         self.sim_mnthly_flag = sim_mnthly_flag
+        self.tile_cache = open_tile_cache(form.settings)     # None unless wthr_cache_dir is set
+        self.shard_size = form.settings.get('shard_size', 0)    # cell directories are sharded by gran_lat if > 0
 
         # African Monsoon Multidisciplinary Analysis (AMMA) 2050 datasets
         # ===============================================================
@@ -137,7 +111,7 @@ class ClimGenNC(object,):
             lat = 'latitude'
             lon = 'longitude'
         elif wthr_rsrce == 'CRU':
-            wthr_set_key = 'ClimGen_' + fut_clim_scen
+            wthr_set_key = 'ClimGen_' + fut_clim_scen if fut_wthr_set_nm is None else fut_wthr_set_nm
             if wthr_set_key not in form.weather_sets:
                 print('key {} not in weather sets in function {} - cannot continue'.format(wthr_set_key, func_name))
                 return
@@ -146,7 +120,7 @@ class ClimGenNC(object,):
             lat = 'latitude'
             lon = 'longitude'
         elif wthr_rsrce == 'EFISCEN-ISIMIP':
-            wthr_set_key = 'EFISCEN-ISIMIP_' + fut_clim_scen
+            wthr_set_key = 'EFISCEN-ISIMIP_' + fut_clim_scen if fut_wthr_set_nm is None else fut_wthr_set_nm
             if wthr_set_key not in form.weather_sets:
                 print('key {} not in weather sets in function {} - cannot continue'.format(wthr_set_key, func_name))
                 return
@@ -225,16 +199,24 @@ class ClimGenNC(object,):
         """
         lookup_flag = False
         if isdir(self.wthr_out_dir):
-            lookup_fn = join(self.wthr_out_dir, 'coords_lookup.csv')
-            if isfile(lookup_fn):
-                df = read_csv(lookup_fn, sep='\t')
-                coords_lookup = df.to_dict('list')
+            sync_coords_lookup(self.wthr_out_dir)       # binary lookup may lack cells of the tab separated file
+            recs = read_coords_lookup(self.wthr_out_dir)
+            lookup_fn = join(self.wthr_out_dir, COORDS_BIN_FN)
+            if recs is not None:
+                coords_lookup = coords_lookup_dict(recs)
                 lookup_flag = True
+            else:
+                lookup_fn = join(self.wthr_out_dir, 'coords_lookup.csv')    # weather generated by earlier versions
+                if isfile(lookup_fn):
+                    df = read_csv(lookup_fn, sep='\t')
+                    coords_lookup = df.to_dict('list')
+                    lookup_flag = True
 
         if lookup_flag:
             self.coords_lookup = coords_lookup
             ncoords = len(coords_lookup['gran_coord'])
             print('coords lookup file {} has {} records'.format(lookup_fn, ncoords))
+            self.coords_index = load_cell_index(self.wthr_out_dir, coords_lookup)
         else:
             print(WARNING + 'no coords lookup file found - cannot proceed')
 
@@ -313,574 +295,118 @@ class ClimGenNC(object,):
         aoi_indices_hist = lat_indices_hist + lon_indices_hist
         return aoi_indices_fut, aoi_indices_hist
 
-    def fetch_isimip_NC_data(self, aoi_indices, dset_strt_yr, nmnths, max_cells=MAX_CELLS):
-        """
-        fetch precipitation - units: kg m-2 s-1, and temperature - units: Kelvin, for a given lat/long AOI
-            for ISIMAP precipitation - convert kg m-2 s-1 to mm month-1
-            1 kg water = 1000 mm-3      1 m-2 = 1 million mm-2 so 1 kg m-2 = 1000 / 1000000  = 0.001 mm
-            so to convert to mm day-1 = 0.001 * NUMSECSDAY = 86.4
-        """
-        cnvrt_isimip_pr = 1.0 * NUMSECSDAY
-
-        # warnings.simplefilter('default')
-        lat_indx_min, lat_indx_max, lon_indx_min, lon_indx_max = aoi_indices
-
-        # read all times
-        # ==============
-        days_per_month = fetch_days_per_month(dset_strt_yr, nmnths)
-        varnams_mapped = {'pr':'precipitation','tas':'temperature'}
-        varnams = sorted(varnams_mapped.keys())
-
-        icount = 0
-        pettmp = {}
-        pettmp['lat_lons'] = {}
-        for varname, fname in zip(varnams, list([self.fut_precip_fname, self.fut_tas_fname])):
-            num_key_masked = 0
-            varnam_map = varnams_mapped[varname]
-            pettmp[varnam_map] = {}
-            nc_dset = Dataset(fname, mode='r')
-
-            # collect readings for all time values
-            # ====================================
-            slice = nc_dset.variables[varname][:, lat_indx_min:lat_indx_max + 1, lon_indx_min:lon_indx_max + 1]
-
-            if ma.is_masked(slice):
-                slice_is_masked_flag = True
-                self.lgr.info('Future slice is masked')
-            else:
-                slice_is_masked_flag = False
-
-            # reform slice
-            # ============
-            for ilat, lat_indx in enumerate(range(lat_indx_min, lat_indx_max + 1)):
-                lat = self.latitudes[lat_indx]
-                gran_lat = round((90.0 - lat)*GRANULARITY)
-
-                for ilon, lon_indx in enumerate(range(lon_indx_min, lon_indx_max + 1)):
-                    lon = self.longitudes[lon_indx]
-                    gran_lon = round((180.0 + lon)*GRANULARITY)
-                    key = '{:0=5d}_{:0=5d}'.format(int(gran_lat), int(gran_lon))
-
-                    # validate values
-                    # ===============
-                    pettmp[varnam_map][key] = null_value
-                    if slice_is_masked_flag :
-                        val = slice[0, ilat, ilon]
-                        if val is ma.masked:
-                            self.lgr.info('val is ma.masked for key ' + key)
-                            pettmp[varnam_map][key] = None
-                            num_key_masked += 1
-
-                    # add data for this coordinate
-                    # ============================
-                    if pettmp[varnam_map][key] == null_value:
-                        if varname == 'tas':
-                            pettmp[varnam_map][key] = [round(float(val) - 273.15, 2) for val in slice[:, ilat, ilon]]
-                        else:
-                            # precipitation - convert kg m-2 s-1 to mm month-1
-                            # ================================================
-                            # pettmp[varnam_map][key] =  = [round(val * ndays * cnvrt_isimip_pr, 1) for val, ndays in
-                            #                                                zip(slice[:, ilat, ilon], days_per_month)]
-                            pettmp[varnam_map][key] = []
-                            for val, ndays in zip(slice[:, ilat, ilon], days_per_month):
-                                # val_mm = round(val * ndays * cnvrt_isimip_pr, 3)
-                                val_mm = round(val * cnvrt_isimip_pr, 2)
-                                pettmp[varnam_map][key].append(val_mm)
-
-                    pettmp['lat_lons'][key] = [lat, lon]
-                    icount += 1
-                    if icount >= max_cells:
-                        break
-
-                if icount >= max_cells:
-                    break
-
-            nc_dset.close()     # close netCDF file
-            if num_key_masked > 0:
-                print('# masked weather keys: {}'.format(num_key_masked))
-                QApplication.processEvents()
-
-        return pettmp
-
-    def fetch_ewembi_NC_data(self, aoi_indices, num_band, future_flag = True):
+    def _sim_mnth_window(self, wthr_set_defn, future_flag):
         """
-        get precipitation or temperature data for a given variable and lat/long index for all times
-        CRU uses NETCDF4 format
+        return window of month indices of the dataset covering the years required for the simulation, or None
+        when the whole time dimension is required - historic weather is only required up to the future start year
         """
-        func_name = __prog__ +  ' fetch_fut_future_NC_data'
-        warnings.simplefilter('default')
-
-        num_key_masked = 0
-        lat_indx_min, lat_indx_max, lon_indx_min, lon_indx_max = aoi_indices
-        pettmp = {}
-
-        weather_resource = self.weather_resource
         if future_flag:
-            precip_fname = self.fut_precip_fname
-            tas_fname = self.fut_tas_fname
-            start_year = self.sim_start_year
+            strt_yr, end_yr = self.sim_start_year, self.sim_end_year
         else:
-            precip_fname = self.hist_precip_fname
-            tas_fname = self.hist_tas_fname
-            start_year = self.hist_start_year
+            strt_yr, end_yr = self.hist_start_year, self.hist_end_year
+            if self.sim_start_year > strt_yr:
+                end_yr = min(end_yr, self.sim_start_year - 1)
+
+        indx_strt, indx_end, next_strt_yr = _fetch_wthrset_indices(wthr_set_defn, strt_yr, end_yr)
+        if indx_strt is None:
+            print(WARNING + 'years {} to {} lie outwith weather set years {} to {} - will read all months'
+                            .format(strt_yr, end_yr, wthr_set_defn['year_start'], wthr_set_defn['year_end']))
+            return None
 
-        varnams_mapped = {'pr': 'precipitation', 'tas': 'temperature'}
-        varnams = sorted(varnams_mapped.keys())
+        if indx_strt == 0 and indx_end is None:
+            return None
 
-        for varname, fname in zip(varnams, list([precip_fname, tas_fname])):
-            varnam_map = varnams_mapped[varname]
-            pettmp[varnam_map] = {}
-            nc_dset = Dataset(fname)
+        return indx_strt, indx_end
 
-            # collect readings for all time values
-            # ====================================
-            slice = nc_dset.variables[varname][:, lat_indx_min:lat_indx_max + 1, lon_indx_min:lon_indx_max + 1]
+    def _fetch_gridded(self, wthr_set_defn, dset_kind, aoi_indices, num_band, future_flag, max_cells=MAX_CELLS,
+                                                                                        year_start=None, mnth_strt=0):
+        """
+        extract weather for the months required by the simulation using the common extraction engine
+        and report masked cells
+        """
+        descr = WthrDsetDescr(wthr_set_defn, dset_kind, year_start)
 
-            if ma.isMaskedArray(slice):
-                slice_is_masked_flag = True
-                self.lgr.info('Future slice is a masked array in band {}'.format(num_band))
+        mnth_window = self._sim_mnth_window(wthr_set_defn, future_flag)
+        if mnth_strt > 0:
+            if mnth_window is None:
+                mnth_window = (mnth_strt, None)
             else:
-                slice_is_masked_flag = False
-
-            # generate days per month
-            # ======================
-            if varname == 'pr':
-                days_per_month = []
-                nmonths = len(nc_dset.variables[varname])
-                for year in range(start_year, start_year + int(nmonths/12) + 1):
-                    for imnth in range(12):
-                        dummy, ndays = monthrange(year, imnth + 1)
-                        days_per_month.append(ndays)
-
-            # reform slice
-            # ============
-            for ilat, lat_indx in enumerate(range(lat_indx_min, lat_indx_max + 1)):
-                gran_lat = round((90.0 - self.latitudes[lat_indx])*GRANULARITY)
-
-                for ilon, lon_indx in enumerate(range(lon_indx_min, lon_indx_max + 1)):
-                    gran_lon = round((180.0 + self.longitudes[lon_indx])*GRANULARITY)
-                    key = '{:0=5d}_{:0=5d}'.format(int(gran_lat), int(gran_lon))
-
-                    # validate values
-                    # ===============
-                    pettmp[varnam_map][key] = null_value
-                    if slice_is_masked_flag :
-                        val = slice[0,ilat,ilon]
-                        if val is ma.masked:
-                            self.lgr.info('val is ma.masked for key ' + key)
-                            pettmp[varnam_map][key] = None
-                            num_key_masked += 1
-
-                    # add data for this coordinate
-                    # ============================
-                    if pettmp[varnam_map][key] == null_value:
-                        if varname == 'pr':
-                            pettmp[varnam_map][key] = [round(val*ndays*NUMSECSDAY, 1) for val, ndays in
-                                                                                zip(slice[:,ilat,ilon], days_per_month)]
-                        elif varname == 'tas':
-
-                            # risk of masked constant
-                            # =======================
-                            try:
-                                pettmp[varnam_map][key] = [round(float(val) - 273.15, 1) for val in slice[:,ilat,ilon]]
-                            except UserWarning as e:
-                                print('{}\n\tLatitude:{}\tLongitude {}'
-                                      .format(e, self.latitudes[lat_indx], self.longitudes[lon_indx]))
-
-            # close netCDF file
-            nc_dset.close()
+                mnth_window = (max(mnth_strt, mnth_window[0]), mnth_window[1])
+
+        wthr = fetch_gridded_weather(descr, aoi_indices, max_cells, mnth_window, self.tile_cache)
+
+        num_key_masked = wthr.num_masked()
+        if num_key_masked > 0:
+            self.lgr.info('Weather slice is masked in band {}'.format(num_band))
             print('# masked weather keys: {}'.format(num_key_masked))
+            QApplication.processEvents()
 
-        return pettmp
+        return wthr
 
-    def fetch_eobs_NC_data(self, aoi_indices, num_band, future_flag = True):
+    def _wthr_set_defn(self, future_flag):
         """
-        get precipitation or temperature data for a given variable and lat/long index for all times
-        EObs uses NETCDF format
+        C
         """
-        func_name = __prog__ +  ' fetch_eobs_NC_data'
-        warnings.simplefilter('default')
-
-        lat_indx_min, lat_indx_max, lon_indx_min, lon_indx_max = aoi_indices
-        pettmp = {}
-        if future_flag == True:
-            precip_fname = self.fut_precip_fname
-            temper_fname = self.fut_tas_fname
+        if future_flag:
+            return self.fut_wthr_set_defn
         else:
-            precip_fname = self.hist_precip_fname
-            temper_fname = self.hist_tas_fname
+            return self.hist_wthr_set_defn
 
-        # process future climate
-        # ======================
-        varnams_mapped = {'rr':'precipitation','tg':'temperature'}
-        varnams = sorted(varnams_mapped.keys())
-
-        for varname, fname in zip(varnams, list([precip_fname, temper_fname])):
-            varnam_map = varnams_mapped[varname]
-            pettmp[varnam_map] = {}
-            nc_dset = Dataset(fname, mode='r')
-
-            # collect readings for all time values
-            # ====================================
-            try:
-                slice = nc_dset.variables[varname][:, lat_indx_min:lat_indx_max + 1, lon_indx_min:lon_indx_max + 1]
-            except RuntimeWarning as e:
-                print(e)
-
-            if ma.is_masked(slice):
-                slice_is_masked_flag = True
-                self.lgr.info('Future slice is masked in band {}'.format(num_band))
-            else:
-                slice_is_masked_flag = False
-
-            # reform slice
-            # ============
-            for ilat, lat_indx in enumerate(range(lat_indx_min, lat_indx_max + 1)):
-                lat = self.latitudes[lat_indx]
-                gran_lat = round((90.0 - lat)*GRANULARITY)
-
-                for ilon, lon_indx in enumerate(range(lon_indx_min, lon_indx_max + 1)):
-                    long = self.longitudes[lon_indx]
-                    gran_lon = round((180.0 + long)*GRANULARITY)
-                    key = '{:0=5d}_{:0=5d}'.format(int(gran_lat), int(gran_lon))
-
-                    # validate values
-                    # ===============
-                    pettmp[varnam_map][key] = null_value
-                    if slice_is_masked_flag :
-                        val = slice[0,ilat,ilon]
-                        if val is ma.masked:
-                            self.lgr.info('val is ma.masked for key {} lat {} long {}'.format(key, lat, long))
-                            pettmp[varnam_map][key] = []
-
-                    # add data for this coordinate
-                    # ============================
-                    if pettmp[varnam_map][key] == null_value:
-                        pettmp[varnam_map][key] = _check_list_for_none(slice[:,ilat,ilon].tolist())
-
-            # close netCDF file
-            nc_dset.close()
-
-        pettmp = _consistency_check(pettmp, varnams_mapped)
-        return pettmp
+    def fetch_isimip_NC_data(self, aoi_indices, dset_strt_yr, nmnths, max_cells=MAX_CELLS):
+        """
+        fetch precipitation - units: kg m-2 s-1, and temperature - units: Kelvin, for a given lat/long AOI
+            for ISIMAP precipitation - convert kg m-2 s-1 to mm month-1
+            1 kg water = 1000 mm-3      1 m-2 = 1 million mm-2 so 1 kg m-2 = 1000 / 1000000  = 0.001 mm
+            so to convert to mm day-1 = 0.001 * NUMSECSDAY = 86.4
+        returns a GriddedWeather object
+        """
+        return self._fetch_gridded(self.fut_wthr_set_defn, 'isimip', aoi_indices, -999, True, max_cells,
+                                                                                                    dset_strt_yr)
+
+    def fetch_ewembi_NC_data(self, aoi_indices, num_band, future_flag = True):
+        """
+        get precipitation or temperature data for a given variable and lat/long index for the simulation months
+        CRU uses NETCDF4 format
+        """
+        return self._fetch_gridded(self._wthr_set_defn(future_flag), 'ewembi', aoi_indices, num_band, future_flag)
+
+    def fetch_eobs_NC_data(self, aoi_indices, num_band, future_flag = True):
+        """
+        get precipitation or temperature data for a given variable and lat/long index for the simulation months
+        EObs uses NETCDF format - cells with any missing values are deemed invalid
+        """
+        return self._fetch_gridded(self._wthr_set_defn(future_flag), 'eobs', aoi_indices, num_band, future_flag)
 
     def fetch_ncar_ccsm4_NC_data(self, aoi_indices, num_band, future_flag = True):
         """
-        get precipitation or temperature data for a given variable and lat/long index for all times
+        get precipitation or temperature data for a given variable and lat/long index for the simulation months
         CORDEX uses NETCDF3_64BIT format
         """
-        func_name = __prog__ +  ' fetch_ncar_ccsm4_NC_data'
-        warnings.simplefilter('default')
-
-        lat_indx_min, lat_indx_max, lon_indx_min, lon_indx_max = aoi_indices
-        pettmp = {}
-        if future_flag == True:
-            precip_fname = self.fut_precip_fname
-            temper_fname = self.fut_tas_fname
-            start_year   = self.sim_start_year
-        else:
-            precip_fname = self.hist_precip_fname
-            temper_fname = self.hist_tas_fname
-            start_year   = self.hist_start_year
-
-        # process future climate
-        # ======================
-        varnams_mapped = {'pr':'precipitation','tas':'temperature'}
-        varnams = sorted(varnams_mapped.keys())
-
-        for varname, fname in zip(varnams, list([precip_fname, temper_fname])):
-            varnam_map = varnams_mapped[varname]
-            pettmp[varnam_map] = {}
-            nc_dset = Dataset(fname, mode='r')
-
-            # collect readings for all time values
-            # ====================================
-            try:
-                slice = nc_dset.variables[varname][:, lat_indx_min:lat_indx_max + 1, lon_indx_min:lon_indx_max + 1]
-            except RuntimeWarning as e:
-                print(e)
-
-            if ma.is_masked(slice):
-                slice_is_masked_flag = True
-                print('Future slice is masked in band {}'.format(num_band))
-            else:
-                slice_is_masked_flag = False
-
-            # generate days per month
-            # ======================
-            if varname == 'pr':
-                days_per_month = []
-                nmonths = len(nc_dset.variables[varname])
-                for year in range(start_year, start_year + int(nmonths/12) + 1):
-                    for imnth in range(12):
-                        dummy, ndays = monthrange(year, imnth + 1)
-                        days_per_month.append(ndays)
-
-            # reform slice
-            # ============
-            for ilat, lat_indx in enumerate(range(lat_indx_min, lat_indx_max + 1)):
-                gran_lat = round((90.0 - self.latitudes[lat_indx])*GRANULARITY)
-
-                for ilon, lon_indx in enumerate(range(lon_indx_min, lon_indx_max + 1)):
-                    gran_lon = round((180.0 + self.longitudes[lon_indx])*GRANULARITY)
-                    key = '{:0=5d}_{:0=5d}'.format(int(gran_lat), int(gran_lon))
-
-                    # validate values
-                    # ===============
-                    pettmp[varnam_map][key] = null_value
-                    if slice_is_masked_flag :
-                        val = slice[0,ilat,ilon]
-                        if val is ma.masked:
-                            self.lgr.info('val is ma.masked for key ' + key)
-                            pettmp[varnam_map][key] = None
-
-                    # add data for this coordinate
-                    # ============================
-                    if pettmp[varnam_map][key] == null_value:
-                        if varname == 'pr':
-                            pettmp[varnam_map][key] = [round(val*ndays*NUMSECSDAY, 1) for val in slice[:,ilat,ilon]]
-                        elif varname == 'tas':
-                            pettmp[varnam_map][key] = [round(val - 273.15, 1) for val in slice[:,ilat,ilon]]
-
-            # close netCDF file
-            nc_dset.close()
-
-        return pettmp
+        return self._fetch_gridded(self._wthr_set_defn(future_flag), 'ncar_ccsm4', aoi_indices, num_band,
+                                                                                                        future_flag)
 
     def fetch_harmonie_NC_data(self, aoi_indices, num_band, future_flag = True):
         """
-        get precipitation or temperature data for a given variable and lat/long index for all times
+        get precipitation or temperature data for a given variable and lat/long index for the simulation months
         """
-        func_name = __prog__ +  ' fetch_harmonie_NC_data'
-        warnings.simplefilter('default')
-
-        lat_indx_min, lat_indx_max, lon_indx_min, lon_indx_max = aoi_indices
-        pettmp = {}
-        if future_flag == True:
-            precip_fname = self.fut_precip_fname
-            temper_fname = self.fut_tas_fname
-            start_year   = self.sim_start_year
-        else:
-            precip_fname = self.hist_precip_fname
-            temper_fname = self.hist_tas_fname
-            start_year   = self.hist_start_year
-
-        # process future climate
-        # ======================
-        varnams_mapped = {'Precipalign':'precipitation','Tairalign':'temperature'}
-        varnams = sorted(varnams_mapped.keys())
-
-        for varname, fname in zip(varnams, list([precip_fname, temper_fname])):
-            varnam_map = varnams_mapped[varname]
-            pettmp[varnam_map] = {}
-            nc_dset = Dataset(fname, mode='r')
-
-            # collect readings for all time values
-            # ====================================
-            try:
-                slice = nc_dset.variables[varname][:, lat_indx_min:lat_indx_max + 1, lon_indx_min:lon_indx_max + 1]
-            except RuntimeWarning as e:
-                print(e)
-
-            if ma.is_masked(slice):
-                slice_is_masked_flag = True
-                print('Future slice is masked in band {}'.format(num_band))
-            else:
-                slice_is_masked_flag = False
-
-            # generate days per month
-            # ======================
-            if varname == 'Precipalign':
-                days_per_month = []
-                nmonths = len(nc_dset.variables[varname])
-                for year in range(start_year, start_year + int(nmonths/12) + 1):
-                    for imnth in range(12):
-                        dummy, ndays = monthrange(year, imnth + 1)
-                        days_per_month.append(ndays)
-
-            # reform slice
-            # ============
-            for ilat, lat_indx in enumerate(range(lat_indx_min, lat_indx_max + 1)):
-                gran_lat = round((90.0 - self.latitudes[lat_indx])*GRANULARITY)
-
-                for ilon, lon_indx in enumerate(range(lon_indx_min, lon_indx_max + 1)):
-                    gran_lon = round((180.0 + self.longitudes[lon_indx])*GRANULARITY)
-                    key = '{:0=5d}_{:0=5d}'.format(int(gran_lat), int(gran_lon))
-
-                    # validate values
-                    # ===============
-                    pettmp[varnam_map][key] = null_value
-                    if slice_is_masked_flag :
-                        val = slice[0,ilat,ilon]
-                        if val is ma.masked:
-                            self.lgr.info('val is ma.masked for key ' + key)
-                            pettmp[varnam_map][key] = None
-
-                    # add data for this coordinate
-                    # ============================
-                    if pettmp[varnam_map][key] == null_value:
-                        if varname == 'Precipalign':
-                            pettmp[varnam_map][key] = [round(val, 2) for val in slice[:,ilat,ilon]]
-                        elif varname == 'Tairalign':
-                            pettmp[varnam_map][key] = [round(val - 273.15, 1) for val in slice[:,ilat,ilon]]
-
-            # close netCDF file
-            nc_dset.close()
-
-        return pettmp
+        return self._fetch_gridded(self._wthr_set_defn(future_flag), 'harmonie', aoi_indices, num_band, future_flag)
 
     def fetch_cru_future_NC_data(self, aoi_indices, num_band, fut_start_indx=0):
         """
-        get precipitation or temperature data for a given variable and lat/long index for all times
-        CRU uses NETCDF4 format
+        get precipitation or temperature data for a given variable and lat/long index for the simulation months
+        CRU uses NETCDF4 format and future datasets are ordered lat, lon, time
+        months before fut_start_indx overlap with historic data and are not read
         """
-        warnings.simplefilter('default')
-
-        num_key_masked = 0
-        lat_indx_min, lat_indx_max, lon_indx_min, lon_indx_max = aoi_indices
-        pettmp = {}
-
-        # process future climate
-        # ======================
-        varnams_mapped = {'precipitation':'precipitation','temperature':'temperature'}
-
-        varnams = sorted(varnams_mapped.keys())
-
-        for varname, fname in zip(varnams, list([self.fut_precip_fname, self.fut_tas_fname])):
-            varnam_map = varnams_mapped[varname]
-            pettmp[varnam_map] = {}
-            nc_dset = Dataset(fname)
-
-            # collect readings for all time values
-            # ====================================
-            slice = nc_dset.variables[varname][lat_indx_min:lat_indx_max + 1, lon_indx_min:lon_indx_max + 1, :]
-
-            if ma.is_masked(slice):
-                slice_is_masked_flag = True
-                self.lgr.info('Future slice is masked in band {}'.format(num_band))
-            else:
-                slice_is_masked_flag = False
-
-            # reform slice
-            # ============
-            for ilat, lat_indx in enumerate(range(lat_indx_min, lat_indx_max + 1)):
-                gran_lat = round((90.0 - self.latitudes[lat_indx])*GRANULARITY)
-
-                for ilon, lon_indx in enumerate(range(lon_indx_min, lon_indx_max + 1)):
-                    gran_lon = round((180.0 + self.longitudes[lon_indx])*GRANULARITY)
-                    key = '{:0=5d}_{:0=5d}'.format(int(gran_lat), int(gran_lon))
-
-                    # validate values
-                    # ===============
-                    pettmp[varnam_map][key] = null_value
-                    if slice_is_masked_flag :
-                        val = slice[ilat,ilon,0]
-                        if val is ma.masked:
-                            self.lgr.info('val is ma.masked for key ' + key)
-                            pettmp[varnam_map][key] = None
-                            num_key_masked += 1
-
-                    # add data for this coordinate
-                    # ============================
-                    if pettmp[varnam_map][key] == null_value:
-                        # remove overlap with historic data - for CRU data only
-                        record = [round(val, 1) for val in slice[ilat,ilon,:]]
-                        pettmp[varnam_map][key] = record[fut_start_indx:]
-
-            # close netCDF file
-            nc_dset.close()
-            if num_key_masked > 0:
-                print('# masked weather keys: {}'.format(num_key_masked))
-
-        return pettmp
+        return self._fetch_gridded(self.fut_wthr_set_defn, 'cru_future', aoi_indices, num_band, True,
+                                                                                        mnth_strt=fut_start_indx)
 
     def fetch_cru_historic_NC_data(self, aoi_indices, num_band, max_cells=MAX_CELLS):
         """
-        get precipitation or temperature data for a given variable and lat/long index for all times
+        get precipitation or temperature data for a given variable and lat/long index for the historic months
+        which precede the future weather
         CRU uses NETCDF4 format
         """
-        warnings.simplefilter('default')
-
-        num_key_masked = 0
-        lat_indx_min, lat_indx_max, lon_indx_min, lon_indx_max = aoi_indices
-        pettmp = {}
-        pettmp['lat_lons'] = {}
-        nlats = lat_indx_max - lat_indx_min + 1
-
-        # process historic climate
-        # ========================
-        varnams_mapped = {'pre': 'precipitation', 'tmp': 'temperature'}
-
-        varnams = sorted(varnams_mapped.keys())
-
-        for varname, fname in zip(varnams, list([self.hist_precip_fname, self.hist_tas_fname])):
-            varnam_map = varnams_mapped[varname]
-            pettmp[varnam_map] = {}
-            nc_dset = Dataset(fname)
-
-            # for user feedback
-            # =================
-            last_time = time()
-            start_time = None
-            completed_lats = 0
-            skipped = 0
-            warn_count = 0
-
-            # collect readings for all time values
-            # ====================================
-            slice = nc_dset.variables[varname][:, lat_indx_min:lat_indx_max + 1, lon_indx_min:lon_indx_max + 1]
-
-            if ma.is_masked(slice):
-                slice_is_masked_flag = True
-                self.lgr.info('Historic weather slice is masked in band {}'.format(num_band))
-            else:
-                slice_is_masked_flag = False
-
-            # reform slice
-            # ============
-            icount = 0
-            for ilat, lat_indx in enumerate(range(lat_indx_min, lat_indx_max + 1)):
-                lat = self.latitudes_hist[lat_indx]
-                gran_lat = round((90.0 - lat)*GRANULARITY)
-
-                last_time = update_progress(last_time, start_time, completed_lats, nlats, skipped, warn_count)
-                QApplication.processEvents()
-
-                for ilon, lon_indx in enumerate(range(lon_indx_min, lon_indx_max + 1)):
-                    lon = self.longitudes_hist[lon_indx]
-                    gran_lon = round((180.0 + lon)*GRANULARITY)
-                    key = '{:0=5d}_{:0=5d}'.format(int(gran_lat), int(gran_lon))
-
-                    # validate values
-                    # ===============
-                    pettmp[varnam_map][key] = null_value
-                    if slice_is_masked_flag :
-                        val = slice[0, ilat, ilon]
-                        if val is ma.masked:
-                            self.lgr.info('val is ma.masked for key ' + key)
-                            pettmp[varnam_map][key] = None
-                            num_key_masked += 1
-
-                    # add data for this coordinate
-                    # ============================
-                    if pettmp[varnam_map][key] == null_value:
-                        pettmp[varnam_map][key] = [round(val, 1) for val in slice[:, ilat,ilon]]
-
-                    pettmp['lat_lons'][key] = [lat, lon]
-                    icount += 1
-                    if icount >= max_cells:
-                        break
-
-                completed_lats += 1
-                if icount >= max_cells:
-                    break
-
-            nc_dset.close()     # close netCDF file
-            if num_key_masked > 0:
-                print('# masked weather keys: {}'.format(num_key_masked))
-                QApplication.processEvents()
-
-        return pettmp
+        return self._fetch_gridded(self.hist_wthr_set_defn, 'cru_historic', aoi_indices, num_band, False, max_cells)
 
     def create_FutureAverages(self, clim_dir, lat_inp, gran_coord, site, lta_precip, lta_tmean):
         """
@@ -959,7 +485,7 @@ class ClimGenNC(object,):
 
         # pet
         if max(ave_tmean) > 0.0:
-            pet = thornthwaite(ave_tmean, lat_inp, year)
+            pet = thornthwaite_batch([[ave_tmean]], [lat_inp], [year])[0][0, 0].tolist()
         else:
             pet = [0.0]*12
             mess = WARNING + 'monthly average temperatures are below zero in ' + full_func_name
@@ -982,7 +508,7 @@ class ClimGenNC(object,):
         # ===============================================================================
         if site is not None:
             lta = {'pet': [], 'precip': lta_precip, 'tas': lta_tmean}
-            lta['pet'] = thornthwaite(lta['tas'], lat_inp, year)
+            lta['pet'] = thornthwaite_batch([[lta['tas']]], [lat_inp], [year])[0][0, 0].tolist()
 
             site.lta_pet = [round(float(pet), 1) for pet in lta['pet']]
             site.lta_precip = [round(float(precip), 1) for precip in lta['precip']]
@@ -27,6 +27,8 @@ from locale import LC_ALL, setlocale, format_string
 import numpy
 from PyQt5.QtWidgets import QApplication
 
+from wthr_cell_index import WthrCellIndex
+
 GRANULARITY = 120
 SOIL_DIR = 'soil_metrics'
 
@@ -35,14 +37,17 @@ ERROR_STR = '*** Error *** '
 
 def fetch_coord_nearest_xy(coords_lookup, y_point, x_point):
     """
-    C
+    coords_lookup is either the coordinates lookup dictionary or, preferably, the nearest cell index built from it
+    which avoids a search of every weather cell; for many points use the index's nearest_gran_coords method
     """
+    if isinstance(coords_lookup, WthrCellIndex):
+        return str(coords_lookup.nearest_gran_coords(y_point, x_point)[0])
+
     y_array = numpy.array(coords_lookup['Lat'])
     x_array = numpy.array(coords_lookup['Lon'])
 
     distance = (y_array - y_point)**2 + (x_array - x_point)**2
-    id = numpy.where(distance==distance.min())
-    indx = id[0].item()
+    indx = distance.argmin()    # first of equidistant cells, as per the index
 
     gran_coord = coords_lookup['gran_coord'][indx]
 
@@ -0,0 +1,77 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        grid_cell_keys.py
+# Purpose:     grid cell keys packed as 64 bit integers - granular latitude in the upper 32 bits and granular
+#              longitude in the lower 32 bits; the string form e.g. 04320_22080 is only used to name directories
+#              and in CSV files
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+__prog__ = 'grid_cell_keys.py'
+__version__ = '0.0.1'
+__author__ = 's03mm5'
+
+from numpy import asarray, around, int64, char
+
+GRANULARITY = 120
+KEY_SHIFT = 32
+LON_MASK = (1 << KEY_SHIFT) - 1
+KEY_DTYPE = int64
+
+def encode_keys(gran_lats, gran_lons):
+    """
+    pack granular latitudes and longitudes, scalars or arrays, into keys
+    """
+    return (asarray(gran_lats, dtype=int64) << KEY_SHIFT) | asarray(gran_lons, dtype=int64)
+
+def decode_keys(keys):
+    """
+    return granular latitudes and longitudes of keys, scalars or arrays
+    """
+    keys = asarray(keys, dtype=int64)
+
+    return keys >> KEY_SHIFT, keys & LON_MASK
+
+def keys_from_lat_lon(lats, lons):
+    """
+    keys of the cells enclosing latitudes and longitudes
+    """
+    gran_lats = around((90.0 - asarray(lats, dtype=float))*GRANULARITY)
+    gran_lons = around((180.0 + asarray(lons, dtype=float))*GRANULARITY)
+
+    return encode_keys(gran_lats, gran_lons)
+
+def lat_lon_from_keys(keys):
+    """
+    C
+    """
+    gran_lats, gran_lons = decode_keys(keys)
+
+    return 90.0 - gran_lats/GRANULARITY, gran_lons/GRANULARITY - 180.0
+
+def key_to_gran_coord(key):
+    """
+    string form of a single key e.g. 04320_22080
+    """
+    key = int(key)
+
+    return '{:0=5d}_{:0=5d}'.format(key >> KEY_SHIFT, key & LON_MASK)
+
+def gran_coord_to_key(gran_coord):
+    """
+    C
+    """
+    gran_lat, gran_lon = gran_coord.split('_')
+
+    return (int(gran_lat) << KEY_SHIFT) | int(gran_lon)
+
+def keys_to_gran_coords(keys):
+    """
+    string forms of an array of keys
+    """
+    gran_lats, gran_lons = decode_keys(keys)
+
+    return char.add(char.add(char.zfill(gran_lats.astype(str), 5), '_'), char.zfill(gran_lons.astype(str), 5))
@@ -0,0 +1,283 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        gridded_weather.py
+# Purpose:     array backed store of monthly weather for a block of grid cells
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+__prog__ = 'gridded_weather.py'
+__version__ = '0.0.1'
+__author__ = 's03mm5'
+
+from numpy import (array, asarray, around, meshgrid, ones, full, nan, float32, int32, flatnonzero, concatenate,
+                                                                                    argsort, searchsorted, where)
+
+from grid_cell_keys import encode_keys, key_to_gran_coord, keys_to_gran_coords
+
+GRANULARITY = 120
+METRICS = list(['precipitation', 'temperature'])
+
+class GriddedWeather(object,):
+    """
+    monthly weather held as float32 arrays shaped [cell, month], one array per metric
+    cells are described by granular and geographic coordinates and a validity mask - cells which are masked
+    in any metric e.g. sea, are flagged as invalid
+    cells are identified by keys packed from their granular coordinates, see grid_cell_keys
+    """
+    def __init__(self, lats, lons, nmnths, year_start=None, metrics=METRICS):
+
+        self.lats = asarray(lats, dtype=float)
+        self.lons = asarray(lons, dtype=float)
+        self.gran_lats = around((90.0 - self.lats)*GRANULARITY).astype(int32)
+        self.gran_lons = around((180.0 + self.lons)*GRANULARITY).astype(int32)
+
+        ncells = len(self.lats)
+        self.valid = ones(ncells, dtype=bool)
+        self.data = {}
+        for metric in metrics:
+            self.data[metric] = full((ncells, nmnths), nan, dtype=float32)
+
+        self.year_start = year_start
+        self._cell_lookup = None
+        self._sorted_keys = None
+        self.grid_origin = None     # dataset indices of first latitude and longitude if read as a hyperslab
+        self.grid_shape = None
+
+    @classmethod
+    def from_grid(cls, latitudes, longitudes, nmnths, year_start=None, metrics=METRICS, grid_origin=None):
+        """
+        create store for all cells of a rectilinear grid, cells are ordered by latitude then longitude
+        which is the order of a NetCDF [time, lat, lon] hyperslab whose origin in the dataset may be given
+        """
+        lat_grid, lon_grid = meshgrid(array(latitudes, dtype=float), array(longitudes, dtype=float), indexing='ij')
+
+        wthr = cls(lat_grid.ravel(), lon_grid.ravel(), nmnths, year_start, metrics)
+        if grid_origin is not None:
+            wthr.grid_origin = tuple(grid_origin)
+            wthr.grid_shape = lat_grid.shape
+
+        return wthr
+
+    @property
+    def ncells(self):
+        return len(self.lats)
+
+    @property
+    def nmnths(self):
+        return next(iter(self.data.values())).shape[1]
+
+    @property
+    def nbytes(self):
+        return sum(vals.nbytes for vals in self.data.values())
+
+    def add_slice(self, metric, vals, cell_mask=None):
+        """
+        vals are converted values from a hyperslab ordered [time, lat, lon] consistent with the cell order
+        cells flagged in cell_mask are marked as invalid
+        """
+        nmnths = vals.shape[0]
+        self.data[metric][:, :nmnths] = vals.reshape(nmnths, self.ncells).T
+        if cell_mask is not None:
+            self.valid &= ~asarray(cell_mask).ravel()
+
+        return
+
+    def num_masked(self):
+        return int((~self.valid).sum())
+
+    def truncate(self, max_cells):
+        """
+        restrict store to the first max_cells cells
+        """
+        if max_cells >= self.ncells:
+            return
+
+        for attr in ['lats', 'lons', 'gran_lats', 'gran_lons', 'valid']:
+            setattr(self, attr, getattr(self, attr)[:max_cells])
+
+        for metric in self.data:
+            self.data[metric] = self.data[metric][:max_cells].copy()
+
+        self._cell_lookup = None
+        self._sorted_keys = None
+        return
+
+    def subset(self, cell_indices, metrics=None):
+        """
+        return new store comprising selected cells and, by default, all metrics
+        """
+        if metrics is None:
+            metrics = list(self.data.keys())
+
+        cell_indices = asarray(cell_indices, dtype=int)
+        new_wthr = GriddedWeather(self.lats[cell_indices], self.lons[cell_indices], 0, self.year_start, [])
+        new_wthr.valid = self.valid[cell_indices]
+        for metric in metrics:
+            new_wthr.data[metric] = self.data[metric][cell_indices]
+
+        return new_wthr
+
+    def gran_coord(self, icell):
+        """
+        string form e.g. 04320_22080 used to name weather directories
+        """
+        return '{:0=5d}_{:0=5d}'.format(int(self.gran_lats[icell]), int(self.gran_lons[icell]))
+
+    def gran_coords(self, valid_only=True):
+        """
+        C
+        """
+        return keys_to_gran_coords(self.cell_keys(valid_only)).tolist()
+
+    def cell_keys(self, valid_only=True):
+        """
+        return keys of cells as an int64 array
+        """
+        if valid_only:
+            return encode_keys(self.gran_lats[self.valid], self.gran_lons[self.valid])
+        else:
+            return encode_keys(self.gran_lats, self.gran_lons)
+
+    def cell_indx(self, cell_key):
+        """
+        return index of cell or None if cell is not present or is invalid
+        """
+        if self._cell_lookup is None:
+            self._cell_lookup = dict(zip(self.cell_keys().tolist(), flatnonzero(self.valid).tolist()))
+
+        return self._cell_lookup.get(int(cell_key))
+
+    def cell_indices(self, cell_keys):
+        """
+        return indices of cells for an array of keys, -1 where a cell is not present or is invalid
+        """
+        if self._sorted_keys is None:
+            valid_indices = flatnonzero(self.valid)
+            keys = self.cell_keys()
+            order = argsort(keys, kind='stable')
+            self._sorted_keys = keys[order], valid_indices[order]
+
+        sorted_keys, sorted_indices = self._sorted_keys
+        cell_keys = asarray(cell_keys, dtype=sorted_keys.dtype)
+        if len(sorted_keys) == 0:
+            return full(len(cell_keys), -1, dtype=int)
+
+        posns = searchsorted(sorted_keys, cell_keys).clip(0, len(sorted_keys) - 1)
+        found = sorted_keys[posns] == cell_keys
+
+        return where(found, sorted_indices[posns], -1)
+
+    def __contains__(self, cell_key):
+        return self.cell_indx(cell_key) is not None
+
+    def _valid_cell_indx(self, cell_key):
+        """
+        as cell_indx but raise KeyError if cell is not present or is invalid
+        """
+        icell = self.cell_indx(cell_key)
+        if icell is None:
+            raise KeyError(key_to_gran_coord(cell_key))
+
+        return icell
+
+    def lat_lon(self, cell_key):
+        """
+        C
+        """
+        icell = self._valid_cell_indx(cell_key)
+
+        return float(self.lats[icell]), float(self.lons[icell])
+
+    def series(self, metric, cell_key):
+        """
+        return monthly values for a cell as a view of the underlying array
+        """
+        return self.data[metric][self._valid_cell_indx(cell_key)]
+
+class WthrTimeline(object,):
+    """
+    historic weather up to the splice month followed by future weather, presented as one logical monthly series
+    per cell without copying - backed by the two GriddedWeather objects, paired cell indices and the splice month
+    """
+    def __init__(self, wthr_hist, wthr_fut, indx_hist_end, indices_hist, indices_fut):
+
+        self.wthr_hist = wthr_hist
+        self.wthr_fut = wthr_fut
+        self.indx_hist_end = indx_hist_end
+        self.indices_hist = asarray(indices_hist, dtype=int)
+        self.indices_fut = asarray(indices_fut, dtype=int)
+        self.year_start = wthr_hist.year_start
+        self._cell_lookup = dict(zip(self.cell_keys().tolist(), range(len(self.indices_hist))))
+
+    @property
+    def ncells(self):
+        return len(self.indices_hist)
+
+    @property
+    def nmnths(self):
+        return self.indx_hist_end + self.wthr_fut.nmnths
+
+    @property
+    def nyears(self):
+        return self.nmnths//12
+
+    def gran_coords(self):
+        """
+        C
+        """
+        return keys_to_gran_coords(self.cell_keys()).tolist()
+
+    def cell_keys(self):
+        """
+        return keys of cells as an int64 array
+        """
+        return encode_keys(self.wthr_hist.gran_lats[self.indices_hist], self.wthr_hist.gran_lons[self.indices_hist])
+
+    def __contains__(self, cell_key):
+        return int(cell_key) in self._cell_lookup
+
+    def lat_lon(self, cell_key):
+        """
+        C
+        """
+        return self.wthr_hist.lat_lon(cell_key)
+
+    def segments(self, metric, cell_key):
+        """
+        return historic and future parts of the series for a cell, both views of the underlying arrays
+        """
+        indx = self._cell_lookup[int(cell_key)]
+        hist_seg = self.wthr_hist.data[metric][self.indices_hist[indx], :self.indx_hist_end]
+        fut_seg = self.wthr_fut.data[metric][self.indices_fut[indx]]
+
+        return hist_seg, fut_seg
+
+    def months(self, metric, cell_key, indx1, indx2):
+        """
+        return months indx1 to indx2 of the logical series, a view unless the range straddles the splice month
+        """
+        hist_seg, fut_seg = self.segments(metric, cell_key)
+        splice = self.indx_hist_end
+        if indx2 <= splice:
+            return hist_seg[indx1:indx2]
+        elif indx1 >= splice:
+            return fut_seg[indx1 - splice:indx2 - splice]
+        else:
+            return concatenate((hist_seg[indx1:], fut_seg[:indx2 - splice]))
+
+    def year_blocks(self, cell_key, metrics=METRICS):
+        """
+        generate year and, for each metric, the twelve monthly values of each complete year
+        """
+        for iyr in range(self.nyears):
+            indx1 = 12*iyr
+            yield self.year_start + iyr, [self.months(metric, cell_key, indx1, indx1 + 12) for metric in metrics]
+
+    def series(self, metric, cell_key):
+        """
+        return whole series for a cell - this is a copy
+        """
+        return concatenate(self.segments(metric, cell_key))
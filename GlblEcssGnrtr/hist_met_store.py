@@ -0,0 +1,178 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        hist_met_store.py
+# Purpose:     content addressed store of historic met files - the met files of historic years are identical for
+#              every GCM and scenario so each cell directory holds hard links to a single canonical copy
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+__prog__ = 'hist_met_store.py'
+__version__ = '0.0.1'
+__author__ = 's03mm5'
+
+from os.path import join, isfile, isdir, lexists, split, getsize
+from os import makedirs, replace, remove, link, getpid, chmod, stat
+from stat import S_IREAD, S_IWRITE, S_IRGRP, S_IROTH
+from hashlib import sha1
+from shutil import copyfile
+from threading import Lock, get_ident
+from PyQt5.QtWidgets import QApplication
+
+HIST_STORE_DIR = 'hist_met_store'
+
+WARN_STR = '*** Warning *** '
+
+def remove_file(fname):
+    """
+    remove fname which may be a read only link to a canonical copy - on Windows the read only attribute must be
+    cleared first; the attribute belongs to the file, not the link, so it is only cleared if removal fails
+    """
+    try:
+        remove(fname)
+    except PermissionError:
+        chmod(fname, S_IREAD | S_IWRITE)
+        remove(fname)
+
+    return
+
+def write_buffer(fname, buffer, link_check=False):
+    """
+    write contents to fname
+    if link_check is set, i.e. a store of historic met files is in use, then fname may be a hard link to a
+    canonical copy which must never be written through, even where permissions would allow it e.g. when running
+    as root, so a file with more than one link is removed first
+    a read only file, such as a link left by an earlier run, is removed and written afresh
+    """
+    if link_check:
+        try:
+            if stat(fname).st_nlink > 1:
+                remove_file(fname)
+        except FileNotFoundError:
+            pass
+
+    try:
+        fobj = open(fname, 'wb')
+    except PermissionError:
+        remove_file(fname)
+        fobj = open(fname, 'wb')
+    with fobj:
+        fobj.write(buffer)
+
+    return
+
+def open_hist_store(form, wthr_out_dir):
+    """
+    return store of historic met files if requested in the run settings, otherwise None
+    the store sits alongside the scenario directories e.g. Wthr/hist_met_store so that it is on the same drive
+    """
+    if not form.settings.get('dedup_hist_met', False):
+        return None
+
+    store_dir = join(split(wthr_out_dir.rstrip('\\/'))[0], HIST_STORE_DIR)
+    print('Historic met files will be linked to canonical copies in ' + store_dir)
+    QApplication.processEvents()
+
+    return HistMetStore(store_dir)
+
+class HistMetStore(object,):
+    """
+    each canonical copy is named by the SHA-1 hash of its contents and is read only; canonical copies not written
+    by this process are compared byte for byte with the new contents, once, before being linked to
+    if a hard link cannot be made, e.g. the file system does not support them, then the file is copied
+    """
+    def __init__(self, store_dir):
+
+        self.store_dir = store_dir
+        self.lock = Lock()
+        self.verified = set()       # hashes of canonical copies known to hold the expected contents
+        self.link_flag = True
+        self.nlinked = 0
+        self.ncopied = 0
+        self.nbytes_linked = 0
+        self.nbytes_stored = 0      # bytes of canonical copies written
+
+    def _canonical_fname(self, buffer):
+        """
+        return path of the canonical copy of the contents, writing it if necessary
+        """
+        digest = sha1(buffer).hexdigest()
+        canon_fname = join(self.store_dir, digest[:2], digest[2:4], digest + '.txt')
+        if digest in self.verified:
+            return canon_fname
+
+        if isfile(canon_fname) and getsize(canon_fname) == len(buffer):
+            with open(canon_fname, 'rb') as fobj:
+                if fobj.read() == buffer:
+                    self.verified.add(digest)
+                    return canon_fname
+
+        # canonical copy is absent or corrupt - write under a name unique to this process and thread
+        # ============================================================================================
+        canon_dir = split(canon_fname)[0]
+        if not isdir(canon_dir):
+            makedirs(canon_dir, exist_ok=True)
+        tmp_fname = canon_fname + '.{}_{}.tmp'.format(getpid(), get_ident())
+        with open(tmp_fname, 'wb') as fobj:
+            fobj.write(buffer)
+        chmod(tmp_fname, S_IREAD | S_IRGRP | S_IROTH)
+        if lexists(canon_fname):
+            remove_file(canon_fname)    # replacing a read only file fails on Windows
+        replace(tmp_fname, canon_fname)
+        self.verified.add(digest)
+        with self.lock:
+            self.nbytes_stored += len(buffer)
+
+        return canon_fname
+
+    def write_file(self, fname, buffer):
+        """
+        create fname as a hard link to the canonical copy of buffer, or as a copy if linking fails
+        an existing file is removed first so that the canonical copy is never overwritten through a link
+        """
+        canon_fname = self._canonical_fname(buffer)
+        if lexists(fname):
+            remove_file(fname)
+
+        if self.link_flag:
+            try:
+                link(canon_fname, fname)
+                with self.lock:
+                    self.nlinked += 1
+                    self.nbytes_linked += len(buffer)
+                return
+            except OSError as err:
+                print(WARN_STR + 'could not link to canonical historic met files, will copy - ' + str(err))
+                self.link_flag = False
+
+        copyfile(canon_fname, fname)
+        with self.lock:
+            self.ncopied += 1
+
+        return
+
+    def write_met_files(self, clim_dir, file_bufs, hist_fnames):
+        """
+        write files, a list of file name and contents pairs, to clim_dir linking those named in hist_fnames
+        returns number of bytes written or linked
+        """
+        nbytes = 0
+        for fname, buffer in file_bufs:
+            if fname in hist_fnames:
+                self.write_file(join(clim_dir, fname), buffer)
+            else:
+                write_buffer(join(clim_dir, fname), buffer, link_check=True)
+            nbytes += len(buffer)
+
+        return nbytes
+
+    def report(self):
+        """
+        C
+        """
+        nbytes_saved = max(0, self.nbytes_linked - self.nbytes_stored)
+
+        return 'Historic met files linked: {}\tcopied: {}\tdisk saved: {} MB'\
+                                            .format(self.nlinked, self.ncopied, round(nbytes_saved/1.0e6, 1))
@@ -34,13 +34,17 @@ from weather_datasets import read_weather_dsets_detail
 from hwsd_bil import check_hwsd_integrity
 from shape_funcs import format_bbox
 
-MIN_GUI_LIST = ['weatherResource', 'bbox', 'maxSims', 'endBand', 'strtBand']
+MIN_GUI_LIST = ['weatherResource', 'bbox', 'maxSims', 'endBand', 'strtBand', 'streamBands', 'resumeRun']
 CMN_GUI_LIST = ['climScnr', 'gridResol']
 
 WARN_STR = '*** Warning *** '
 ERROR_STR = '*** Error *** '
 SETTINGS_LIST = ['config_dir', 'fname_png', 'hwsd_dir', 'log_dir', 'shp_dir', 'prj_drive', 'python_exe', 'weather_dir']
 RUN_SETTINGS = ['completed_max', 'start_at_band', 'space_remaining_limit', 'kml_flag', 'soil_test_flag', 'zeros_file']
+RUN_SETTINGS_OPTNL = {'wthr_cache_dir': '', 'wthr_cache_max_gb': 10,
+                      'num_met_workers': 0, 'num_writer_threads': 0, 'wthr_out_format': 'dirs',
+                      'shard_size': 0, 'dedup_hist_met': False,
+                      'write_wthr_averages': True}  # optional, with defaults
 BBOX_DEFAULT = [116.90045, 28.2294, 117.0, 29.0]  # bounding box default - somewhere in SE Europe
 sleepTime = 5
 
@@ -159,6 +163,9 @@ def _read_setup_file(form, fname_setup):
     for sttng in RUN_SETTINGS:
         form.settings[sttng] = settings[grp][sttng]
 
+    for sttng in RUN_SETTINGS_OPTNL:
+        form.settings[sttng] = settings[grp].get(sttng, RUN_SETTINGS_OPTNL[sttng])
+
     # report settings
     # ===============
     lta_nc_fname = None
@@ -214,7 +221,15 @@ def write_default_setup_file(setup_file):
             'space_remaining_limit': 1270,
             'kml_flag': True,
             'soil_test_flag': False,
-            'zeros_file': False
+            'zeros_file': False,
+            'wthr_cache_dir': '',
+            'wthr_cache_max_gb': 10,
+            'num_met_workers': 0,
+            'num_writer_threads': 0,
+            'wthr_out_format': 'dirs',
+            'shard_size': 0,
+            'dedup_hist_met': False,
+            'write_wthr_averages': True
         }
     }
     # create setup file
@@ -274,6 +289,8 @@ def read_config_file(form):
                 config[grp][key] = str(0)
             elif key == 'endBand':
                 config[grp][key] = str(360)
+            elif key == 'streamBands' or key == 'resumeRun':
+                config[grp][key] = False
             else:
                 print(ERROR_STR + 'setting {} is required in group {} of config file {}'.format(key, grp, config_file))
                 config[grp][key] = ""
@@ -296,6 +313,8 @@ def read_config_file(form):
     form.w_max_sims.setText(config[grp]['maxSims'])
     form.w_strt_band.setText(config[grp]['strtBand'])
     form.w_end_band.setText(config[grp]['endBand'])
+    form.w_strm_bands.setChecked(config[grp]['streamBands'])
+    form.w_resume.setChecked(config[grp]['resumeRun'])
 
     weather_resource = config[grp]['weatherResource']
     if weather_resource == '':
@@ -374,7 +393,9 @@ def write_config_file(form):
             'weatherResource': weather_resource,
             'maxSims': form.w_max_sims.text(),
             'strtBand': form.w_strt_band.text(),
-            'endBand': form.w_end_band.text()
+            'endBand': form.w_end_band.text(),
+            'streamBands': form.w_strm_bands.isChecked(),
+            'resumeRun': form.w_resume.isChecked()
         },
         'cmnGUI': {
             'climScnr': scenario,
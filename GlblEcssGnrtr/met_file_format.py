@@ -0,0 +1,50 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        met_file_format.py
+# Purpose:     format met files of many years in a single step, output being identical to that of csv.writer
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+__prog__ = 'met_file_format.py'
+__version__ = '0.0.1'
+__author__ = 's03mm5'
+
+from numpy import array, float64, around, floor, abs as np_abs, flatnonzero, stack
+
+FILE_SEP = '\x00'    # separates contents of each met file in the formatted buffer
+
+def round_2dp(vals):
+    """
+    round to two decimal places giving the same floats as the round builtin - numpy rounding scales by 100
+    which can differ from round only when the scaled value lies very close to a half, such values use round
+    """
+    vals = array(vals, dtype=float64)
+    rounded = around(vals, 2)
+    scaled = vals*100.0
+    near_half = np_abs(scaled - floor(scaled) - 0.5) < 1.0e-6
+    for indx in flatnonzero(near_half.ravel()):
+        rounded.flat[indx] = round(float(vals.flat[indx]), 2)
+
+    return rounded
+
+def format_met_files(years, precip, pet, tmean):
+    """
+    format tab delimited met files of precipitation, Potential Evapotranspiration [mm/month] and temperature
+    each variable is shaped [year, month] - all values are rounded and formatted in a single step then the
+    resulting buffer is sliced into one file per year
+    output is identical to that of csv.writer i.e. floats as repr and lines terminated by carriage return line feed
+    returns list of file name and contents pairs
+    """
+    nyears = len(years)
+    if nyears == 0:
+        return []
+
+    vals = round_2dp(stack((precip, pet, tmean), axis=-1)).tolist()    # [year, month, 3]
+    year_tmplt = ''.join(['{}\t%r\t%r\t%r\r\n'.format(imnth + 1) for imnth in range(12)])
+    flat_vals = tuple([val for year_vals in vals for mnth_vals in year_vals for val in mnth_vals])
+    buffers = (FILE_SEP.join([year_tmplt]*nyears) % flat_vals).split(FILE_SEP)
+
+    return [('met{0}s.txt'.format(year), buffer.encode()) for year, buffer in zip(years, buffers)]
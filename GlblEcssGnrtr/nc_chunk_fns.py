@@ -0,0 +1,97 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        nc_chunk_fns.py
+# Purpose:     chunk layout arithmetic for NetCDF weather variables - read amplification, the layout of time
+#              series copies and the blocks in which a variable is copied; needs neither netCDF4 nor the GUI
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+__prog__ = 'nc_chunk_fns.py'
+__version__ = '0.0.1'
+__author__ = 's03mm5'
+
+from math import ceil
+
+CHUNK_BLOCK = 8         # chunks span all months for blocks of CHUNK_BLOCK x CHUNK_BLOCK cells
+RECHUNK_FACTOR = 2.0    # copy only if a cell read decompresses this many times more than from a time series copy
+MAX_COPY_BYTES = 2*1024**3     # bound on values held in memory while copying
+
+def time_dim_indx(dim_names):
+    """
+    index of the time dimension of a variable or None
+    """
+    for indx, dim in enumerate(dim_names):
+        if dim.lower().startswith('time') or dim.lower() == 't':
+            return indx
+
+    return None
+
+def lon_dim_indx(ndims, time_indx):
+    """
+    longitude is the last dimension other than time e.g. time, lat, lon or lat, lon, time
+    """
+    return max([indx for indx in range(ndims) if indx != time_indx])
+
+def read_amplification(shape, chunking, time_indx, ncells_row=1):
+    """
+    ratio of values decompressed to values used when reading the full time series of a row of ncells_row cells
+    shape and chunking are ordered as the variable dimensions
+    """
+    if chunking == 'contiguous':
+        return 1.0
+
+    lon_indx = lon_dim_indx(len(shape), time_indx)
+    ntimes = shape[time_indx]
+    nchunks = 1
+    nvals_chunk = 1
+    for indx, (dim_size, chunk_size) in enumerate(zip(shape, chunking)):
+        nvals_chunk *= chunk_size
+        if indx == time_indx:
+            nchunks *= ceil(dim_size/chunk_size)
+        elif indx == lon_indx:
+            nchunks *= ceil(min(ncells_row, dim_size)/chunk_size)
+
+    return nchunks*nvals_chunk/(ntimes*ncells_row)
+
+def ts_chunksizes(shape, time_indx, block=CHUNK_BLOCK):
+    """
+    chunk sizes of a time series copy - all months for blocks of block x block cells
+    """
+    return [dim_size if indx == time_indx else min(block, dim_size) for indx, dim_size in enumerate(shape)]
+
+def rechunk_needed(shape, chunking, time_indx, block=CHUNK_BLOCK, factor=RECHUNK_FACTOR):
+    """
+    a copy is worthwhile only if cell reads are markedly more amplified than they would be from the copy - every
+    chunked layout has some amplification, including that of a time series copy
+    """
+    if time_indx is None:
+        return False
+
+    ampl_target = read_amplification(shape, ts_chunksizes(shape, time_indx, block), time_indx)
+
+    return read_amplification(shape, chunking, time_indx) > factor*ampl_target
+
+def copy_blocks(shape, chunking, time_indx, itemsize, block=CHUNK_BLOCK, max_bytes=MAX_COPY_BYTES):
+    """
+    return the index of the dimension along which a variable is copied, the first other than time, and the start
+    and end of each block along it - blocks span whole source chunks so that each source chunk is decompressed
+    once, and whole chunks of the copy, unless this would exceed max_bytes
+    """
+    blk_indx = 1 if time_indx == 0 else 0
+    dim_size = shape[blk_indx]
+
+    nvals_row = 1
+    for indx, size in enumerate(shape):
+        if indx != blk_indx:
+            nvals_row *= size
+    max_rows = max(block, (max_bytes//max(1, nvals_row*itemsize))//block*block)
+
+    src_rows = dim_size if chunking == 'contiguous' else chunking[blk_indx]
+    nrows = ceil(src_rows/block)*block          # whole chunks of both source and copy where possible
+    if nrows > max_rows:
+        nrows = max_rows
+
+    return blk_indx, [(start, min(start + nrows, dim_size)) for start in range(0, dim_size, nrows)]
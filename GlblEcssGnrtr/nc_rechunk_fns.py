@@ -0,0 +1,166 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        nc_rechunk_fns.py
+# Purpose:     report chunk layout of weather NetCDF files and write copies chunked for time series access
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+__prog__ = 'nc_rechunk_fns.py'
+__version__ = '0.0.1'
+__author__ = 's03mm5'
+
+from os.path import isfile, getmtime, split
+from os import remove, replace
+from time import time
+from netCDF4 import Dataset
+from PyQt5.QtWidgets import QApplication
+
+from getClimGenNC_ltd import ClimGenNC
+from wthr_nc_extract import WthrDsetDescr, ts_copy_fname, METRIC_FNAME_KEYS
+from nc_chunk_fns import (CHUNK_BLOCK, time_dim_indx, lon_dim_indx, read_amplification, ts_chunksizes,
+                                                                                rechunk_needed, copy_blocks)
+
+COMPLEVEL = 4
+FILL_ATTR = '_FillValue'
+
+# kinds of historic and future datasets for each weather resource
+# ================================================================
+WTHR_RSRCE_KINDS = {'CRU': ('cru_historic', 'cru_future'), 'EFISCEN-ISIMIP': ('cru_historic', 'isimip'),
+                    'EObs': ('eobs', 'eobs'), 'HARMONIE': ('harmonie', 'harmonie'),
+                    'NCAR_CCSM4': ('ncar_ccsm4', 'ncar_ccsm4')}
+
+ERROR_STR = '*** Error *** '
+WARNING = '*** Warning *** '
+
+def report_chunking(fname, varname):
+    """
+    report source chunking and predicted read amplification for single cell and latitude band reads
+    return shape, chunking and index of the time dimension or None if there is no time dimension
+    """
+    nc_dset = Dataset(fname, mode='r')
+    try:
+        var = nc_dset.variables[varname]
+        shape = var.shape
+        chunking = var.chunking()
+        time_indx = time_dim_indx(var.dimensions)
+    finally:
+        nc_dset.close()
+
+    mess = '{}\tvariable: {}\tdimensions: {}\tchunking: {}'.format(split(fname)[1], varname, shape, chunking)
+    if time_indx is None:
+        print(WARNING + mess + '\tno time dimension')
+        return None
+
+    ampl_cell = read_amplification(shape, chunking, time_indx)
+    ampl_band = read_amplification(shape, chunking, time_indx, shape[lon_dim_indx(len(shape), time_indx)])
+    print(mess + '\tread amplification - cell: {}\tband: {}'.format(round(ampl_cell, 1), round(ampl_band, 1)))
+    QApplication.processEvents()
+
+    return shape, chunking, time_indx
+
+def rechunk_nc_file(fname, varname, out_fname, block=CHUNK_BLOCK):
+    """
+    write copy of NetCDF file in which varname is chunked to span all months for small spatial blocks
+    other variables, dimensions and attributes are copied unchanged
+    the copy is written under a temporary name so that an incomplete copy is never used; both datasets are closed
+    whatever happens so that the temporary file may be removed should the copy fail
+    """
+    tmp_fname = out_fname + '.tmp'
+    src = Dataset(fname, mode='r')
+    try:
+        dst = Dataset(tmp_fname, mode='w', format='NETCDF4')
+        try:
+            _copy_dataset(src, dst, varname, block)
+        finally:
+            dst.close()
+    finally:
+        src.close()
+
+    replace(tmp_fname, out_fname)
+
+    return
+
+def _copy_dataset(src, dst, varname, block):
+    """
+    copy dimensions, attributes and variables of open datasets rechunking varname
+    """
+    dst.setncatts({attr: src.getncattr(attr) for attr in src.ncattrs()})
+
+    for dim_name, dim in src.dimensions.items():
+        dst.createDimension(dim_name, None if dim.isunlimited() else len(dim))
+
+    for name, var in src.variables.items():
+        fill_value = var.getncattr(FILL_ATTR) if FILL_ATTR in var.ncattrs() else None
+        if name == varname:
+            time_indx = time_dim_indx(var.dimensions)
+            chunksizes = ts_chunksizes(var.shape, time_indx, block)
+            new_var = dst.createVariable(name, var.dtype, var.dimensions, zlib=True, complevel=COMPLEVEL,
+                                                                chunksizes=chunksizes, fill_value=fill_value)
+        else:
+            new_var = dst.createVariable(name, var.dtype, var.dimensions, fill_value=fill_value)
+        new_var.setncatts({attr: var.getncattr(attr) for attr in var.ncattrs() if attr != FILL_ATTR})
+
+        # copy in blocks of the first non-time dimension which span whole source chunks so that each is
+        # decompressed once while memory remains bounded
+        # ==================================================================================================
+        var.set_auto_maskandscale(False)
+        new_var.set_auto_maskandscale(False)
+        if name != varname or len(var.shape) < 3:
+            new_var[...] = var[...]
+            continue
+
+        blk_indx, blocks = copy_blocks(var.shape, var.chunking(), time_indx, var.dtype.itemsize, block)
+        for start, end in blocks:
+            slices = [slice(None)]*len(var.shape)
+            slices[blk_indx] = slice(start, end)
+            new_var[tuple(slices)] = var[tuple(slices)]
+
+    return
+
+def rechunk_wthr_sets(form):
+    """
+    for the historic and future weather sets of the selected resource and scenario report the chunk layout
+    and, where cell reads are markedly more amplified than from a time series copy, write such a copy alongside
+    the original
+    the copy is preferred by the weather extraction when it exists and is newer than the original
+    """
+    climgen = ClimGenNC(form)
+    if not hasattr(climgen, 'hist_wthr_set_defn'):
+        return
+
+    # AMMA 2050 datasets are EWEMBI
+    # =============================
+    dset_kinds = WTHR_RSRCE_KINDS.get(climgen.weather_resource, ('ewembi', 'ewembi'))
+    for wthr_set_defn, dset_kind in zip([climgen.hist_wthr_set_defn, climgen.fut_wthr_set_defn], dset_kinds):
+        descr = WthrDsetDescr(wthr_set_defn, dset_kind)
+        for metric, fname_key in METRIC_FNAME_KEYS.items():
+            fname = wthr_set_defn[fname_key]
+            out_fname = ts_copy_fname(fname)
+            if isfile(out_fname) and getmtime(out_fname) >= getmtime(fname):
+                print('Time series copy ' + out_fname + ' already exists')
+                continue
+
+            varname = descr.varname(metric)
+            layout = report_chunking(fname, varname)
+            if layout is None or not rechunk_needed(*layout):
+                continue
+
+            print('Writing time series copy ' + out_fname + '...')
+            QApplication.processEvents()
+            start_time = time()
+            try:
+                rechunk_nc_file(fname, varname, out_fname)
+            except (OSError, RuntimeError) as err:
+                print(ERROR_STR + 'could not write ' + out_fname + ' - ' + str(err))
+                if isfile(out_fname + '.tmp'):
+                    remove(out_fname + '.tmp')
+                continue
+
+            report_chunking(out_fname, varname)
+            print('Time taken: {} seconds'.format(round(time() - start_time, 1)))
+            QApplication.processEvents()
+
+    return
@@ -17,7 +17,6 @@ __prog__ = 'prepare_ecosse_files.py'
 #
 from os.path import split, join, lexists, basename, isfile
 from os import remove, makedirs
-import csv
 import time
 import sys
 from time import sleep
@@ -25,11 +24,20 @@ import shutil
 import json
 from PyQt5.QtWidgets import QApplication
 
-from thornthwaite import thornthwaite
+from numpy import array, float64, flatnonzero
+
+from thornthwaite_batch import thornthwaite_batch
+from met_file_format import round_2dp, format_met_files
+from wthr_cell_archive import write_cell_archive, find_cell_rel_dir
+from dir_shard_fns import cell_rel_dir, sim_rel_dir
+from hist_met_store import write_buffer
 from glbl_ecss_cmmn_funcs import write_kml_file, write_manifest_file, write_signature_file, input_txt_line_layout
 from weather_datasets import write_csv_wthr_file
 
 set_spacer_len = 12
+LTA_RECS_FN = 'lta_ave.txt'
+AVEMET_FN = 'AVEMET.DAT'
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
 sleepTime = 5
 
 def _weather_for_simulation(amma_2050_allowed_gcms, weather_sets, climgen, pettmp_hist, pettmp_fut):
@@ -118,47 +126,168 @@ def _make_met_files(clim_dir, latitude, climgen, pettmp_grid_cell):
     temper = pettmp_grid_cell['temperature']
     nmnths = len(temper)
 
-    indx1 = 0
-    for year in range(start_year, end_year + 1):
-        fname = 'met{0}s.txt'.format(year)
-        met_path = join(clim_dir, fname)
-
-        indx2 = indx1 + 12
-        if indx2 >= nmnths:
-            break
+    # years for which there is a complete year of weather
+    # ===================================================
+    nyears = min(end_year - start_year + 1, (nmnths - 1)//12)
+    years = list(range(start_year, start_year + nyears))
+    if nyears <= 0:
+        return
 
-        # precipitation and temperature
-        precipitation = precip[indx1:indx2]            #
-        tmean = temper[indx1:indx2]
+    tmeans = array([temper[12*iyr:12*iyr + 12] for iyr in range(nyears)], dtype=float64)
+    precips = array([precip[12*iyr:12*iyr + 12] for iyr in range(nyears)], dtype=float64)
+    pets, masks = thornthwaite_batch(tmeans[None], [latitude], years)
+    for iyr in flatnonzero(masks[0]):
+        _warn_below_zero(latitude, clim_dir)
 
-        # pet
-        if max(tmean) > 0.0:
-            pet = thornthwaite(tmean, latitude, year)
-        else:
-            pet = [0.0]*12
-            mess = '*** Warning *** monthly temperatures are all below zero for latitude: {}\tclimate directory: {}'\
-                                                                                            .format(latitude, clim_dir)
-            print(mess)
+    write_met_files_bulk(clim_dir, years, precips, pets[0], tmeans)
 
-        # TODO: do something about occasional runtime warning...
-        pot_evapotrans = [round(p, 2) for p in pet]
-        precip_out = [round(p, 2) for p in precipitation]
-        tmean_out = [round(t, 2) for t in tmean]
+    return
 
-        # write file
-        output = []
-        for tstep, mean_temp in enumerate(tmean_out):
-            output.append([tstep+1, precip_out[tstep], pot_evapotrans[tstep], mean_temp])
+def make_met_files(clim_dir, latitude, climgen, wthr_timeline, cell_key, writer=None, out_format='dirs',
+                                                                            hist_store=None, ave_periods=None):
+    """
+    write a met file for each complete year of the joined historic and future weather, a WthrTimeline, for a cell
+    if a writer queue is supplied then the formatted files are handed to it rather than written
+    if out_format is archive then the files are written to a single archive for the cell rather than a directory
+    if a store of historic met files is supplied then met files of wholly historic years are linked to it
+    if average weather periods are supplied then lta_ave.txt, AVEMET.DAT and files of average weather are also written
+    """
+    years = []
+    precips = []
+    tmeans = []
+    for year, (precip, temper) in wthr_timeline.year_blocks(cell_key):
+        years.append(year)
+        precips.append(precip)
+        tmeans.append(temper)
+
+    # convert from float32 otherwise rounding does not work as expected
+    # PET for all years is estimated in one pass
+    # =================================================================
+    precips = array(precips, dtype=float64)
+    tmeans = array(tmeans, dtype=float64)
+    pets, masks = thornthwaite_batch(tmeans[None], [latitude], years)
+    for iyr in flatnonzero(masks[0]):
+        _warn_below_zero(latitude, clim_dir)
+
+    if writer is None and out_format != 'archive' and hist_store is None and ave_periods is None:
+        return write_met_files_bulk(clim_dir, years, precips, pets[0], tmeans)
+
+    hist_fnames = None
+    if out_format != 'archive' and (hist_store is not None or writer is not None):
+        hist_end_yr = wthr_timeline.year_start + wthr_timeline.indx_hist_end//12 - 1
+        hist_fnames = set(['met{0}s.txt'.format(year) for year in years if year <= hist_end_yr])
+
+    file_bufs = format_met_files(years, precips, pets[0], tmeans)
+    if ave_periods is not None:
+        file_bufs += format_wthr_averages(years, precips, tmeans, latitude, ave_periods, clim_dir)
+
+    if writer is not None:
+        writer.put(clim_dir, file_bufs, hist_fnames)
+    elif out_format == 'archive':
+        write_cell_archive(clim_dir, file_bufs)
+    elif hist_store is not None:
+        hist_store.write_met_files(clim_dir, file_bufs, hist_fnames)
+    else:
+        for fname, buffer in file_bufs:
+            write_buffer(join(clim_dir, fname), buffer)
 
-        with open(met_path, 'w', newline='') as fpout:
-            writer = csv.writer(fpout, delimiter='\t')
-            writer.writerows(output)
-            fpout.close()
+    return [fname for fname, buffer in file_bufs]
 
-        indx1 += 12
+def _warn_below_zero(latitude, clim_dir):
+    """
+    C
+    """
+    mess = '*** Warning *** monthly temperatures are all below zero for latitude: {}\tclimate directory: {}'\
+                                                                                    .format(latitude, clim_dir)
+    print(mess)
 
     return
 
+def write_met_files_bulk(clim_dir, years, precip, pet, tmean):
+    """
+    write met files formatted by format_met_files, one write per file
+    """
+    met_fnames = []
+    for fname, buffer in format_met_files(years, precip, pet, tmean):
+        write_buffer(join(clim_dir, fname), buffer)
+        met_fnames.append(fname)
+
+    return met_fnames
+
+def _ave_line(data, comment):
+    """
+    line of average weather as included in the input.txt file
+    """
+    spacer_len = max(set_spacer_len - len(data), 2)
+
+    return '{}{}# {}\r\n'.format(data, ' '*spacer_len, comment)
+
+def format_wthr_averages(years, precip, tmean, latitude, ave_periods, clim_dir=''):
+    """
+    format files of average weather from met file values held in memory, rather than read back from the met files
+        precip and tmean are shaped [year, month] and are rounded as written to the met files
+        ave_periods is a list of first and last years of each averaging period, the first being the historic period
+    for each period, a text file of average weather for inclusion in the input.txt file and a met file of average
+    weather as written by create_wthr_averages; lta_ave.txt and AVEMET.DAT are from the historic period
+    periods not wholly covered by the met files are skipped
+    lines are terminated by carriage return line feed, as for the met files
+    returns list of file name and contents pairs
+    """
+    precip = round_2dp(precip)
+    tmean = round_2dp(tmean)
+
+    file_bufs = []
+    for iperiod, (yr_strt, yr_end) in enumerate(ave_periods):
+        indx_strt = yr_strt - years[0]
+        if indx_strt < 0 or yr_end > years[-1]:
+            continue
+
+        # sums accumulate year by year as when reading met files
+        # ======================================================
+        num_yrs = yr_end - yr_strt + 1
+        sum_precip = precip[indx_strt:indx_strt + num_yrs].sum(axis=0).tolist()
+        sum_tmean = tmean[indx_strt:indx_strt + num_yrs].sum(axis=0).tolist()
+
+        lines = ''
+        for month, val in zip(MONTH_NAMES, sum_precip):
+            lines += _ave_line('{}'.format(round(val/num_yrs, 1)),
+                                                '{} long term average monthly precipitation [mm]'.format(month))
+        for month, val in zip(MONTH_NAMES, sum_tmean):
+            lines += _ave_line('{}'.format(round(val/num_yrs, 2)),
+                                                '{} long term average monthly temperature [degC]'.format(month))
+        file_bufs.append(('met{}_to_{}_ave.txt'.format(yr_strt, yr_end), lines.encode()))
+
+        ave_precip = [round(val/num_yrs, 1) for val in sum_precip]
+        ave_tmean = [round(val/num_yrs, 1) for val in sum_tmean]
+        if max(ave_tmean) > 0.0:
+            pet = thornthwaite_batch([[ave_tmean]], [latitude], [yr_end])[0][0, 0].tolist()
+        else:
+            pet = [0.0]*12
+            _warn_below_zero(latitude, clim_dir)
+
+        lines = ''
+        for imnth, (precip_mnth, pet_mnth, tmean_mnth) in enumerate(zip(ave_precip, pet, ave_tmean)):
+            lines += '{}\t{!r}\t{!r}\t{!r}\r\n'.format(imnth + 1, precip_mnth, round(pet_mnth, 1), tmean_mnth)
+        file_bufs.append(('met{}_{}a.txt'.format(yr_strt, yr_end), lines.encode()))
+
+        # long term average weather files required by ECOSSE
+        # ===================================================
+        if iperiod == 0:
+            lines = ''
+            for month, val in zip(MONTH_NAMES, ave_precip):
+                lines += _ave_line('{}'.format(val), '{} long term average monthly precipitation [mm]'.format(month))
+            for month, val in zip(MONTH_NAMES, ave_tmean):
+                lines += _ave_line('{}'.format(val), '{} long term average monthly temperature [degC]'.format(month))
+            file_bufs.append((LTA_RECS_FN, lines.encode()))
+
+            lta_pet = thornthwaite_batch([[ave_tmean]], [latitude])[0][0, 0].tolist()
+            lines = ''
+            for imnth, (precip_mnth, pet_mnth, tmean_mnth) in enumerate(zip(ave_precip, lta_pet, ave_tmean)):
+                lines += '{} {} {} {}\r\n'.format(imnth + 1, precip_mnth, round(pet_mnth, 1), tmean_mnth)
+            file_bufs.append((AVEMET_FN, lines.encode()))
+
+    return file_bufs
+
 def make_ecosse_file(form, climgen, ltd_data, site_rec, study, lta_wthr_recs, wthr_gran_coord, soil_list = None):
     """
     generate sets of Ecosse files for each site
@@ -171,9 +300,18 @@ def make_ecosse_file(form, climgen, ltd_data, site_rec, study, lta_wthr_recs, wt
     gran_lat, gran_lon, latitude, longitude, area, mu_globals_props = site_rec
     sims_dir = form.sims_dir
     fut_clim_scen = climgen.fut_clim_scen
-    met_rel_path = join('..', '..', '..', WTHR, fut_clim_scen, wthr_gran_coord, '')     # path must terminate with \\
+
+    # when sharded, simulation directories are one level deeper
+    # the weather cell is located on disk since it may have been written with other settings
+    # ==========================================================================================
+    shard_size = form.settings.get('shard_size', 0)
+    up_dirs = ['..']*(4 if shard_size > 0 else 3)
     wthr_dir = join(split(sims_dir)[0], WTHR)
-    wthr_cell_dir = join(wthr_dir, fut_clim_scen, wthr_gran_coord)
+    wthr_cell_rel_dir = find_cell_rel_dir(join(wthr_dir, fut_clim_scen), wthr_gran_coord, shard_size)
+    if wthr_cell_rel_dir is None:
+        wthr_cell_rel_dir = cell_rel_dir(wthr_gran_coord, shard_size)
+    met_rel_path = join(*up_dirs, WTHR, fut_clim_scen, wthr_cell_rel_dir, '')     # path must terminate with \\
+    wthr_cell_dir = join(wthr_dir, fut_clim_scen, wthr_cell_rel_dir)
 
     '''
     Create a set of simulation input files for each dominant soil-land use type combination
@@ -188,7 +326,7 @@ def make_ecosse_file(form, climgen, ltd_data, site_rec, study, lta_wthr_recs, wt
         for soil_num, soil in enumerate(soil_list):
             identifer = 'lat{0:0=7d}_lon{1:0=7d}_mu{2:0=5d}_s{3:0=2d}'.format(gran_lat, gran_lon,
                                                                               mu_global, soil_num + 1)
-            sim_dir = join(sims_dir, study, identifer)
+            sim_dir = join(sims_dir, study, sim_rel_dir(identifer, gran_lat, shard_size))
             if not lexists(sim_dir):
                 makedirs(sim_dir)
 
@@ -0,0 +1,14 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        conftest.py
+# Purpose:     modules of the generator are imported by name, as when the GUI is run from its own directory
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+from os.path import dirname, abspath
+import sys
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
@@ -0,0 +1,65 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_grid_cell_keys.py
+# Purpose:     packed grid cell keys must round trip and agree with the string form of granular coordinates
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+from numpy import array, arange, int64, array_equal
+
+from grid_cell_keys import (encode_keys, decode_keys, keys_from_lat_lon, lat_lon_from_keys, key_to_gran_coord,
+                                                                        gran_coord_to_key, keys_to_gran_coords)
+
+GRANULARITY = 120
+
+def test_encode_decode_round_trip():
+    """
+    granular latitudes span 0 to 180*120 and longitudes 0 to 360*120
+    """
+    gran_lats = array([0, 1, 4320, 10799, 21600], dtype=int64)
+    gran_lons = array([0, 43199, 22080, 1, 43200], dtype=int64)
+    keys = encode_keys(gran_lats, gran_lons)
+
+    assert keys.dtype == int64
+    assert len(set(keys.tolist())) == len(keys)
+    dec_lats, dec_lons = decode_keys(keys)
+    assert array_equal(dec_lats, gran_lats)
+    assert array_equal(dec_lons, gran_lons)
+
+def test_keys_order_by_latitude_then_longitude():
+    """
+    C
+    """
+    keys = encode_keys([10, 10, 11], [43200, 5, 0])
+    assert keys[1] < keys[0] < keys[2]
+
+def test_gran_coord_string_form():
+    """
+    C
+    """
+    key = encode_keys(4320, 22080)
+    assert key_to_gran_coord(key) == '04320_22080'
+    assert gran_coord_to_key('04320_22080') == int(key)
+    assert key_to_gran_coord(gran_coord_to_key('00005_00010')) == '00005_00010'
+
+    keys = encode_keys([5, 4320, 21599], [10, 22080, 43199])
+    assert keys_to_gran_coords(keys).tolist() == ['00005_00010', '04320_22080', '21599_43199']
+
+def test_keys_from_lat_lon():
+    """
+    keys of the centres of half degree cells agree with the granular coordinates used to name weather directories
+    """
+    lats = arange(-89.75, 90.0, 0.5)
+    lons = arange(-179.75, 180.0, 1.0)
+    keys = keys_from_lat_lon(lats, lons)
+
+    for lat, lon, key in zip(lats.tolist(), lons.tolist(), keys.tolist()):
+        gran_coord = '{:0=5d}_{:0=5d}'.format(round((90.0 - lat)*GRANULARITY), round((180.0 + lon)*GRANULARITY))
+        assert key_to_gran_coord(key) == gran_coord
+
+    dec_lats, dec_lons = lat_lon_from_keys(keys)
+    assert abs(dec_lats - lats).max() < 1.0e-9
+    assert abs(dec_lons - lons).max() < 1.0e-9
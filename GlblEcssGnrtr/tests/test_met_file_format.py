@@ -0,0 +1,79 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_met_file_format.py
+# Purpose:     met files formatted in a single buffer must be byte for byte identical to those written, one line
+#              at a time, by csv.writer from values rounded with the round builtin
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+from io import StringIO
+import csv
+from numpy import array, float64
+from numpy.random import default_rng
+
+from met_file_format import format_met_files, round_2dp
+
+def _csv_met_file(precip, pet, tmean):
+    """
+    met file as written by csv.writer
+    """
+    output = []
+    for imnth in range(12):
+        output.append([imnth + 1, round(precip[imnth], 2), round(pet[imnth], 2), round(tmean[imnth], 2)])
+
+    fobj = StringIO(newline='')
+    csv.writer(fobj, delimiter='\t').writerows(output)
+
+    return fobj.getvalue().encode()
+
+def _check_identical(years, precip, pet, tmean):
+    """
+    C
+    """
+    file_bufs = format_met_files(years, precip, pet, tmean)
+
+    assert [fname for fname, buffer in file_bufs] == ['met{0}s.txt'.format(year) for year in years]
+    for iyr, (fname, buffer) in enumerate(file_bufs):
+        assert buffer == _csv_met_file(precip[iyr].tolist(), pet[iyr].tolist(), tmean[iyr].tolist())
+
+def test_random_values():
+    """
+    C
+    """
+    rng = default_rng(13)
+    nyears = 25
+    precip = rng.gamma(1.5, 40.0, (nyears, 12))
+    pet = rng.uniform(0.0, 180.0, (nyears, 12))
+    tmean = rng.normal(8.0, 12.0, (nyears, 12))
+
+    _check_identical(list(range(1981, 1981 + nyears)), precip, pet, tmean)
+
+def test_values_close_to_half():
+    """
+    values whose third decimal is 5 are where numpy rounding and the round builtin can differ
+    """
+    vals = array([0.125, 1.005, 2.675, -0.005, 12.345, -12.345, 0.015, 1.115, 1234.565, -0.001, 0.0, 99.995])
+    precip = vals.reshape(1, 12)
+    pet = vals[::-1].reshape(1, 12)
+    tmean = (vals + 0.01).reshape(1, 12)
+
+    _check_identical([2001], precip, pet, tmean)
+    assert round_2dp(vals).tolist() == [round(val, 2) for val in vals.tolist()]
+
+def test_float32_input():
+    """
+    weather is held as float32 but converted to float64 before formatting
+    """
+    rng = default_rng(32)
+    vals = rng.uniform(-20.0, 40.0, (3, 12)).astype('float32').astype(float64)
+
+    _check_identical([2010, 2011, 2012], vals, abs(vals), vals)
+
+def test_no_years():
+    """
+    C
+    """
+    assert format_met_files([], array([]), array([]), array([])) == []
@@ -0,0 +1,69 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_nc_chunk_fns.py
+# Purpose:     predicted read amplification for single cell and latitude band reads of chunked NetCDF variables
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+from nc_chunk_fns import read_amplification, rechunk_needed, copy_blocks
+
+SHAPE = (120, 360, 720)     # ten years of months on a half degree global grid
+
+def test_contiguous():
+    """
+    C
+    """
+    assert read_amplification(SHAPE, 'contiguous', 0) == 1.0
+
+def test_chunked_by_month():
+    """
+    a chunk per month holds the whole grid so every month of a cell decompresses the grid
+    """
+    assert read_amplification(SHAPE, (1, 360, 720), 0) == 360*720
+    assert read_amplification(SHAPE, (1, 360, 720), 0, ncells_row=720) == 360
+
+def test_chunked_for_time_series():
+    """
+    chunks spanning all months for 8 x 8 blocks of cells, as written by rechunk_nc_file
+    """
+    assert read_amplification(SHAPE, (120, 8, 8), 0) == 64
+    assert read_amplification(SHAPE, (120, 8, 8), 0, ncells_row=720) == 8
+
+def test_time_last():
+    """
+    CRU future datasets are ordered lat, lon, time
+    """
+    shape = (360, 720, 120)
+    assert read_amplification(shape, (8, 8, 120), 2) == 64
+    assert read_amplification(shape, (8, 8, 120), 2, ncells_row=720) == 8
+
+def test_rechunk_needed():
+    """
+    a time series copy scores 64 for a cell so only layouts markedly worse are copied
+    """
+    assert rechunk_needed(SHAPE, (1, 360, 720), 0)
+    assert not rechunk_needed(SHAPE, (120, 8, 8), 0)
+    assert not rechunk_needed(SHAPE, (120, 16, 8), 0)
+    assert rechunk_needed(SHAPE, (120, 32, 32), 0)
+    assert not rechunk_needed(SHAPE, 'contiguous', 0)
+    assert not rechunk_needed(SHAPE, (1, 360, 720), None)
+
+def test_copy_blocks():
+    """
+    blocks span whole source chunks and whole chunks of the copy unless memory would be exceeded
+    """
+    blk_indx, blocks = copy_blocks(SHAPE, (12, 20, 720), 0, 4)
+    assert blk_indx == 1
+    assert blocks[:2] == [(0, 24), (24, 48)] and blocks[-1] == (336, 360)
+
+    blk_indx, blocks = copy_blocks(SHAPE, (1, 360, 720), 0, 4)
+    assert blocks == [(0, 360)]
+
+    blk_indx, blocks = copy_blocks(SHAPE, (1, 360, 720), 0, 4, max_bytes=120*720*4*50)
+    assert blocks[0] == (0, 48) and blocks[-1] == (336, 360)
+
+    blk_indx, blocks = copy_blocks((360, 720, 120), (8, 8, 120), 2, 4)
+    assert blk_indx == 0 and blocks[1] == (8, 16)
@@ -0,0 +1,102 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_thornthwaite_batch.py
+# Purpose:     PET estimated for many cells and years in one pass must agree with a single cell, one month at a
+#              time, evaluation of the Thornthwaite equations and with the thornthwaite function it replaces
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+from math import sin, tan, acos, pi, radians
+from calendar import isleap
+import pytest
+from numpy import array
+from numpy.random import default_rng
+
+from thornthwaite_batch import thornthwaite_batch
+
+def _thornthwaite(monthly_t, lat, year=None):
+    """
+    single cell reference evaluated one month, and one day, at a time as the thornthwaite function does
+    """
+    month_days = [31, 29 if year is not None and isleap(year) else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+    dlh = []
+    doy = 1
+    for mdays in month_days:
+        cumul_dlh = 0.0
+        for daynum in range(mdays):
+            cos_sha = -tan(radians(lat))*tan(0.409*sin((2.0*pi/365.0)*doy - 1.39))
+            cumul_dlh += (24.0/pi)*acos(min(max(cos_sha, -1.0), 1.0))
+            doy += 1
+        dlh.append(cumul_dlh/mdays)
+
+    heat_indx = 0.0
+    for tmean in monthly_t:
+        if tmean > 0.0:
+            heat_indx += (tmean/5.0)**1.514
+
+    expnt = (6.75e-07*heat_indx**3) - (7.71e-05*heat_indx**2) + (1.792e-02*heat_indx) + 0.49239
+
+    pet = []
+    for tmean, daylen, mdays in zip(monthly_t, dlh, month_days):
+        if tmean > 0.0:
+            pet.append(1.6*(daylen/12.0)*(mdays/30.0)*((10.0*tmean/heat_indx)**expnt)*10.0)
+        else:
+            pet.append(0.0)
+
+    return pet
+
+def _cells_and_years():
+    """
+    cells at several latitudes over years including leap years and a year which is wholly below zero
+    """
+    rng = default_rng(12)
+    lats = [-45.25, 0.25, 11.75, 51.25, 68.75]
+    years = [1999, 2000, 2001, 2004]
+    tmean = rng.normal(10.0, 10.0, (len(lats), len(years), 12))
+    tmean[3, 2, :] = -abs(tmean[3, 2, :]) - 0.1
+
+    return tmean, lats, years
+
+def _check_against(thornthwaite, tmean, lats, years):
+    """
+    C
+    """
+    pet, mask = thornthwaite_batch(tmean, lats, years)
+
+    assert pet.shape == tmean.shape
+    assert mask.tolist() == [[max(tmean[icell, iyr]) <= 0.0 for iyr in range(len(years))]
+                                                                                    for icell in range(len(lats))]
+    for icell, lat in enumerate(lats):
+        for iyr, year in enumerate(years):
+            if mask[icell, iyr]:
+                assert pet[icell, iyr].tolist() == [0.0]*12
+            else:
+                expected = thornthwaite(tmean[icell, iyr].tolist(), lat, year)
+                assert pet[icell, iyr].tolist() == pytest.approx(expected, rel=1.0e-9, abs=1.0e-9)
+
+def test_matches_single_cell():
+    """
+    C
+    """
+    _check_against(_thornthwaite, *_cells_and_years())
+
+def test_matches_thornthwaite_function():
+    """
+    the thornthwaite function is distributed with ECOSSE rather than this package
+    """
+    thornthwaite = pytest.importorskip('thornthwaite').thornthwaite
+    _check_against(thornthwaite, *_cells_and_years())
+
+def test_no_years_given():
+    """
+    without years no year is treated as a leap year, as for the single cell function without a year
+    """
+    tmean = array([[[2.0, 4.0, 7.0, 10.0, 14.0, 17.0, 19.0, 18.0, 15.0, 11.0, 6.0, 3.0]]])
+    pet, mask = thornthwaite_batch(tmean, [52.25])
+
+    assert not mask[0, 0]
+    assert pet[0, 0].tolist() == pytest.approx(_thornthwaite(tmean[0, 0].tolist(), 52.25), rel=1.0e-9, abs=1.0e-9)
@@ -0,0 +1,107 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_wthr_cell_index.py
+# Purpose:     nearest weather cells found by the index must be those found by a brute force argmin over every
+#              cell of the coordinates lookup, including the choice between equidistant cells
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+import pytest
+from numpy import arange, meshgrid, concatenate, array, around
+from numpy.random import default_rng
+
+from wthr_cell_index import WthrCellIndex, load_cell_index
+
+GRANULARITY = 120
+
+def _gran_coords(lats, lons):
+    """
+    C
+    """
+    return ['{:0=5d}_{:0=5d}'.format(int(gran_lat), int(gran_lon)) for gran_lat, gran_lon in
+            zip(around((90.0 - lats)*GRANULARITY).tolist(), around((180.0 + lons)*GRANULARITY).tolist())]
+
+def _brute_force(lats, lons, y_points, x_points):
+    """
+    first of equidistant cells, as per fetch_coord_nearest_xy
+    """
+    return array([((lats - y_point)**2 + (lons - x_point)**2).argmin()
+                                                            for y_point, x_point in zip(y_points, x_points)])
+
+def _sparse_grid(rng, fraction=0.5):
+    """
+    half degree cells, some missing as for cells over the sea, in random order
+    """
+    lat_grid, lon_grid = meshgrid(arange(0.25, 20.0, 0.5), arange(0.25, 10.0, 0.5), indexing='ij')
+    present = rng.random(lat_grid.shape) < fraction
+    order = rng.permutation(present.sum())
+
+    return lat_grid[present][order], lon_grid[present][order]
+
+def test_equidistant_point():
+    """
+    a point at the corner of four cells is resolved to the first cell of the lookup
+    """
+    lats = array([11.75, 11.75, 11.25, 11.25])
+    lons = array([3.25, 3.75, 3.25, 3.75])
+    coords_index = WthrCellIndex(_gran_coords(lats, lons), lats, lons)
+
+    assert coords_index.nearest_gran_coords([11.5], [3.5]).tolist() == ['09390_21990']
+    for iorder in ([2, 3, 0, 1], [3, 1, 2, 0]):
+        coords_index = WthrCellIndex(_gran_coords(lats[iorder], lons[iorder]), lats[iorder], lons[iorder])
+        assert coords_index.nearest_indices([11.5], [3.5]).tolist() == [0]
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_matches_brute_force(seed):
+    """
+    queries on bucket corners and edges produce many ties, uniform queries exercise the ring search
+    including points beyond the grid
+    """
+    rng = default_rng(seed)
+    lats, lons = _sparse_grid(rng)
+    coords_index = WthrCellIndex(_gran_coords(lats, lons), lats, lons)
+
+    y_points = concatenate([rng.integers(0, 41, 2000)*0.5, rng.uniform(-3.0, 23.0, 2000)])
+    x_points = concatenate([rng.integers(0, 21, 2000)*0.5, rng.uniform(-3.0, 13.0, 2000)])
+
+    assert (coords_index.nearest_indices(y_points, x_points) == _brute_force(lats, lons, y_points, x_points)).all()
+
+def test_irregular_cells():
+    """
+    cells need not lie on the grid of buckets, several may share a bucket
+    """
+    rng = default_rng(7)
+    lats = rng.uniform(0.0, 10.0, 300)
+    lons = rng.uniform(0.0, 10.0, 300)
+    coords_index = WthrCellIndex([str(indx) for indx in range(300)], lats, lons)
+
+    y_points = rng.uniform(-1.0, 11.0, 2000)
+    x_points = rng.uniform(-1.0, 11.0, 2000)
+    assert (coords_index.nearest_indices(y_points, x_points) == _brute_force(lats, lons, y_points, x_points)).all()
+
+def test_empty_index():
+    """
+    C
+    """
+    coords_index = WthrCellIndex([], [], [])
+    assert coords_index.nearest_indices([1.0], [2.0]).tolist() == [-1]
+    assert coords_index.nearest_gran_coords([1.0], [2.0]).tolist() == ['']
+
+def test_saved_index(tmp_path):
+    """
+    index is persisted alongside the lookup and reloaded while the lookup is unchanged
+    """
+    rng = default_rng(11)
+    lats, lons = _sparse_grid(rng)
+    coords_lookup = {'gran_coord': _gran_coords(lats, lons), 'Lat': lats.tolist(), 'Lon': lons.tolist()}
+
+    coords_index = load_cell_index(str(tmp_path), coords_lookup)
+    reloaded = load_cell_index(str(tmp_path), coords_lookup)
+
+    y_points = rng.uniform(0.0, 20.0, 500)
+    x_points = rng.uniform(0.0, 10.0, 500)
+    assert reloaded.nearest_gran_coords(y_points, x_points).tolist() == \
+                                                    coords_index.nearest_gran_coords(y_points, x_points).tolist()
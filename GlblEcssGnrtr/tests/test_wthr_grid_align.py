@@ -0,0 +1,83 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_wthr_grid_align.py
+# Purpose:     cell maps built from the separable latitude and longitude maps must agree with a join on cell keys
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+from numpy import arange, array
+from numpy.random import default_rng
+
+from gridded_weather import GriddedWeather
+from wthr_grid_align import GridAlignment, fetch_grid_alignment, _axis_map
+
+# two datasets of half degree cells with different extents and axis directions e.g. CRU historic and a GCM
+# =======================================================================================================
+LATS_FROM = arange(65.75, 29.9, -0.5)
+LONS_FROM = arange(-20.25, 40.0, 0.5)
+LATS_TO = arange(35.25, 75.0, 0.5)
+LONS_TO = arange(-10.25, 50.0, 0.5)
+
+def _hyperslab(lats, lons, lat_indices, lon_indices, rng):
+    """
+    GriddedWeather read as a hyperslab of a dataset grid with some cells masked
+    """
+    lat_indx_min, lat_indx_max = lat_indices
+    lon_indx_min, lon_indx_max = lon_indices
+    wthr = GriddedWeather.from_grid(lats[lat_indx_min:lat_indx_max + 1], lons[lon_indx_min:lon_indx_max + 1], 12,
+                                                                        grid_origin=(lat_indx_min, lon_indx_min))
+    wthr.valid &= rng.random(wthr.ncells) > 0.2
+
+    return wthr
+
+def test_axis_map():
+    """
+    C
+    """
+    assert _axis_map([1.25, 1.75, 9.25], [2.25, 1.75, 1.25]).tolist() == [2, 1, -1]
+    assert _axis_map([1.25], []).tolist() == [-1]
+
+def test_cell_map_matches_key_join():
+    """
+    C
+    """
+    rng = default_rng(25)
+    alignment = GridAlignment(LATS_FROM, LONS_FROM, LATS_TO, LONS_TO)
+    for trial in range(20):
+        lat_min = int(rng.integers(0, len(LATS_FROM) - 10))
+        lon_min = int(rng.integers(0, len(LONS_FROM) - 10))
+        wthr_from = _hyperslab(LATS_FROM, LONS_FROM, (lat_min, lat_min + 9), (lon_min, lon_min + 9), rng)
+
+        lat_min = int(rng.integers(0, len(LATS_TO) - 30))
+        lon_min = int(rng.integers(0, len(LONS_TO) - 30))
+        wthr_to = _hyperslab(LATS_TO, LONS_TO, (lat_min, lat_min + 29), (lon_min, lon_min + 29), rng)
+        if trial % 4 == 0:
+            wthr_to.truncate(wthr_to.ncells//2)
+
+        expected = wthr_to.cell_indices(wthr_from.cell_keys(valid_only=False))
+        assert alignment.cell_map(wthr_from, wthr_to).tolist() == expected.tolist()
+
+def test_cell_map_without_grid_origin():
+    """
+    stores not read as hyperslabs fall back to a join on cell keys
+    """
+    wthr_from = GriddedWeather(array([50.25, 50.75, 10.25]), array([0.25, 0.25, 5.25]), 12)
+    wthr_to = GriddedWeather.from_grid(LATS_TO[20:40], LONS_TO[10:40], 12, grid_origin=(20, 10))
+    cell_map = GridAlignment(LATS_FROM, LONS_FROM, LATS_TO, LONS_TO).cell_map(wthr_from, wthr_to)
+
+    assert cell_map[2] == -1
+    for icell in range(2):
+        assert wthr_to.lats[cell_map[icell]] == wthr_from.lats[icell]
+        assert wthr_to.lons[cell_map[icell]] == wthr_from.lons[icell]
+
+def test_alignment_is_cached():
+    """
+    C
+    """
+    wthr_set_from = {'ds_precip': 'from_pr.nc', 'latitudes': LATS_FROM, 'longitudes': LONS_FROM}
+    wthr_set_to = {'ds_precip': 'to_pr.nc', 'latitudes': LATS_TO, 'longitudes': LONS_TO}
+
+    assert fetch_grid_alignment(wthr_set_from, wthr_set_to) is fetch_grid_alignment(wthr_set_from, wthr_set_to)
@@ -0,0 +1,54 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_wthr_run_journal.py
+# Purpose:     a resumed run must retry every band which was not completed, whatever bands followed it
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+import pytest
+
+pytest.importorskip('PyQt5')
+
+from wthr_run_journal import WthrRunJournal
+from grid_cell_keys import gran_coord_to_key
+
+RUN_KEY = 'CRU_hist_ssp126_aoi'
+
+def test_failed_band_is_not_complete(tmp_path):
+    """
+    band 1 has a failed cell, band 2 succeeds
+    """
+    journal = WthrRunJournal(str(tmp_path), RUN_KEY)
+    journal.add_cell(gran_coord_to_key('04320_22080'))
+    journal.add_failure()
+    journal.commit(1)
+    journal.add_cell(gran_coord_to_key('04380_22080'))
+    journal.commit(2)
+
+    assert not journal.band_complete(1)
+    assert journal.band_complete(2)
+    journal.close()
+
+    journal = WthrRunJournal(str(tmp_path), RUN_KEY, resume_flag=True)
+    assert journal.resumed
+    assert not journal.band_complete(1)
+    assert journal.band_complete(2)
+    assert not journal.band_complete(3)
+    assert journal.completed == set([gran_coord_to_key('04320_22080'), gran_coord_to_key('04380_22080')])
+    journal.close()
+
+def test_different_run_starts_afresh(tmp_path):
+    """
+    C
+    """
+    journal = WthrRunJournal(str(tmp_path), RUN_KEY)
+    journal.commit(1)
+    journal.close()
+
+    journal = WthrRunJournal(str(tmp_path), RUN_KEY + '_other', resume_flag=True)
+    assert not journal.resumed
+    assert not journal.band_complete(1)
+    journal.close()
@@ -0,0 +1,99 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        thornthwaite_batch.py
+# Purpose:     Thornthwaite potential evapotranspiration for many cells and years in one pass
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+__prog__ = 'thornthwaite_batch.py'
+__version__ = '0.0.1'
+__author__ = 's03mm5'
+
+from math import sin, tan, acos, pi, radians
+from calendar import isleap
+from numpy import asarray, zeros, unique, where, errstate, array, float64
+
+MONTHDAYS = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+LEAP_MONTHDAYS = (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+_daylight_cache = {}     # mean daylight hours for each month keyed by latitude and leap year flag
+
+def _mnthly_daylight_hours(lat, leap):
+    """
+    mean daylight hours for each month for a latitude [degrees], averaged over each day of the month
+    as for the single cell thornthwaite function - computed once per latitude so scalar maths suffices
+    """
+    month_days = LEAP_MONTHDAYS if leap else MONTHDAYS
+    tan_lat = tan(radians(lat))
+
+    dlh = []
+    doy = 1
+    for mdays in month_days:
+        cumul_dlh = 0.0
+        for daynum in range(mdays):
+            sol_dec = 0.409*sin((2.0*pi/365.0)*doy - 1.39)
+            cos_sha = -tan_lat*tan(sol_dec)
+            cumul_dlh += (24.0/pi)*acos(min(max(cos_sha, -1.0), 1.0))
+            doy += 1
+        dlh.append(cumul_dlh/mdays)
+
+    return dlh
+
+def _daylight_hours(lats, leap):
+    """
+    return mean daylight hours [cell, month] using cached values where available
+    """
+    lats_unq, inverse = unique(asarray(lats, dtype=float64), return_inverse=True)
+    for lat in lats_unq:
+        if (float(lat), leap) not in _daylight_cache:
+            _daylight_cache[(float(lat), leap)] = _mnthly_daylight_hours(float(lat), leap)
+
+    dlh_unq = array([_daylight_cache[(float(lat), leap)] for lat in lats_unq])
+
+    return dlh_unq[inverse.ravel()]
+
+def thornthwaite_batch(tmean, lats, years=None):
+    """
+    estimate Potential Evapotranspiration [mm/month] using the Thornthwaite equations
+        tmean - monthly mean temperatures [degC] shaped [cell, year, month]
+        lats  - latitude [degrees] of each cell
+        years - calendar year for each year, used to identify leap years, if None then no leap years
+    returns PET shaped [cell, year, month] and a mask shaped [cell, year] identifying years whose temperatures
+    are all at or below zero - for these, and for months whose temperature is at or below zero, PET is zero
+    """
+    tmean = asarray(tmean, dtype=float64)
+    ncells, nyears, nmnths = tmean.shape
+    if years is None:
+        leaps = [False]*nyears
+    else:
+        leaps = [isleap(int(year)) for year in years]
+
+    # mean daylight hours and days in month for each cell, year and month
+    # ====================================================================
+    dlh = zeros(tmean.shape)
+    mdays = zeros((nyears, nmnths))
+    for leap in set(leaps):
+        iyears = [iyr for iyr, flag in enumerate(leaps) if flag == leap]
+        dlh[:, iyears, :] = _daylight_hours(lats, leap)[:, None, :]
+        mdays[iyears, :] = LEAP_MONTHDAYS if leap else MONTHDAYS
+
+    # heat index accumulated month by month, then the exponent
+    # ========================================================
+    heat_indx = zeros((ncells, nyears))
+    for imnth in range(nmnths):
+        tmnth = tmean[:, :, imnth]
+        heat_indx += where(tmnth > 0.0, (where(tmnth > 0.0, tmnth, 0.0)/5.0)**1.514, 0.0)
+
+    expnt = (6.75e-07*heat_indx**3) - (7.71e-05*heat_indx**2) + (1.792e-02*heat_indx) + 0.49239
+
+    mask = heat_indx <= 0.0
+    with errstate(divide='ignore', invalid='ignore'):
+        ratio = where(tmean > 0.0, 10.0*tmean/where(mask, 1.0, heat_indx)[:, :, None], 0.0)
+        pet = 1.6*(dlh/12.0)*(mdays/30.0)*(ratio**expnt[:, :, None])*10.0     # 10 converts cm/month to mm/month
+
+    pet = where((tmean > 0.0) & ~mask[:, :, None], pet, 0.0)
+
+    return pet, mask
@@ -0,0 +1,202 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        wthr_cell_archive.py
+# Purpose:     packed weather output - one indexed container per cell holding all met files plus lta_ave.txt
+#              and AVEMET.DAT, with a random access reader and a tool to restore the directory layout
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+__prog__ = 'wthr_cell_archive.py'
+__version__ = '0.0.1'
+__author__ = 's03mm5'
+
+from os.path import join, isfile, isdir, split, getmtime
+from os import makedirs, replace, remove, scandir
+from zipfile import ZipFile, ZIP_STORED, BadZipFile
+from time import time
+from PyQt5.QtWidgets import QApplication
+
+from dir_shard_fns import cell_rel_dir, cell_parent_dirs, is_shard_name
+
+ARCHIVE_EXT = '.zip'
+OUT_FORMATS = list(['dirs', 'archive'])     # classic directory per cell or packed archive per cell
+
+ERROR_STR = '*** Error *** '
+WARN_STR = '*** Warning *** '
+
+def archive_path(clim_dir):
+    """
+    archive for a cell sits alongside where the cell directory would be e.g. Wthr/ssp126/04320_22080.zip
+    """
+    return clim_dir.rstrip('\\/') + ARCHIVE_EXT
+
+_shard_dirs_cache = {}     # scenario directory: modification time and names of its shard directories
+
+def _shard_dir_names(wthr_dir):
+    """
+    names of shard directories of a scenario directory, listed again only if the scenario directory has changed
+    """
+    try:
+        mtime = getmtime(wthr_dir)
+    except OSError:
+        return []
+
+    cached = _shard_dirs_cache.get(wthr_dir)
+    if cached is None or cached[0] != mtime:
+        names = [split(parent_dir)[1] for parent_dir in cell_parent_dirs(wthr_dir)]
+        cached = (mtime, [name for name in names if is_shard_name(name)])
+        _shard_dirs_cache[wthr_dir] = cached
+
+    return cached[1]
+
+def find_cell_rel_dir(wthr_dir, gran_coord, shard_size=0):
+    """
+    path, relative to the scenario directory, of the directory or archive of a weather cell or None if absent
+    the cell may have been written with other settings so the path for shard_size is tried first, then the flat
+    path, then any shard directory
+    """
+    for rel_dir in [cell_rel_dir(gran_coord, shard_size), gran_coord]:
+        clim_dir = join(wthr_dir, rel_dir)
+        if isdir(clim_dir) or isfile(archive_path(clim_dir)):
+            return rel_dir
+
+    for name in _shard_dir_names(wthr_dir):
+        clim_dir = join(wthr_dir, name, gran_coord)
+        if isdir(clim_dir) or isfile(archive_path(clim_dir)):
+            return join(name, gran_coord)
+
+    return None
+
+def write_cell_archive(clim_dir, file_bufs, append=False):
+    """
+    write files, a list of file name and contents pairs, to the archive for a cell - the archive is uncompressed
+    so that members can be read directly; if append is set then existing members are kept unless replaced
+    the archive is written under a temporary name so that an incomplete archive is never read
+    """
+    arc_path = archive_path(clim_dir)
+    parent_dir = split(arc_path)[0]
+    if not isdir(parent_dir):
+        makedirs(parent_dir, exist_ok=True)     # shard directory
+
+    members = {}
+    if append and isfile(arc_path):
+        with ZipFile(arc_path, 'r') as zobj:
+            for fname in zobj.namelist():
+                members[fname] = zobj.read(fname)
+
+    for fname, buffer in file_bufs:
+        members[fname] = buffer
+
+    tmp_path = arc_path + '.tmp'
+    with ZipFile(tmp_path, 'w', compression=ZIP_STORED) as zobj:
+        for fname in sorted(members):
+            zobj.writestr(fname, members[fname])
+    replace(tmp_path, arc_path)
+
+    return arc_path
+
+class WthrCellArchive(object,):
+    """
+    random access reader for the archive of a cell - the index is read on opening and each member
+    is then read with a single seek
+    """
+    def __init__(self, arc_path):
+
+        self.arc_path = arc_path
+        self.zobj = ZipFile(arc_path, 'r')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def namelist(self):
+        return self.zobj.namelist()
+
+    def __contains__(self, fname):
+        try:
+            self.zobj.getinfo(fname)
+        except KeyError:
+            return False
+
+        return True
+
+    def read(self, fname):
+        """
+        return contents of a member as bytes
+        """
+        return self.zobj.read(fname)
+
+    def read_lines(self, fname):
+        """
+        return contents of a member as a list of lines with trailing whitespace removed
+        """
+        return [line.rstrip() for line in self.read(fname).decode().splitlines()]
+
+    def close(self):
+        self.zobj.close()
+
+def list_cell_archives(wthr_dir):
+    """
+    return granular coordinates of cells held as archives in a weather directory
+    """
+    if not isdir(wthr_dir):
+        return []
+
+    return [entry.name[:-len(ARCHIVE_EXT)] for entry in scandir(wthr_dir)
+                                                    if entry.is_file() and entry.name.endswith(ARCHIVE_EXT)]
+
+def explode_cell_archive(arc_path, remove_flag=False):
+    """
+    materialise the classic directory layout for the cell whose archive is given
+    """
+    clim_dir = arc_path[:-len(ARCHIVE_EXT)]
+    if not isdir(clim_dir):
+        makedirs(clim_dir)
+
+    with ZipFile(arc_path, 'r') as zobj:
+        for fname in zobj.namelist():
+            with open(join(clim_dir, fname), 'wb') as fobj:
+                fobj.write(zobj.read(fname))
+
+    if remove_flag:
+        remove(arc_path)
+
+    return clim_dir
+
+def explode_wthr_dir(wthr_dir, remove_flag=False):
+    """
+    restore classic directory layout for all cells held as archives in a weather directory e.g. Wthr/ssp126
+    """
+    from glbl_ecsse_low_level_fns_sv import update_avemet_progress  # deferred, that module imports this one indirectly
+
+    gran_coords = list_cell_archives(wthr_dir)
+    if len(gran_coords) == 0:
+        print(WARN_STR + 'no cell archives found in ' + wthr_dir)
+        QApplication.processEvents()
+        return 0
+
+    print('Restoring {} weather cells from archives in {}'.format(len(gran_coords), wthr_dir))
+    QApplication.processEvents()
+
+    last_time = time()
+    nexploded = 0
+    for gran_coord in gran_coords:
+        arc_path = join(wthr_dir, gran_coord + ARCHIVE_EXT)
+        try:
+            explode_cell_archive(arc_path, remove_flag)
+        except (OSError, BadZipFile) as err:
+            print(ERROR_STR + 'could not restore ' + arc_path + ' - ' + str(err))
+            continue
+
+        nexploded += 1
+        last_time = update_avemet_progress(last_time, split(wthr_dir)[1], '', 'explode', nexploded)
+
+    print('\nRestored {} weather cells in {}'.format(nexploded, wthr_dir))
+    QApplication.processEvents()
+
+    return nexploded
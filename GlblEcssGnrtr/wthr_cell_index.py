@@ -0,0 +1,202 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        wthr_cell_index.py
+# Purpose:     nearest weather cell index built once from the coordinates lookup - weather cells lie on a regular
+#              grid so cells are hashed into a dense grid of buckets and a query need only search neighbouring buckets
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+__prog__ = 'wthr_cell_index.py'
+__version__ = '0.0.1'
+__author__ = 's03mm5'
+
+from os.path import join, isfile
+from os import replace
+import numpy
+
+from wthr_lookup_files import COORDS_BIN_FN, file_stamp
+
+INDEX_FN = 'coords_index.npz'
+BUCKET_SIZE = 0.5       # degrees, resolution of the weather datasets
+
+WARN_STR = '*** Warning *** '
+
+def load_cell_index(wthr_out_dir, coords_lookup):
+    """
+    return index persisted alongside the coordinates lookup file, rebuilding and saving it should it be absent
+    or older than the lookup file
+    """
+    index_fn = join(wthr_out_dir, INDEX_FN)
+    lookup_fn = join(wthr_out_dir, COORDS_BIN_FN)
+    lookup_stamp = numpy.array(file_stamp(lookup_fn), dtype=numpy.float64)
+
+    if isfile(index_fn):
+        try:
+            coords_index = WthrCellIndex.load(index_fn)
+            if numpy.array_equal(coords_index.lookup_stamp, lookup_stamp) and \
+                                                        len(coords_index) == len(coords_lookup['gran_coord']):
+                return coords_index
+        except (OSError, KeyError, ValueError) as err:
+            print(WARN_STR + 'could not read index ' + index_fn + ' - ' + str(err))
+
+    coords_index = WthrCellIndex(coords_lookup['gran_coord'], coords_lookup['Lat'], coords_lookup['Lon'])
+    coords_index.lookup_stamp = lookup_stamp
+    try:
+        coords_index.save(index_fn)
+        print('Wrote nearest weather cell index: ' + index_fn)
+    except OSError as err:
+        print(WARN_STR + 'could not write index ' + index_fn + ' - ' + str(err))
+
+    return coords_index
+
+class WthrCellIndex(object,):
+    """
+    each bucket of the dense grid holds indices of up to max_occpncy cells, unused slots are -1
+    distances are measured in degrees, as per the original brute force search
+    """
+    def __init__(self, gran_coords, lats, lons, bucket_size=BUCKET_SIZE):
+
+        self.gran_coords = numpy.array(gran_coords, dtype=str)
+        self.lats = numpy.asarray(lats, dtype=numpy.float64)
+        self.lons = numpy.asarray(lons, dtype=numpy.float64)
+        self.bucket_size = bucket_size
+        self.lookup_stamp = numpy.zeros(2, dtype=numpy.float64)
+
+        if len(self.lats) == 0:
+            self.lat0, self.lon0 = 0.0, 0.0
+            self.grid = numpy.full((1, 1, 1), -1, dtype=numpy.int32)
+            return
+
+        self.lat0 = self.lats.min()
+        self.lon0 = self.lons.min()
+        ilats, ilons = self._bucket(self.lats, self.lons)
+        nlats, nlons = ilats.max() + 1, ilons.max() + 1
+
+        # cells sharing a bucket are given successive slots
+        # =================================================
+        bucket_ids = ilats*nlons + ilons
+        order = numpy.argsort(bucket_ids, kind='stable')
+        sorted_ids = bucket_ids[order]
+        first = numpy.searchsorted(sorted_ids, sorted_ids, side='left')
+        slots = numpy.arange(len(sorted_ids)) - first
+        max_occpncy = slots.max() + 1
+
+        self.grid = numpy.full((nlats, nlons, max_occpncy), -1, dtype=numpy.int32)
+        self.grid[ilats[order], ilons[order], slots] = order
+
+    def __len__(self):
+        return len(self.gran_coords)
+
+    def _bucket(self, lats, lons):
+        """
+        C
+        """
+        ilats = numpy.floor((lats - self.lat0)/self.bucket_size).astype(numpy.int64)
+        ilons = numpy.floor((lons - self.lon0)/self.bucket_size).astype(numpy.int64)
+
+        return ilats, ilons
+
+    def nearest_indices(self, lats, lons):
+        """
+        return indices of the cells nearest to arrays of latitudes and longitudes, -1 if the index is empty
+        the square of buckets searched around each point grows, one ring of buckets at a time, until the nearest
+        cell found is closer than any cell outside the square could be
+        equidistant cells are resolved to the lowest index, as per argmin over all cells
+        """
+        lats = numpy.atleast_1d(numpy.asarray(lats, dtype=numpy.float64))
+        lons = numpy.atleast_1d(numpy.asarray(lons, dtype=numpy.float64))
+        npoints = len(lats)
+        best_indx = numpy.full(npoints, -1, dtype=numpy.int64)
+        best_dist = numpy.full(npoints, numpy.inf)
+        if len(self) == 0:
+            return best_indx
+
+        nlats, nlons, max_occpncy = self.grid.shape
+        ilats, ilons = self._bucket(lats, lons)
+        max_radius = max(nlats, nlons) + max(0, -ilats.min(), ilats.max() - nlats,
+                                                                            -ilons.min(), ilons.max() - nlons)
+
+        pending = numpy.arange(npoints)
+        radius = 0
+        while len(pending) > 0:
+            offsets = numpy.arange(-radius, radius + 1)
+            for dlat in offsets:
+                rows = ilats[pending] + dlat
+                for dlon in offsets:
+                    if max(abs(dlat), abs(dlon)) < radius:
+                        continue    # inner buckets already searched
+
+                    cols = ilons[pending] + dlon
+                    inside = (rows >= 0) & (rows < nlats) & (cols >= 0) & (cols < nlons)
+                    if not inside.any():
+                        continue
+
+                    pnts = pending[inside]
+                    cands = self.grid[rows[inside], cols[inside]]      # shape (npnts, max_occpncy)
+
+                    # slots of a bucket hold ascending indices so argmin gives the lowest of equidistant cells
+                    # =========================================================================================
+                    valid = cands >= 0
+                    cand_safe = numpy.where(valid, cands, 0)
+                    dist = (self.lats[cand_safe] - lats[pnts, None])**2 + \
+                                                                (self.lons[cand_safe] - lons[pnts, None])**2
+                    dist = numpy.where(valid, dist, numpy.inf)
+                    islot = dist.argmin(axis=1)
+                    nearest = dist[numpy.arange(len(pnts)), islot]
+                    nearest_indx = cands[numpy.arange(len(pnts)), islot]
+                    closer = (nearest < best_dist[pnts]) | \
+                                ((nearest == best_dist[pnts]) & (nearest_indx >= 0) & (nearest_indx < best_indx[pnts]))
+                    best_dist[pnts[closer]] = nearest[closer]
+                    best_indx[pnts[closer]] = nearest_indx[closer]
+
+            # a point is resolved once its nearest cell is closer than the edge of the searched square - an
+            # equidistant cell beyond the edge might have a lower index
+            # ==============================================================================================
+            if radius >= max_radius:
+                break
+            resolved = best_dist[pending] < (radius*self.bucket_size)**2
+            pending = pending[~resolved]
+            radius += 1
+
+        return best_indx
+
+    def nearest_gran_coords(self, lats, lons):
+        """
+        return granular coordinates of the cells nearest to arrays of latitudes and longitudes
+        """
+        indices = self.nearest_indices(lats, lons)
+        if len(self) == 0:
+            return numpy.full(len(indices), '', dtype=str)
+
+        return self.gran_coords[indices]
+
+    def save(self, index_fn):
+        """
+        C
+        """
+        tmp_fn = index_fn + '.tmp'
+        with open(tmp_fn, 'wb') as fobj:
+            numpy.savez(fobj, gran_coords=self.gran_coords, lats=self.lats, lons=self.lons, grid=self.grid,
+                        origin=numpy.array([self.lat0, self.lon0, self.bucket_size]), lookup_stamp=self.lookup_stamp)
+        replace(tmp_fn, index_fn)
+
+        return
+
+    @classmethod
+    def load(cls, index_fn):
+        """
+        C
+        """
+        coords_index = cls.__new__(cls)
+        with numpy.load(index_fn) as npz:
+            coords_index.gran_coords = npz['gran_coords']
+            coords_index.lats = npz['lats']
+            coords_index.lons = npz['lons']
+            coords_index.grid = npz['grid']
+            coords_index.lat0, coords_index.lon0, coords_index.bucket_size = npz['origin'].tolist()
+            coords_index.lookup_stamp = npz['lookup_stamp']
+
+        return coords_index
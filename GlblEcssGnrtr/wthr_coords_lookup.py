@@ -0,0 +1,232 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        wthr_coords_lookup.py
+# Purpose:     binary coordinates lookup of the cells of a scenario weather directory - cells are appended as they are
+#              written and the lookup is read by memory mapping; the tab separated file is exported only on demand
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+__prog__ = 'wthr_coords_lookup.py'
+__version__ = '0.0.1'
+__author__ = 's03mm5'
+
+from os.path import join, isfile, isdir, getsize
+from os import makedirs, replace
+import csv
+import numpy
+from PyQt5.QtWidgets import QApplication
+
+from wthr_tree_scan import scan_cells
+from grid_cell_keys import encode_keys, decode_keys, keys_to_gran_coords
+from wthr_lookup_files import COORDS_BIN_FN, COORDS_TSV_FN, COORDS_SYNC_FN, file_stamp, read_stamp, write_stamp
+
+GRANULARITY = 120
+
+# fixed length records of 16 bytes, little endian so that the file is portable
+# ============================================================================
+LOOKUP_DTYPE = numpy.dtype([('gran_lat', '<i4'), ('gran_lon', '<i4'), ('lat', '<f4'), ('lon', '<f4')])
+
+WARN_STR = '*** Warning *** '
+
+def _make_recs(gran_lats, gran_lons):
+    """
+    C
+    """
+    recs = numpy.empty(len(gran_lats), dtype=LOOKUP_DTYPE)
+    recs['gran_lat'] = gran_lats
+    recs['gran_lon'] = gran_lons
+    recs['lat'] = 90.0 - recs['gran_lat'] / GRANULARITY
+    recs['lon'] = recs['gran_lon'] / GRANULARITY - 180.0
+
+    return recs
+
+def read_coords_lookup(wthr_out_dir):
+    """
+    return lookup records memory mapped read only, or None if there is no lookup file
+    a partial record, left by an interrupted append, is ignored
+    """
+    lookup_fn = join(wthr_out_dir, COORDS_BIN_FN)
+    if not isfile(lookup_fn):
+        return None
+
+    nrecs = getsize(lookup_fn) // LOOKUP_DTYPE.itemsize
+    if nrecs == 0:
+        return numpy.empty(0, dtype=LOOKUP_DTYPE)
+
+    return numpy.memmap(lookup_fn, dtype=LOOKUP_DTYPE, mode='r', shape=(nrecs,))
+
+def coords_lookup_dict(recs):
+    """
+    return lookup as a dictionary of arrays keyed as per the columns of the tab separated file
+    latitudes and longitudes are recalculated from the granular coordinates at double precision
+    """
+    gran_lats = numpy.asarray(recs['gran_lat'], dtype=numpy.int64)
+    gran_lons = numpy.asarray(recs['gran_lon'], dtype=numpy.int64)
+    gran_coords = keys_to_gran_coords(encode_keys(gran_lats, gran_lons))
+
+    return {'gran_coord': gran_coords, 'Lat': 90.0 - gran_lats / GRANULARITY,
+                                                                    'Lon': gran_lons / GRANULARITY - 180.0}
+
+def _is_gran_coord(gran_coord):
+    """
+    granular coordinates comprise two integers separated by an underscore e.g. 04320_22080
+    """
+    return gran_coord.count('_') == 1 and gran_coord.replace('_', '').isdigit()
+
+def rebuild_coords_lookup(wthr_out_dir):
+    """
+    write lookup from scratch from the cells, directories or archives, of a scenario weather directory
+    only needed for weather generated before the lookup was maintained incrementally
+    returns number of cells
+    """
+    recs = []
+    for gran_coord in scan_cells(wthr_out_dir).gran_coords:
+        if not _is_gran_coord(gran_coord):
+            print(WARN_STR + 'non compliant directory found in weather directory ' + join(wthr_out_dir, gran_coord))
+            QApplication.processEvents()
+            continue
+
+        recs.append([int(val) for val in gran_coord.split('_')])
+
+    recs = numpy.array(recs, dtype=numpy.int64).reshape(-1, 2)
+    lookup_fn = join(wthr_out_dir, COORDS_BIN_FN)
+    with open(lookup_fn + '.tmp', 'wb') as fobj:
+        fobj.write(_make_recs(recs[:, 0], recs[:, 1]).tobytes())
+    replace(lookup_fn + '.tmp', lookup_fn)
+
+    return len(recs)
+
+def sync_coords_lookup(wthr_out_dir):
+    """
+    append to the binary lookup any cells of the tab separated file which it lacks - the tab separated file may
+    have been written by earlier versions, or the binary lookup may have been seeded from an incomplete tree, so
+    the binary lookup must never be taken as complete until merged
+    the merge is skipped if the tab separated file is unchanged since it was last merged or exported
+    returns number of cells appended
+    """
+    tsv_fn = join(wthr_out_dir, COORDS_TSV_FN)
+    lookup_fn = join(wthr_out_dir, COORDS_BIN_FN)
+    sync_fn = join(wthr_out_dir, COORDS_SYNC_FN)
+    if not isfile(tsv_fn) or not isfile(lookup_fn):
+        return 0
+
+    tsv_stamp = file_stamp(tsv_fn)
+    if read_stamp(sync_fn) == tsv_stamp:
+        return 0
+
+    with open(tsv_fn, 'r', newline='') as fobj:
+        gran_coords = [row['gran_coord'] for row in csv.DictReader(fobj, delimiter='\t')
+                                                                    if _is_gran_coord(row.get('gran_coord') or '')]
+    nadded = 0
+    if len(gran_coords) > 0:
+        writer = CoordsLookupWriter(wthr_out_dir, sync_flag=False)
+        for gran_coord in gran_coords:
+            gran_lat, gran_lon = gran_coord.split('_')
+            writer.add(encode_keys(int(gran_lat), int(gran_lon)))
+        writer.close()
+        nadded = writer.nadded
+
+    write_stamp(sync_fn, tsv_stamp)
+
+    return nadded
+
+def seed_coords_lookup(wthr_out_dir):
+    """
+    ensure the binary lookup exists and holds every cell known from the tree and from the tab separated file
+    returns number of cells appended
+    """
+    nadded = 0
+    if read_coords_lookup(wthr_out_dir) is None:
+        nadded += rebuild_coords_lookup(wthr_out_dir)
+
+    return nadded + sync_coords_lookup(wthr_out_dir)
+
+def export_coords_tsv(wthr_out_dir):
+    """
+    write tab separated lookup file from the binary lookup, which must first have been synchronised with any
+    existing tab separated file, see sync_coords_lookup
+    """
+    recs = read_coords_lookup(wthr_out_dir)
+    if recs is None:
+        return None
+
+    coords_lookup = coords_lookup_dict(recs)
+    tsv_fn = join(wthr_out_dir, COORDS_TSV_FN)
+    with open(tsv_fn, 'w') as fobj:
+        fobj.write('gran_coord\tLat\tLon\n')
+        for gran_coord, lat, lon in zip(coords_lookup['gran_coord'].tolist(), coords_lookup['Lat'].tolist(),
+                                                                                    coords_lookup['Lon'].tolist()):
+            fobj.write('{}\t{}\t{}\n'.format(gran_coord, lat, lon))
+
+    write_stamp(join(wthr_out_dir, COORDS_SYNC_FN), file_stamp(tsv_fn))   # nothing to merge from this file
+
+    return tsv_fn
+
+class CoordsLookupWriter(object,):
+    """
+    appends cells to the binary lookup - cells already present are ignored so that resumed or repeated
+    runs do not create duplicates
+    unless sync_flag is False, a missing lookup is first seeded from the tree and the tab separated file so that
+    cells written by earlier runs are not lost
+    """
+    def __init__(self, wthr_out_dir, sync_flag=True):
+
+        if not isdir(wthr_out_dir):
+            makedirs(wthr_out_dir)
+
+        if sync_flag:
+            seed_coords_lookup(wthr_out_dir)
+
+        self.lookup_fn = join(wthr_out_dir, COORDS_BIN_FN)
+        self.pending = []
+        self.nadded = 0
+
+        recs = read_coords_lookup(wthr_out_dir)
+        if recs is None:
+            self.known = set()
+        else:
+            self.known = set(encode_keys(recs['gran_lat'], recs['gran_lon']).tolist())
+            del recs
+
+            # drop any partial record so that appended records stay aligned
+            # ==============================================================
+            nbytes = getsize(self.lookup_fn)
+            if nbytes % LOOKUP_DTYPE.itemsize != 0:
+                with open(self.lookup_fn, 'r+b') as fobj:
+                    fobj.truncate(nbytes - nbytes % LOOKUP_DTYPE.itemsize)
+
+        self.fobj = open(self.lookup_fn, 'ab')
+
+    def add(self, cell_key):
+        """
+        cell is identified by its packed key, see grid_cell_keys
+        """
+        cell_key = int(cell_key)
+        if cell_key not in self.known:
+            self.known.add(cell_key)
+            self.pending.append(cell_key)
+
+        return
+
+    def flush(self):
+        """
+        append pending cells
+        """
+        if len(self.pending) > 0:
+            gran_lats, gran_lons = decode_keys(self.pending)
+            self.fobj.write(_make_recs(gran_lats, gran_lons).tobytes())
+            self.nadded += len(self.pending)
+            self.pending = []
+        self.fobj.flush()
+
+        return
+
+    def close(self):
+        """
+        C
+        """
+        self.flush()
+        self.fobj.close()
@@ -22,11 +22,23 @@ from PyQt5.QtWidgets import QApplication
 from getClimGenNC_ltd import ClimGenNC
 from getClimGenFns_ss import (genLocalGrid, fetch_wthr_dset_overlap, join_hist_fut_to_all_wthr)
 from glbl_ecsse_low_level_fns_sv import update_wthr_progress, update_avemet_progress
-from prepare_ecosse_low_level import fetch_long_term_ave_wthr_recs, make_met_files
+from prepare_ecosse_low_level import fetch_long_term_ave_wthr_recs
+from prepare_ecosse_files_ss import make_met_files
 from hwsd_soil_class import _gran_coords_from_lat_lon as gran_coords_from_lat_lon
 from weather_datasets import write_csv_wthr_file
-
-from thornthwaite import thornthwaite
+from wthr_parallel_fns import open_met_pool, make_wthr_files_parallel
+from wthr_writer_queue import open_met_writer
+from wthr_cell_archive import (OUT_FORMATS, archive_path, write_cell_archive, explode_wthr_dir, WthrCellArchive,
+                                                                                            find_cell_rel_dir)
+from dir_shard_fns import cell_rel_dir, cell_parent_dirs
+from wthr_tree_scan import scan_cells
+from wthr_cell_index import load_cell_index
+from grid_cell_keys import key_to_gran_coord, decode_keys
+from wthr_coords_lookup import read_coords_lookup, seed_coords_lookup, export_coords_tsv, coords_lookup_dict
+from wthr_run_journal import open_run_journal
+from hist_met_store import open_hist_store
+
+from thornthwaite_batch import thornthwaite_batch
 
 ERROR_STR = '*** Error *** '
 WARN_STR = '*** Warning *** '
@@ -48,41 +60,57 @@ def make_wthr_coords_lookup(form):
     fut_clim_scen = form.combo10.currentText()
 
     wthr_out_dir = join(form.settings['prj_drive'], prjct, 'Wthr', fut_clim_scen)
+    _write_wthr_coords_lookup(wthr_out_dir)
+
+    return
+
+def _write_wthr_coords_lookup(wthr_out_dir):
+    """
+    export tab separated lookup of granular coordinates, latitudes and longitudes of cells in a scenario weather
+    directory from the binary lookup which is maintained as cells are generated
+    """
     if not isdir(wthr_out_dir):
         makedirs(wthr_out_dir)
 
-    num_sims = 0
-    subdirs_raw = None
-    for directory, subdirs_raw, files in walk(wthr_out_dir):
-        num_sims = len(subdirs_raw)
-        break
+    # weather generated before the binary lookup was introduced - cells may be held in shard directories
+    # and also as archives; only names are required so cells are not listed. Cells of an existing tab separated
+    # file are merged so that exporting cannot lose them
+    # ==========================================================================================================
+    ncells = seed_coords_lookup(wthr_out_dir)
+    if ncells > 0:
+        print('Added {} cells to binary coordinates lookup under path {}'.format(ncells, wthr_out_dir))
+        QApplication.processEvents()
 
-    if num_sims == 0 or subdirs_raw is None:
-        print(WARN_STR + 'no sub-directories under path ' + wthr_out_dir)
+    recs = read_coords_lookup(wthr_out_dir)
+    if len(recs) == 0:
+        print(WARN_STR + 'no sub-directories or cell archives under path ' + wthr_out_dir)
         QApplication.processEvents()
         return
 
-    # ===============================================================
-    recs = []
-    for gran_coord in subdirs_raw:
-        if gran_coord.find('_') == -1:
-            print(WARN_STR + 'non compliant directory found in weather directory ' + join(wthr_out_dir, gran_coord))
-            QApplication.processEvents()
-        else:
-            gran_lat, gran_lon = gran_coord.split('_')
-            lat = 90.0 - int(gran_lat) / GRANULARITY
-            lon = (int(gran_lon) / GRANULARITY) - 180.0
-            recs.append([gran_coord, lat, lon])
-
     # write coords file
     # =================
-    coords_fn = join(wthr_out_dir, 'coords_lookup.csv')
-    df = DataFrame(recs, columns=['gran_coord', 'Lat', 'Lon'])
-    df.to_csv(coords_fn, sep='\t', index=False)
+    coords_fn = export_coords_tsv(wthr_out_dir)
     mess = 'Wrote coordinates lookup file: ' + coords_fn
     print(mess)
     QApplication.processEvents()
 
+    load_cell_index(wthr_out_dir, coords_lookup_dict(recs))     # ensures nearest cell index is current
+    QApplication.processEvents()
+
+    return
+
+def explode_wthr_archives(form):
+    """
+    restore classic directory layout, as required by ECOSSE, for cells of the selected project and scenario
+    which have been written as archives
+    """
+    prjct = form.w_combo00s.currentText()
+    fut_clim_scen = form.combo10.currentText()
+
+    wthr_out_dir = join(form.settings['prj_drive'], prjct, 'Wthr', fut_clim_scen)
+    for parent_dir in cell_parent_dirs(wthr_out_dir):
+        explode_wthr_dir(parent_dir)
+
     return
 
 def generate_all_weather(form):
@@ -119,8 +147,6 @@ def generate_all_weather(form):
     # ======================================================
     scnr = form.combo10.currentText()
     climgen = ClimGenNC(form, scnr)
-    sim_start_year = climgen.sim_start_year
-    sim_end_year = climgen.sim_end_year
 
     # development only
     # ================
@@ -135,132 +161,376 @@ def generate_all_weather(form):
     # =======================================================
     print('')    
     last_time = time()
-    num_band = -999
-    write_csv_wthr_flag = False
+    nwrttn = 0
+    site_obj = MakeSiteObj(form, climgen)
 
     print('Getting historic weather data from weather set: ' + hist_wthr_set['ds_precip'])
+    print('Getting future data from weather set: ' + this_gcm + '\tScenario: ' + scnr)
     QApplication.processEvents()
 
-    pettmp_hist = climgen.fetch_cru_historic_NC_data(aoi_indices_hist, num_band, max_cells)
-    if pettmp_hist is None:
-        print('\nHistorical data retrieval failed from weather set: ' + 'CRU' + '\tScenario: ' + scnr)
+    # journal of completed cells and bands identified by the weather sets and AOI
+    # ===========================================================================
+    run_key = '_'.join([this_gcm, scnr] + [str(val) for val in bbox_aoi])
+    site_obj.journal = open_run_journal(form, site_obj, run_key)
+    site_obj.hist_store = open_hist_store(form, site_obj.wthr_prj_dir)
+
+    met_pool = open_met_pool(form)
+    if met_pool is None:
+        site_obj.met_writer = open_met_writer(form, site_obj.hist_store)   # writer threads only apply to serial path
+    try:
+        nwrttn, last_time = _generate_aoi_weather(form, climgen, site_obj, this_gcm, bbox_aoi, bbox_wthr,
+                                            hist_wthr_set, fut_wthr_set, aoi_indices_hist, aoi_indices_fut,
+                                                                        max_cells, nwrttn, last_time, met_pool)
+    finally:
+        if met_pool is not None:
+            met_pool.shutdown()
+        try:
+            site_obj.journal.commit(writer=site_obj.met_writer)
+        finally:
+            site_obj.journal.close()
+            if site_obj.journal.nskipped > 0:
+                print('\nSkipped {} cells completed by a previous run'.format(site_obj.journal.nskipped))
+            if site_obj.met_writer is not None:
+                met_writer, site_obj.met_writer = site_obj.met_writer, None
+                nerrors = met_writer.close()
+                print('\n' + met_writer.report())
+                if nerrors > 0:
+                    print(ERROR_STR + '{} cells could not be written'.format(nerrors))
+        if site_obj.hist_store is not None and met_pool is None:
+            print(site_obj.hist_store.report())
+
+    if nwrttn < 0:
+        return -1
+
+    # cells have been appended to the binary coords lookup as they were written, the TSV is exported on demand
+    # ========================================================================================================
+    ncells = len(read_coords_lookup(site_obj.wthr_prj_dir))
+    print('Coordinates lookup has {} cells, {} added by this run'.format(ncells, site_obj.journal.coords_writer.nadded))
+    if climgen.tile_cache is not None:
+        print(climgen.tile_cache.report())
+
+    mess = 'Completed weather set: ' + this_gcm + '\tScenario: ' + scnr + '\n'   
+    print(mess)
+
+    print('Finished weather generation - total number of sets written: {}'.format(nwrttn))
+
+    return
+
+def generate_all_scenarios(form):
+    """
+    generate weather for every future dataset, i.e. each GCM and SSP, linked to the weather resource
+    historic weather is read once, for each latitude band if streaming, and joined to each future dataset in turn
+    """
+    lon_ll_aoi = float(form.w_ll_lon.text())
+    lat_ll_aoi = float(form.w_ll_lat.text())
+    lon_ur_aoi = float(form.w_ur_lon.text())
+    lat_ur_aoi = float(form.w_ur_lat.text())
+    bbox_aoi = list([lon_ll_aoi, lat_ll_aoi, lon_ur_aoi, lat_ur_aoi])
+
+    max_cells = int(form.w_max_sims.text())
+
+    wthr_set_nms = form.weather_set_linkages['EFISCEN-ISIMIP']
+    hist_wthr_set = form.weather_sets[wthr_set_nms[0]]
+    fut_wthr_set_nms = [wthr_set_nm for wthr_set_nm in wthr_set_nms[1:] if wthr_set_nm in form.weather_sets]
+    if len(fut_wthr_set_nms) == 0:
+        print(WARN_STR + 'no future weather datasets found for weather resource EFISCEN-ISIMIP')
         QApplication.processEvents()
         return -1
 
-    print('\nGetting future data from weather set: ' + this_gcm + '\tScenario: ' + scnr)
+    # scenario names suffice for output directories unless there is more than one GCM
+    # ================================================================================
+    gcms = set([wthr_set_nm.split('_')[0] for wthr_set_nm in fut_wthr_set_nms])
+    bbox_wthr = _common_wthr_overlap(hist_wthr_set, [form.weather_sets[nm] for nm in fut_wthr_set_nms])
+
+    scnr_runs = []
+    for fut_wthr_set_nm in fut_wthr_set_nms:
+        this_gcm, scnr = fut_wthr_set_nm.split('_')[0], fut_wthr_set_nm.split('_')[-1]
+        fut_clim_scen = scnr if len(gcms) == 1 else fut_wthr_set_nm
+        climgen = ClimGenNC(form, fut_clim_scen, fut_wthr_set_nm)
+        if not hasattr(climgen, 'fut_wthr_set_defn'):
+            continue
+
+        site_obj = MakeSiteObj(form, climgen)
+        run_key = '_'.join([this_gcm, scnr] + [str(val) for val in bbox_aoi])
+        site_obj.journal = open_run_journal(form, site_obj, run_key)
+        scnr_runs.append({'climgen': climgen, 'site_obj': site_obj, 'this_gcm': this_gcm, 'nwrttn': 0,
+                                                                    'fut_wthr_set': form.weather_sets[fut_wthr_set_nm]})
+
+    if len(scnr_runs) == 0:
+        return -1
+
+    # historic weather is read with the scenario whose simulation starts latest so that it serves all scenarios
+    # =========================================================================================================
+    climgen_hist = max([scnr_run['climgen'] for scnr_run in scnr_runs], key=lambda clmgn: clmgn.sim_start_year)
+    aoi_indices_hist = genLocalGrid(hist_wthr_set, bbox_wthr, bbox_aoi)
+    print('\nGenerating weather for {} future datasets: {}'.format(len(scnr_runs), ', '.join(fut_wthr_set_nms)))
+    print('Getting historic weather data from weather set: ' + hist_wthr_set['ds_precip'])
     QApplication.processEvents()
 
+    # one store of historic met files serves all scenarios since the scenario directories share a parent
+    # ===================================================================================================
+    hist_store = open_hist_store(form, climgen_hist.wthr_out_dir)
+
+    last_time = time()
+    met_pool = open_met_pool(form)
+    met_writer = None
+    if met_pool is None:
+        met_writer = open_met_writer(form, hist_store)     # writer threads only apply to the serial path
+    for scnr_run in scnr_runs:
+        scnr_run['site_obj'].met_writer = met_writer
+        scnr_run['site_obj'].hist_store = hist_store
+    try:
+        if form.w_strm_bands.isChecked():
+            strt_band = int(form.w_strt_band.text())
+            end_band = int(form.w_end_band.text())
+            wthr_bands = _fetch_wthr_bands(hist_wthr_set, aoi_indices_hist, strt_band, end_band)
+            print('Will process {} latitude bands from band {} to {}'.format(len(wthr_bands), strt_band, end_band))
+            QApplication.processEvents()
+        else:
+            wthr_bands = [(-999, None)]
+
+        for num_band, lat_band in wthr_bands:
+            band_runs = [scnr_run for scnr_run in scnr_runs if 0 <= scnr_run['nwrttn'] < max_cells
+                                                    and not scnr_run['site_obj'].journal.band_complete(num_band)]
+            if len(band_runs) == 0:
+                continue
+
+            if lat_band is None:
+                bbox_band = bbox_aoi
+            else:
+                bbox_band = list([bbox_aoi[0], lat_band, bbox_aoi[2], lat_band])
+            aoi_indices_hist = genLocalGrid(hist_wthr_set, bbox_wthr, bbox_band)
+            wthr_hist = climgen_hist.fetch_cru_historic_NC_data(aoi_indices_hist, num_band, max_cells)
+            if wthr_hist is None:
+                print('\nHistorical data retrieval failed for band {}'.format(num_band))
+                QApplication.processEvents()
+                break
+
+            for scnr_run in band_runs:
+                site_obj = scnr_run['site_obj']
+                aoi_indices_fut = genLocalGrid(scnr_run['fut_wthr_set'], bbox_wthr, bbox_band)
+                scnr_run['nwrttn'], last_time = _generate_band_weather(form, scnr_run['climgen'], site_obj,
+                                        scnr_run['this_gcm'], aoi_indices_hist, aoi_indices_fut, num_band, max_cells,
+                                                            scnr_run['nwrttn'], last_time, met_pool, wthr_hist)
+                if 0 <= scnr_run['nwrttn'] < max_cells and lat_band is not None:
+                    site_obj.journal.commit(num_band, met_writer)
+
+            wthr_hist = None    # release historic weather of this band
+    finally:
+        if met_pool is not None:
+            met_pool.shutdown()
+        try:
+            for scnr_run in scnr_runs:
+                scnr_run['site_obj'].journal.commit(writer=met_writer)
+        finally:
+            for scnr_run in scnr_runs:
+                scnr_run['site_obj'].journal.close()
+            if met_writer is not None:
+                nerrors = met_writer.close()
+                print('\n' + met_writer.report())
+                if nerrors > 0:
+                    print(ERROR_STR + '{} cells could not be written'.format(nerrors))
+        if hist_store is not None and met_pool is None:
+            print(hist_store.report())
+
+    # cells have been appended to the binary coords lookup of each scenario as they were written
+    # ===========================================================================================
+    nwrttn = 0
+    for scnr_run in scnr_runs:
+        climgen = scnr_run['climgen']
+        if scnr_run['nwrttn'] < 0:
+            print(WARN_STR + 'weather generation failed for: ' + scnr_run['this_gcm'] + '\tScenario: ' +
+                                                                                            climgen.fut_clim_scen)
+            continue
+
+        nwrttn += scnr_run['nwrttn']
+        print('Completed weather set: ' + scnr_run['this_gcm'] + '\tScenario: ' + climgen.fut_clim_scen +
+                                                                    '\tcells written: {}'.format(scnr_run['nwrttn']))
+    if climgen_hist.tile_cache is not None:
+        print(climgen_hist.tile_cache.report())
+
+    print('Finished weather generation for all scenarios - total number of sets written: {}'.format(nwrttn))
+
+    return
+
+def _common_wthr_overlap(hist_wthr_set, fut_wthr_sets):
+    """
+    return overlap of the historic weather set with all future weather sets
+    """
+    lon_ll, lat_ll, lon_ur, lat_ur = fetch_wthr_dset_overlap(hist_wthr_set, fut_wthr_sets[0])
+    for fut_wthr_set in fut_wthr_sets[1:]:
+        lon_ll, lat_ll, lon_ur, lat_ur = fetch_wthr_dset_overlap({'lon_ll': lon_ll, 'lat_ll': lat_ll,
+                                                        'lon_ur': lon_ur, 'lat_ur': lat_ur}, fut_wthr_set)
+
+    return lon_ll, lat_ll, lon_ur, lat_ur
+
+def _generate_aoi_weather(form, climgen, site_obj, this_gcm, bbox_aoi, bbox_wthr, hist_wthr_set, fut_wthr_set,
+                                        aoi_indices_hist, aoi_indices_fut, max_cells, nwrttn, last_time, met_pool):
+    """
+    generate weather for the AOI either in one step or one latitude band at a time
+    """
+    if form.w_strm_bands.isChecked():
+
+        # stream the AOI one latitude band at a time so that peak memory is bounded by the band size
+        # ==========================================================================================
+        strt_band = int(form.w_strt_band.text())
+        end_band = int(form.w_end_band.text())
+        wthr_bands = _fetch_wthr_bands(hist_wthr_set, aoi_indices_hist, strt_band, end_band)
+        print('Will process {} latitude bands from band {} to {}'.format(len(wthr_bands), strt_band, end_band))
+        QApplication.processEvents()
+
+        for num_band, lat_band in wthr_bands:
+            if site_obj.journal.band_complete(num_band):
+                continue    # completed by a previous run
+
+            bbox_band = list([bbox_aoi[0], lat_band, bbox_aoi[2], lat_band])
+            aoi_indices_fut = genLocalGrid(fut_wthr_set, bbox_wthr, bbox_band)
+            aoi_indices_hist = genLocalGrid(hist_wthr_set, bbox_wthr, bbox_band)
+
+            nwrttn, last_time = _generate_band_weather(form, climgen, site_obj, this_gcm, aoi_indices_hist,
+                                            aoi_indices_fut, num_band, max_cells, nwrttn, last_time, met_pool)
+            if nwrttn < 0 or nwrttn >= max_cells:
+                break
+
+            site_obj.journal.commit(num_band, site_obj.met_writer)     # all cells of this band are now on disk
+    else:
+        num_band = -999
+        nwrttn, last_time = _generate_band_weather(form, climgen, site_obj, this_gcm, aoi_indices_hist,
+                                            aoi_indices_fut, num_band, max_cells, nwrttn, last_time, met_pool)
+
+    return nwrttn, last_time
+
+def _fetch_wthr_bands(wthr_set, aoi_indices, strt_band, end_band):
+    """
+    return band numbers and latitudes of weather grid rows which lie within the AOI and the requested bands
+    bands are numbered from the north pole in steps of the weather dataset latitude resolution
+    """
+    resol_lat = abs(wthr_set['resol_lat'])
+    lat_indx_min, lat_indx_max = aoi_indices[:2]
+
+    wthr_bands = []
+    for lat in wthr_set['latitudes'][lat_indx_min:lat_indx_max + 1]:
+        num_band = int((90.0 - lat)/resol_lat)
+        if strt_band <= num_band <= end_band:
+            wthr_bands.append((num_band, lat))
+
+    return sorted(wthr_bands)
+
+def _generate_band_weather(form, climgen, site_obj, this_gcm, aoi_indices_hist, aoi_indices_fut, num_band,
+                                                    max_cells, nwrttn, last_time, met_pool=None, wthr_hist=None):
+    """
+    read historic and future weather for a block of cells, join them then write met files, using the process
+    pool if supplied - historic weather is only read if not supplied
+    returns updated number of cells written, or -1 if weather could not be retrieved, and progress time
+    """
+    write_csv_wthr_flag = False
+    study = form.w_combo00s.currentText()
+    scnr = climgen.fut_clim_scen
+
+    if wthr_hist is None:
+        wthr_hist = climgen.fetch_cru_historic_NC_data(aoi_indices_hist, num_band, max_cells - nwrttn)
+    if wthr_hist is None:
+        print('\nHistorical data retrieval failed from weather set: ' + 'CRU' + '\tScenario: ' + scnr)
+        QApplication.processEvents()
+        return -1, last_time
+
     #      =============================
     dset_strt_yr = climgen.fut_wthr_set_defn['year_start']
     dset_end_yr = climgen.fut_wthr_set_defn['year_end']
     nmnths = (dset_end_yr - dset_strt_yr + 1) * 12
-    pettmp_fut = climgen.fetch_isimip_NC_data(aoi_indices_fut, dset_strt_yr, nmnths, max_cells)
-    if pettmp_fut is None:
+    wthr_fut = climgen.fetch_isimip_NC_data(aoi_indices_fut, dset_strt_yr, nmnths, max_cells - nwrttn)
+    if wthr_fut is None:
         print('\nFuture data retrieval failed from weather set: ' + this_gcm + '\tScenario: ' + scnr)
         QApplication.processEvents()
+        return -1, last_time
+
+    mess = 'Weather arrays for band {} occupy {} MB'.format(num_band,
+                                                           round((wthr_hist.nbytes + wthr_fut.nbytes)/1.0e6, 1))
+    form.lgr.info(mess)
+
+    # historic and future cells are paired, and unmatched cells reported, by the join
+    # ================================================================================
+    wthr_all = join_hist_fut_to_all_wthr(climgen, wthr_hist, wthr_fut)
+    if wthr_all is None:
+        return -1, last_time
 
-    keys_hist = list(pettmp_hist['precipitation'].keys())
-    keys_fut = list(pettmp_fut['precipitation'].keys())
-    keys_hist, keys_fut = _check_and_sync_keys(keys_fut, keys_hist)
-    
-    pettmp_all = join_hist_fut_to_all_wthr(climgen, pettmp_hist, pettmp_fut)
+    if met_pool is not None:
+        return make_wthr_files_parallel(met_pool, site_obj, wthr_all, num_band, max_cells, nwrttn, last_time)
 
     # create weather
     # ==============
-    nwrttn = 0    
-    site_obj = MakeSiteObj(form, climgen)
-    for gran_coord in keys_hist:
-        
-        if gran_coord in pettmp_fut['precipitation']:
-            lat, lon = pettmp_hist['lat_lons'][gran_coord]
-            clim_dir = make_wthr_files(site_obj, lat, gran_coord, climgen, pettmp_hist, pettmp_all)
+    for cell_key in wthr_all.cell_keys().tolist():
+
+        if cell_key in wthr_fut:
+            if site_obj.journal is not None and site_obj.journal.cell_complete(cell_key):
+                continue
+
+            lat, lon = wthr_hist.lat_lon(cell_key)
+            clim_dir = make_wthr_files(site_obj, lat, cell_key, climgen, wthr_hist, wthr_all)
+            if site_obj.journal is not None and clim_dir is not None:
+                site_obj.journal.add_cell(cell_key, clim_dir, site_obj.met_writer is not None)
             if write_csv_wthr_flag:
-                write_csv_wthr_file(form.lgr, study, this_gcm, scnr, lat, lon, sim_start_year, sim_end_year,
-                        pettmp_fut['precipitation'][gran_coord], pettmp_fut['temperature'][gran_coord], clim_dir)
+                write_csv_wthr_file(form.lgr, study, this_gcm, scnr, lat, lon, climgen.sim_start_year,
+                                    climgen.sim_end_year, wthr_fut.series('precipitation', cell_key).tolist(),
+                                    wthr_fut.series('temperature', cell_key).tolist(), clim_dir)
             nwrttn += 1
             if nwrttn >= max_cells:
                 print('\nFinished checking after {} cells completed'.format(nwrttn))
                 QApplication.processEvents()
                 break
 
-        last_time = update_wthr_progress(last_time, nwrttn)
+        new_time = update_wthr_progress(last_time, nwrttn)
+        if new_time != last_time and site_obj.met_writer is not None:
+            print('\t' + site_obj.met_writer.report())
+        last_time = new_time
 
-    # write coords file
-    # =================
-    make_wthr_coords_lookup(form)
-    mess = 'Completed weather set: ' + this_gcm + '\tScenario: ' + scnr + '\n'   
-    print(mess)
-
-    print('Finished weather generation - total number of sets written: {}'.format(nwrttn))
+    return nwrttn, last_time
 
-    return
-
-def _check_and_sync_keys(keys_fut, keys_hist):
-    """
-    check future first, then historic
-    """
-    not_in_fut = []
-    new_keys_hist = []
-    for key in keys_hist:
-        if key in keys_fut:
-            new_keys_hist.append(key)
-        else:
-            not_in_fut.append(key)
-
-    not_in_hist = []
-    new_keys_fut = []
-    for key in keys_fut:
-        if key in keys_hist:
-            new_keys_fut.append(key)
-        else:
-            not_in_hist.append(key)
-
-    # ======= report =========
-    if len(not_in_fut) > 0:
-        print('keys not in future: {}'.format(not_in_fut))
-        
-    if len(not_in_hist) > 0:
-        print('keys not in history: {}'.format(not_in_hist))
-    
-    QApplication.processEvents()
-
-    return new_keys_hist, new_keys_fut
-
-def make_avemet_file(clim_dir, lta_precip, lta_pet, lta_tmean):
+def make_avemet_file(clim_dir, lta_precip, lta_pet, lta_tmean, archive_flag=False):
     """
     will be copied
+    if archive_flag is set then AVEMET.DAT is added to the archive for the cell
+    lines are terminated by carriage return line feed whether written to a directory or an archive
     """
-    avemet_dat = join(clim_dir, 'AVEMET.DAT')
-    with open(avemet_dat, 'w') as fobj:
-        for imnth, (precip, pet, tmean) in enumerate(zip(lta_precip, lta_pet, lta_tmean)):
-            fobj.write('{} {} {} {}\n'.format(imnth + 1, precip, pet, tmean))
+    lines = ''
+    for imnth, (precip, pet, tmean) in enumerate(zip(lta_precip, lta_pet, lta_tmean)):
+        lines += '{} {} {} {}\r\n'.format(imnth + 1, precip, pet, tmean)
+
+    if archive_flag:
+        write_cell_archive(clim_dir, [('AVEMET.DAT', lines.encode())], append=True)
+    else:
+        avemet_dat = join(clim_dir, 'AVEMET.DAT')
+        with open(avemet_dat, 'wb') as fobj:
+            fobj.write(lines.encode())
 
     return
 
-def make_wthr_files(site, lat, gran_coord, climgen, pettmp_hist, pettmp_all):
+def make_wthr_files(site, lat, cell_key, climgen, wthr_hist, wthr_all):
     """
     generate ECOSSE historic and future weather data
+    wthr_hist is a GriddedWeather object and wthr_all a WthrTimeline, cell_key is a packed key of the cell
     """
-    clim_dir = normpath(join(site.wthr_prj_dir, gran_coord))
+    gran_coord = key_to_gran_coord(cell_key)    # names the weather directory
+    clim_dir = normpath(join(site.wthr_prj_dir, cell_rel_dir(gran_coord, site.shard_size)))
 
-    if pettmp_hist is None:
+    if wthr_hist is None:
         return
 
-    gran_lon = gran_coord.split('_')[1]
+    gran_lon = decode_keys(cell_key)[1]
     lon = (int(gran_lon) / GRANULARITY) - 180.0
     mess = 'granular coord {} with lat/lon: {} {}\t'.format(gran_coord, lat, lon)
 
-    if gran_coord not in pettmp_hist['precipitation']:
+    if cell_key not in wthr_hist:
         print(WARN_STR + mess + 'not in historic weather')
         QApplication.processEvents()
         return
 
-    if gran_coord not in pettmp_all['precipitation']:
+    if cell_key not in wthr_all:
         print(WARN_STR + mess + 'not in simulation weather')
         QApplication.processEvents()
         return
 
-    if not isdir(clim_dir):
+    if site.wthr_out_format != 'archive' and not isdir(clim_dir):
         makedirs(clim_dir)  # only create if weather data all present
 
     # calculate historic average weather
@@ -272,14 +542,13 @@ def make_wthr_files(site, lat, gran_coord, climgen, pettmp_hist, pettmp_all):
     '''
     # write a single set of met files for all simulations for this grid cell
     # ======================================================================
-    pettmp_all_site = {'precip': pettmp_all['precipitation'][gran_coord], 'tas': pettmp_all['temperature'][gran_coord]}
-
-    year_start = climgen.hist_wthr_set_defn['year_start']
-    met_fnames = make_met_files(clim_dir, lat, climgen, pettmp_all_site, year_start)  # all weather
+    met_fnames = make_met_files(clim_dir, lat, climgen, wthr_all, cell_key, site.met_writer,
+                                        site.wthr_out_format, site.hist_store, site.ave_periods)  # all weather
     nmet_fns = len(met_fnames)
 
-    # create additional weather related files from already existing met files
-    # =======================================================================
+    # additional weather related files are now written by make_met_files from the weather held in memory
+    # rather than from already existing met files
+    # ===================================================================================================
     '''
     irc = climgen.create_FutureAverages(clim_dir, lat, gran_coord, site, hist_lta_precip, hist_lta_tmean)
     if irc == 0:
@@ -301,13 +570,19 @@ def _check_wthr_cell_exstnc(sims_dir, climgen, lat, lon, read_lta_flag=False):
     check existence and integrity of weather cell
     allowable criteria are 1) a full set of weather files, namely 300 met files e.g. met2014s.txt, lta_ave.txt and AVEMET.DAT
                            2) an empty directory
+    the weather files may be held either in a directory or in an archive for the cell, in a flat or sharded layout
     """
     integrity_flag = False
     hist_lta_recs = None
     met_fnames = None
     gran_lat, gran_lon = gran_coords_from_lat_lon(lat, lon)
     gran_coord = '{0:0=5g}_{1:0=5g}'.format(gran_lat, gran_lon)
-    clim_dir = normpath(join(sims_dir, climgen.region_wthr_dir, gran_coord))
+    wthr_dir = normpath(join(sims_dir, climgen.region_wthr_dir))
+    wthr_cell_rel_dir = find_cell_rel_dir(wthr_dir, gran_coord, climgen.shard_size)
+    if wthr_cell_rel_dir is None:
+        return integrity_flag, hist_lta_recs, met_fnames
+
+    clim_dir = join(wthr_dir, wthr_cell_rel_dir)
     if isdir(clim_dir):
         fns = listdir(clim_dir)
         nfiles = len(fns)
@@ -328,6 +603,16 @@ def _check_wthr_cell_exstnc(sims_dir, climgen, lat, lon, read_lta_flag=False):
                     integrity_flag = True
                     met_fnames = fns[2:]
 
+    elif isfile(archive_path(clim_dir)):
+        with WthrCellArchive(archive_path(clim_dir)) as wthr_arc:
+            fns = wthr_arc.namelist()
+            if len(fns) >= 302 and LTA_RECS_FN in wthr_arc:
+                if read_lta_flag:
+                    hist_lta_recs = wthr_arc.read_lines(LTA_RECS_FN)
+
+                integrity_flag = True
+                met_fnames = [fn for fn in fns if fn.startswith('met')]
+
     return integrity_flag, hist_lta_recs, met_fnames
 
 def write_avemet_files(form):
@@ -362,41 +647,51 @@ def write_avemet_files(form):
                 print(clim_dir + ' *** does not exist ***')
                 break
 
-            # step through each directory comprising ECOSSE met files
-            # =======================================================
+            # scan cell directories and archives in parallel - listing of a cell directory stops once
+            # there are known to be 300 met files plus lta_ave.txt and AVEMET.DAT
+            # ========================================================================================
             last_time = time()
             nwrote = 0
-            for drctry, subdirs, files in walk(clim_dir):
-                nfiles = len(files)
-                nsubdirs = len(subdirs)
-                if nsubdirs > 0:  # first directory has four scenarios e.g.  Y:\GlblEcssOutputsSv\EcosseSims\AfUKESM1-0-LL_126
+            lta_cells = []
+            cell_table = scan_cells(clim_dir, NEXPCTD_MET_FILES, inspect_archives=True)
+            for gran_coord, drctry, archive_flag, nfiles, lta_flag, avemet_flag in cell_table.rows():
+                last_time = update_avemet_progress(last_time, wthr_rsrce, scnr, region, nwrote)
+                if nfiles >= NEXPCTD_MET_FILES or nfiles < 0:
                     continue
 
-                # there should be 300 met files plus lta_ave.txt and AVEMET.DAT
-                # =============================================================
-                last_time = update_avemet_progress(last_time, wthr_rsrce, scnr, region, nwrote)
-                if nfiles >= NEXPCTD_MET_FILES:
+                if archive_flag and avemet_flag:
                     continue
 
                 # if lta_ave.txt is not present then something is wrong
                 # =====================================================
-                if LTA_RECS_FN in files:
-                    lta_ave_fn = join(drctry, LTA_RECS_FN)
-                    with open(lta_ave_fn, 'r') as flta_ave:
+                if not lta_flag:
+                    if archive_flag:
+                        print(WARN_STR + LTA_RECS_FN + ' file should be present in ' + archive_path(drctry))
+                    else:
+                        print(WARN_STR + LTA_RECS_FN + ' file should be present in ' + drctry)
+                    continue
 
+                if archive_flag:
+                    with WthrCellArchive(archive_path(drctry)) as wthr_arc:
+                        lta_recs = wthr_arc.read_lines(LTA_RECS_FN)
+                else:
+                    with open(join(drctry, LTA_RECS_FN), 'r') as flta_ave:
                         lta_recs = flta_ave.readlines()
-                        vals = [float(rec.split('#')[0]) for rec in lta_recs]
-                        lta_precip, lta_tmean = vals[:12], vals[12:]
 
-                        gran_coord = split(drctry)[1]
-                        gran_lat = int(gran_coord.split('_')[0])
-                        cell_lat = 90.0 - gran_lat / GRANULARITY
-                        lta_pet = thornthwaite(lta_tmean, cell_lat)
-
-                        make_avemet_file(drctry, lta_precip, lta_pet, lta_tmean)
-                        nwrote += 1
-                else:
-                    print(WARN_STR + LTA_RECS_FN + ' file should be present in ' + drctry)
+                vals = [float(rec.split('#')[0]) for rec in lta_recs]
+                gran_lat = int(gran_coord.split('_')[0])
+                cell_lat = 90.0 - gran_lat / GRANULARITY
+                lta_cells.append((drctry, cell_lat, vals[:12], vals[12:]))
+
+            # estimate PET for all cells of the region in one pass
+            # ====================================================
+            if len(lta_cells) > 0:
+                lta_tmeans = [[lta_cell[3]] for lta_cell in lta_cells]
+                lta_pets = thornthwaite_batch(lta_tmeans, [lta_cell[1] for lta_cell in lta_cells])[0]
+                for (drctry, cell_lat, lta_precip, lta_tmean), lta_pet in zip(lta_cells, lta_pets[:, 0]):
+                    make_avemet_file(drctry, lta_precip, lta_pet.tolist(), lta_tmean, not isdir(drctry))
+                    nwrote += 1
+                    last_time = update_avemet_progress(last_time, wthr_rsrce, scnr, region, nwrote)
 
             if nwrote >= max_cells:
                 print('\nFinished checking having written {} AVEMET.DAT files'.format(nwrote))
@@ -453,6 +748,23 @@ class MakeSiteObj(object,):
 
         self.wthr_prj_dir = climgen.wthr_out_dir
         self.months = climgen.months
+        self.met_writer = None      # optional background writer queue
+        self.journal = None         # journal of completed cells and bands
+        self.hist_store = None      # optional store of canonical historic met files
+
+        # long term average and average weather files are written from the weather held in memory
+        # ==========================================================================================
+        self.ave_periods = None
+        if form.settings.get('write_wthr_averages', True):
+            self.ave_periods = list([(climgen.hist_start_year, climgen.hist_end_year),
+                                                                    (climgen.sim_start_year, climgen.sim_end_year)])
+
+        wthr_out_format = form.settings.get('wthr_out_format', 'dirs')
+        if wthr_out_format not in OUT_FORMATS:
+            print(WARN_STR + 'weather output format ' + str(wthr_out_format) + ' not recognised - using dirs')
+            wthr_out_format = 'dirs'
+        self.wthr_out_format = wthr_out_format     # directory of files or single archive per cell
+        self.shard_size = climgen.shard_size
 
 # ==========================
 def create_wthr_averages(lggr, climgen, lat_inp, gran_coord, period, text_flag):
@@ -544,7 +856,7 @@ def create_wthr_averages(lggr, climgen, lat_inp, gran_coord, period, text_flag):
 
     # pet
     if max(ave_tmean) > 0.0:
-        pet = thornthwaite(ave_tmean, lat_inp, year)
+        pet = thornthwaite_batch([[ave_tmean]], [lat_inp], [year])[0][0, 0].tolist()
     else:
         pet = [0.0]*12
         mess = WARN_STR + 'monthly average temperatures are below zero in ' + full_func_name
@@ -0,0 +1,83 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        wthr_grid_align.py
+# Purpose:     alignment of the grids of two weather datasets e.g. CRU historic and an ISIMIP GCM - grids are
+#              rectilinear so alignment is separable into a latitude map and a longitude map, built once per pair
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+__prog__ = 'wthr_grid_align.py'
+__version__ = '0.0.1'
+__author__ = 's03mm5'
+
+from numpy import asarray, around, int64, argsort, searchsorted, where, arange, full, zeros
+
+GRANULARITY = 120
+
+_alignments = {}    # alignments already built keyed by the precipitation files of each dataset
+
+def fetch_grid_alignment(wthr_set_from, wthr_set_to):
+    """
+    return alignment between two weather_sets definitions, building it on first use
+    """
+    key = (wthr_set_from['ds_precip'], wthr_set_to['ds_precip'])
+    if key not in _alignments:
+        _alignments[key] = GridAlignment(wthr_set_from['latitudes'], wthr_set_from['longitudes'],
+                                                            wthr_set_to['latitudes'], wthr_set_to['longitudes'])
+    return _alignments[key]
+
+def _axis_map(vals_from, vals_to):
+    """
+    for each coordinate of one axis return the index of the same coordinate, at granular resolution, on the other
+    axis or -1 if there is none - axes may be in ascending or descending order
+    """
+    gran_from = around(asarray(vals_from, dtype=float)*GRANULARITY).astype(int64)
+    gran_to = around(asarray(vals_to, dtype=float)*GRANULARITY).astype(int64)
+    if len(gran_to) == 0:
+        return full(len(gran_from), -1, dtype=int64)
+
+    order = argsort(gran_to, kind='stable')
+    posns = searchsorted(gran_to[order], gran_from).clip(0, len(gran_to) - 1)
+
+    return where(gran_to[order][posns] == gran_from, order[posns], -1).astype(int64)
+
+class GridAlignment(object,):
+    """
+    lat_map and lon_map give, for each latitude and longitude of the first grid, the index on the second grid
+    """
+    def __init__(self, lats_from, lons_from, lats_to, lons_to):
+
+        self.lat_map = _axis_map(lats_from, lats_to)
+        self.lon_map = _axis_map(lons_from, lons_to)
+
+    def cell_map(self, wthr_from, wthr_to):
+        """
+        return, for each cell of wthr_from, the index of the same cell in wthr_to or -1 if it is not present
+        or is invalid - both are GriddedWeather objects read as hyperslabs of the aligned grids
+        """
+        if wthr_from.grid_origin is None or wthr_to.grid_origin is None:
+            return wthr_to.cell_indices(wthr_from.cell_keys(valid_only=False))    # not a hyperslab
+
+        lat_orgn_from, lon_orgn_from = wthr_from.grid_origin
+        nlons_from = wthr_from.grid_shape[1]
+        lat_orgn_to, lon_orgn_to = wthr_to.grid_origin
+        nlats_to, nlons_to = wthr_to.grid_shape
+
+        # cells are ordered by latitude then longitude - map each axis then recombine
+        # ============================================================================
+        icells = arange(wthr_from.ncells)
+        ilats_to = self.lat_map[lat_orgn_from + icells//nlons_from] - lat_orgn_to
+        ilons_to = self.lon_map[lon_orgn_from + icells % nlons_from] - lon_orgn_to
+        inside = (ilats_to >= 0) & (ilats_to < nlats_to) & (ilons_to >= 0) & (ilons_to < nlons_to)
+        icells_to = where(inside, ilats_to*nlons_to + ilons_to, -1)
+
+        # exclude cells removed by truncation or which are invalid
+        # ========================================================
+        found = (icells_to >= 0) & (icells_to < wthr_to.ncells)
+        valid_to = zeros(len(icells_to), dtype=bool)
+        valid_to[found] = wthr_to.valid[icells_to[found]]
+
+        return where(valid_to, icells_to, -1)
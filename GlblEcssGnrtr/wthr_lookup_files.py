@@ -0,0 +1,50 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        wthr_lookup_files.py
+# Purpose:     names of the coordinates lookup files of a scenario weather directory and helpers to stamp them
+#              - this module has no dependencies on other modules of the project so may be imported by any
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+__prog__ = 'wthr_lookup_files.py'
+__version__ = '0.0.1'
+__author__ = 's03mm5'
+
+from os.path import isfile, getsize, getmtime
+
+COORDS_BIN_FN = 'coords_lookup.bin'
+COORDS_TSV_FN = 'coords_lookup.csv'
+COORDS_SYNC_FN = 'coords_lookup.sync'   # stamp of the tab separated file last merged into, or exported from, the binary
+
+def file_stamp(fname):
+    """
+    size and modification time identify the version of a file, both are zero if the file is absent
+    """
+    if isfile(fname):
+        return getsize(fname), getmtime(fname)
+    else:
+        return 0, 0.0
+
+def read_stamp(stamp_fn):
+    """
+    return stamp recorded by write_stamp or None if there is no readable stamp
+    """
+    try:
+        with open(stamp_fn, 'r') as fobj:
+            size, mtime = fobj.read().split()
+        return int(size), float(mtime)
+    except (OSError, ValueError):
+        return None
+
+def write_stamp(stamp_fn, stamp):
+    """
+    C
+    """
+    size, mtime = stamp
+    with open(stamp_fn, 'w') as fobj:
+        fobj.write('{} {}\n'.format(size, repr(mtime)))
+
+    return
@@ -0,0 +1,227 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        wthr_nc_extract.py
+# Purpose:     single extraction engine for monthly weather held in NetCDF files
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+__prog__ = 'wthr_nc_extract.py'
+__version__ = '0.0.1'
+__author__ = 's03mm5'
+
+from os.path import isfile, getmtime
+from calendar import monthrange
+from netCDF4 import Dataset
+from numpy import array, around, ma
+
+from gridded_weather import GriddedWeather
+
+NUMSECSDAY = 3600*24
+MAX_CELLS = 9999999
+
+TS_COPY_SUFFIX = '_ts'     # copy of dataset file chunked for time series access
+
+ERROR_STR = '*** Error *** '
+
+# for each kind of dataset: axis order, masking rule and, for each metric, a conversion comprising
+#       NetCDF variable name, scale, offset, whether to multiply by days in month and number of decimals
+# ======================================================================================================
+WTHR_DSET_KINDS = {
+    'isimip':       {'axes': 'tyx', 'any_time_mask': False,
+                     'precipitation': ('pr', NUMSECSDAY, 0.0, False, 2),
+                     'temperature': ('tas', 1.0, -273.15, False, 2)},
+    'ewembi':       {'axes': 'tyx', 'any_time_mask': False,
+                     'precipitation': ('pr', NUMSECSDAY, 0.0, True, 1),
+                     'temperature': ('tas', 1.0, -273.15, False, 1)},
+    'eobs':         {'axes': 'tyx', 'any_time_mask': True,
+                     'precipitation': ('rr', 1.0, 0.0, False, None),
+                     'temperature': ('tg', 1.0, 0.0, False, None)},
+    'ncar_ccsm4':   {'axes': 'tyx', 'any_time_mask': False,
+                     'precipitation': ('pr', NUMSECSDAY, 0.0, True, 1),
+                     'temperature': ('tas', 1.0, -273.15, False, 1)},
+    'harmonie':     {'axes': 'tyx', 'any_time_mask': False,
+                     'precipitation': ('Precipalign', 1.0, 0.0, False, 2),
+                     'temperature': ('Tairalign', 1.0, -273.15, False, 1)},
+    'cru_future':   {'axes': 'yxt', 'any_time_mask': False,
+                     'precipitation': ('precipitation', 1.0, 0.0, False, 1),
+                     'temperature': ('temperature', 1.0, 0.0, False, 1)},
+    'cru_historic': {'axes': 'tyx', 'any_time_mask': False,
+                     'precipitation': ('pre', 1.0, 0.0, False, 1),
+                     'temperature': ('tmp', 1.0, 0.0, False, 1)}
+}
+METRIC_FNAME_KEYS = {'precipitation': 'ds_precip', 'temperature': 'ds_tas'}
+METRIC_VARNAME_KEYS = {'precipitation': 'precip', 'temperature': 'tas'}
+
+def ts_copy_fname(fname):
+    """
+    name of copy of a dataset file which is chunked for time series access, held alongside the original
+    """
+    root, ext = fname.rsplit('.', 1)
+
+    return root + TS_COPY_SUFFIX + '.' + ext
+
+def _preferred_fname(fname):
+    """
+    use time series copy if it exists and is not older than the original
+    """
+    ts_fname = ts_copy_fname(fname)
+    if isfile(ts_fname) and getmtime(ts_fname) >= getmtime(fname):
+        return ts_fname
+
+    return fname
+
+class WthrDsetDescr(object,):
+    """
+    describes where monthly weather for a dataset is held and how it is to be converted
+    built from a weather_sets definition and the kind of dataset
+    a copy of a dataset file chunked for time series access is used in preference to the original
+    """
+    def __init__(self, wthr_set_defn, dset_kind, year_start=None):
+
+        kind_defn = WTHR_DSET_KINDS[dset_kind]
+
+        self.dset_kind = dset_kind
+        self.time_last = kind_defn['axes'] == 'yxt'
+        self.any_time_mask = kind_defn['any_time_mask']
+        self.latitudes = wthr_set_defn['latitudes']
+        self.longitudes = wthr_set_defn['longitudes']
+        self.year_end = wthr_set_defn['year_end']
+        if year_start is None:
+            self.year_start = wthr_set_defn['year_start']
+        else:
+            self.year_start = year_start
+
+        # variable names given in the weather set definition take precedence
+        # ===================================================================
+        self.fnames = {}
+        self.cnvrsns = {}
+        for metric in METRIC_FNAME_KEYS:
+            varname, scale, offset, days_flag, ndecimals = kind_defn[metric]
+            varname = wthr_set_defn.get(METRIC_VARNAME_KEYS[metric], varname)
+            self.fnames[metric] = _preferred_fname(wthr_set_defn[METRIC_FNAME_KEYS[metric]])
+            self.cnvrsns[metric] = (varname, scale, offset, days_flag, ndecimals)
+
+    def metrics(self):
+        return list(self.cnvrsns.keys())
+
+    def varname(self, metric):
+        return self.cnvrsns[metric][0]
+
+def fetch_days_per_month(year_start, nmnths):
+    """
+    return array of number of days in each month starting at January of year_start
+    """
+    days_per_month = []
+    for imnth in range(nmnths):
+        year = year_start + imnth//12
+        days_per_month.append(monthrange(year, imnth % 12 + 1)[1])
+
+    return array(days_per_month, dtype=float)
+
+def read_nc_slice(fname, varname, aoi_indices, time_last=False, any_time_mask=False, mnth_window=None):
+    """
+    read hyperslab and return values as float64 ordered [time, lat, lon] together with the cell mask
+    by default a cell is deemed masked if its first time value is masked
+    mnth_window is a pair of month indices, the second of which may be None, limiting the time values read
+    """
+    lat_indx_min, lat_indx_max, lon_indx_min, lon_indx_max = aoi_indices
+    lat_slice = slice(lat_indx_min, lat_indx_max + 1)
+    lon_slice = slice(lon_indx_min, lon_indx_max + 1)
+    if mnth_window is None:
+        time_slice = slice(None)
+    else:
+        time_slice = slice(mnth_window[0], mnth_window[1])
+
+    nc_dset = Dataset(fname, mode='r')
+    try:
+        if time_last:
+            vals = nc_dset.variables[varname][lat_slice, lon_slice, time_slice]
+        else:
+            vals = nc_dset.variables[varname][time_slice, lat_slice, lon_slice]
+    finally:
+        nc_dset.close()
+
+    if time_last:
+        vals = vals.transpose(2, 0, 1)
+
+    mask = ma.getmaskarray(vals)
+    if any_time_mask:
+        cell_mask = mask.any(axis=0)
+    else:
+        cell_mask = mask[0]
+
+    return ma.getdata(vals).astype('float64'), cell_mask
+
+def window_year_start(year_start, mnth_window):
+    """
+    return year of the first month read - a window must start in January since converted values and
+    GriddedWeather objects are indexed from January of their start year
+    """
+    if mnth_window is None:
+        return year_start
+
+    if mnth_window[0] % 12 != 0:
+        raise ValueError('month window {} does not start in January'.format(mnth_window))
+
+    return year_start + mnth_window[0]//12
+
+def _convert_slice(vals, cnvrsn, year_start):
+    """
+    apply scale, days in month, offset and rounding to whole slice ordered [time, lat, lon]
+    """
+    varname, scale, offset, days_flag, ndecimals = cnvrsn
+
+    if days_flag:
+        nmnths = vals.shape[0]
+        vals = vals*fetch_days_per_month(year_start, nmnths).reshape(nmnths, 1, 1)
+    if scale != 1.0:
+        vals = vals*scale
+    if offset != 0.0:
+        vals = vals + offset
+    if ndecimals is not None:
+        vals = around(vals, ndecimals)
+
+    return vals
+
+def fetch_converted_slice(descr, metric, aoi_indices, mnth_window=None):
+    """
+    read and convert hyperslab for one metric, returns values ordered [time, lat, lon] and the cell mask
+    """
+    year_start = window_year_start(descr.year_start, mnth_window)
+
+    vals, cell_mask = read_nc_slice(descr.fnames[metric], descr.varname(metric), aoi_indices,
+                                                        descr.time_last, descr.any_time_mask, mnth_window)
+
+    return _convert_slice(vals, descr.cnvrsns[metric], year_start), cell_mask
+
+def fetch_gridded_weather(descr, aoi_indices, max_cells=MAX_CELLS, mnth_window=None, tile_cache=None):
+    """
+    extract and convert all metrics of the dataset for the AOI and return a GriddedWeather object
+    metrics are read one after the other - the netCDF4 library, and the HDF5 library beneath it, are not thread
+    safe so reads cannot be overlapped by threads
+    """
+    lat_indx_min, lat_indx_max, lon_indx_min, lon_indx_max = aoi_indices
+    lats = descr.latitudes[lat_indx_min:lat_indx_max + 1]
+    lons = descr.longitudes[lon_indx_min:lon_indx_max + 1]
+
+    year_start = window_year_start(descr.year_start, mnth_window)
+
+    if tile_cache is None:
+        fetch_func = fetch_converted_slice
+    else:
+        fetch_func = tile_cache.fetch_converted_slice
+
+    wthr = None
+    for metric in descr.metrics():
+        vals, cell_mask = fetch_func(descr, metric, aoi_indices, mnth_window)
+        if wthr is None:
+            wthr = GriddedWeather.from_grid(lats, lons, vals.shape[0], year_start,
+                                                                    grid_origin=(lat_indx_min, lon_indx_min))
+        wthr.add_slice(metric, vals, cell_mask)
+
+    wthr.truncate(max_cells)
+
+    return wthr
@@ -0,0 +1,232 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        wthr_parallel_fns.py
+# Purpose:     write met files for many cells using a pool of processes which share the weather arrays
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+__prog__ = 'wthr_parallel_fns.py'
+__version__ = '0.0.1'
+__author__ = 's03mm5'
+
+from os.path import join, normpath, isdir
+from os import makedirs
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory, resource_tracker
+from numpy import ndarray, array, int64
+from PyQt5.QtWidgets import QApplication
+
+from gridded_weather import GriddedWeather, WthrTimeline
+from prepare_ecosse_files_ss import make_met_files
+from glbl_ecsse_low_level_fns_sv import update_wthr_progress
+from dir_shard_fns import cell_rel_dir
+from hist_met_store import HistMetStore
+from grid_cell_keys import key_to_gran_coord
+
+CELLS_PER_TASK = 64
+
+ERROR_STR = '*** Error *** '
+WARN_STR = '*** Warning *** '
+
+# in each worker: shared memory blocks of the band currently being processed, the timeline built from them and
+# the keys of the cells to be written - tasks identify their cells by a range of positions in these keys
+# =============================================================================================================
+_worker_band = {'key': None, 'shms': [], 'timeline': None, 'cell_keys': None, 'hist_store': None}
+
+def open_met_pool(form):
+    """
+    return process pool if more than one met file worker is requested in the run settings, otherwise None
+    """
+    num_workers = form.settings.get('num_met_workers', 0)
+    if num_workers is None or num_workers <= 1:
+        return None
+
+    print('Met files will be written using {} worker processes'.format(num_workers))
+    QApplication.processEvents()
+
+    return ProcessPoolExecutor(max_workers=num_workers)
+
+def _share_array(vals, shms):
+    """
+    copy array to a new shared memory block and return its description
+    """
+    shm = shared_memory.SharedMemory(create=True, size=max(1, vals.nbytes))
+    shared_vals = ndarray(vals.shape, dtype=vals.dtype, buffer=shm.buf)
+    shared_vals[...] = vals
+    shms.append(shm)
+
+    return shm.name, vals.shape, vals.dtype.str
+
+def _attach_array(shm_descr, shms):
+    """
+    C
+    """
+    shm_name, shape, dtype = shm_descr
+    try:
+        shm = shared_memory.SharedMemory(name=shm_name, track=False)    # block is owned by the main process
+    except TypeError:
+        shm = _attach_untracked(shm_name)
+    shms.append(shm)
+
+    return ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+def _attach_untracked(shm_name):
+    """
+    Python 3.8 to 3.12 have no track parameter and, on POSIX, attaching registers the block with the resource
+    tracker as though it had been created here; workers share the tracker of the main process so unregistering
+    after attaching would also drop the registration of the main process, whose unlink then fails in the
+    tracker - instead registration is suppressed while attaching
+    """
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        shm = shared_memory.SharedMemory(name=shm_name)
+    finally:
+        resource_tracker.register = register
+
+    return shm
+
+def _share_wthr(wthr, shms):
+    """
+    description of a GriddedWeather object with its arrays, including those of each cell, placed in shared memory
+    """
+    data = {metric: _share_array(wthr.data[metric], shms) for metric in wthr.data}
+
+    return {'lats': _share_array(wthr.lats, shms), 'lons': _share_array(wthr.lons, shms),
+            'valid': _share_array(wthr.valid, shms), 'year_start': wthr.year_start, 'data': data}
+
+def _attach_wthr(wthr_descr, shms):
+    """
+    C
+    """
+    wthr = GriddedWeather(_attach_array(wthr_descr['lats'], shms), _attach_array(wthr_descr['lons'], shms), 0,
+                                                                                    wthr_descr['year_start'], [])
+    wthr.valid = _attach_array(wthr_descr['valid'], shms)
+    for metric, shm_descr in wthr_descr['data'].items():
+        wthr.data[metric] = _attach_array(shm_descr, shms)
+
+    return wthr
+
+def _worker_timeline(band_descr):
+    """
+    attach to shared memory of the band, detaching from that of any previous band
+    """
+    if _worker_band['key'] != band_descr['key']:
+        _worker_band['timeline'] = None     # release views of the previous band before detaching
+        _worker_band['cell_keys'] = None
+        for shm in _worker_band['shms']:
+            shm.close()
+        shms = []
+        wthr_hist = _attach_wthr(band_descr['hist'], shms)
+        wthr_fut = _attach_wthr(band_descr['fut'], shms)
+        _worker_band['timeline'] = WthrTimeline(wthr_hist, wthr_fut, band_descr['indx_hist_end'],
+                    _attach_array(band_descr['indices_hist'], shms), _attach_array(band_descr['indices_fut'], shms))
+        _worker_band['cell_keys'] = _attach_array(band_descr['cell_keys'], shms)
+        _worker_band['shms'] = shms
+        _worker_band['key'] = band_descr['key']
+
+    return _worker_band['timeline']
+
+def _worker_hist_store(store_dir):
+    """
+    each worker keeps its own store of historic met files so that verified canonical copies are remembered
+    """
+    if store_dir is None:
+        return None
+
+    if _worker_band['hist_store'] is None or _worker_band['hist_store'].store_dir != store_dir:
+        _worker_band['hist_store'] = HistMetStore(store_dir)
+
+    return _worker_band['hist_store']
+
+def _make_cells_met_files(band_descr, wthr_prj_dir, start, end, out_format='dirs', shard_size=0, store_dir=None,
+                                                                                                ave_periods=None):
+    """
+    worker task: write met files for cells start to end of the shared cell keys
+    returns number of cells written and the keys, with reasons, of cells which failed
+    """
+    wthr_all = _worker_timeline(band_descr)
+    hist_store = _worker_hist_store(store_dir)
+
+    nwrttn = 0
+    failures = []
+    for cell_key in _worker_band['cell_keys'][start:end].tolist():
+        try:
+            lat, lon = wthr_all.lat_lon(cell_key)
+            clim_dir = normpath(join(wthr_prj_dir, cell_rel_dir(key_to_gran_coord(cell_key), shard_size)))
+            if out_format != 'archive' and not isdir(clim_dir):
+                makedirs(clim_dir, exist_ok=True)
+
+            make_met_files(clim_dir, lat, None, wthr_all, cell_key, out_format=out_format, hist_store=hist_store,
+                                                                                            ave_periods=ave_periods)
+            nwrttn += 1
+        except Exception as err:
+            failures.append((cell_key, str(err)))    # one bad cell must not lose the rest of the task
+
+    return nwrttn, failures
+
+def make_wthr_files_parallel(met_pool, site, wthr_all, num_band, max_cells, nwrttn, last_time):
+    """
+    write met files for each cell of the joined weather, a WthrTimeline, using the process pool
+    weather arrays, including those of each cell, are placed in shared memory so that each worker attaches to,
+    rather than receives, them - a task carries only a range of positions in the shared cell keys
+    returns updated number of cells written and progress time
+    """
+    cell_keys = wthr_all.cell_keys().tolist()
+    if site.journal is not None:
+        cell_keys = [cell_key for cell_key in cell_keys if not site.journal.cell_complete(cell_key)]
+    cell_keys = cell_keys[:max(0, max_cells - nwrttn)]
+    if len(cell_keys) == 0:
+        return nwrttn, last_time
+
+    store_dir = None if site.hist_store is None else site.hist_store.store_dir
+    shms = []
+    try:
+        band_descr = {'hist': _share_wthr(wthr_all.wthr_hist, shms), 'fut': _share_wthr(wthr_all.wthr_fut, shms),
+                      'indx_hist_end': wthr_all.indx_hist_end,
+                      'indices_hist': _share_array(wthr_all.indices_hist, shms),
+                      'indices_fut': _share_array(wthr_all.indices_fut, shms),
+                      'cell_keys': _share_array(array(cell_keys, dtype=int64), shms)}
+        band_descr['key'] = ','.join([shm.name for shm in shms])
+
+        futures = {}
+        for start in range(0, len(cell_keys), CELLS_PER_TASK):
+            end = min(start + CELLS_PER_TASK, len(cell_keys))
+            future = met_pool.submit(_make_cells_met_files, band_descr, site.wthr_prj_dir, start, end,
+                                            site.wthr_out_format, site.shard_size, store_dir, site.ave_periods)
+            futures[future] = cell_keys[start:end]
+
+        for future in as_completed(futures):
+            task_keys = futures[future]
+            try:
+                nwrttn_task, failures = future.result()
+            except Exception as err:
+                nwrttn_task, failures = 0, [(cell_key, str(err)) for cell_key in task_keys]
+
+            nwrttn += nwrttn_task
+            if len(failures) > 0:
+                cell_key, mess = failures[0]
+                print(ERROR_STR + 'could not write met files for {} cells of band {}, first {} - {}'
+                                            .format(len(failures), num_band, key_to_gran_coord(cell_key), mess))
+                QApplication.processEvents()
+
+            if site.journal is not None:
+                failed_keys = set([cell_key for cell_key, mess in failures])
+                for cell_key in task_keys:
+                    if cell_key not in failed_keys:
+                        site.journal.add_cell(cell_key)
+                site.journal.add_failure(len(failed_keys))
+            last_time = update_wthr_progress(last_time, nwrttn)
+    finally:
+        for shm in shms:
+            shm.close()
+            shm.unlink()
+
+    if nwrttn >= max_cells:
+        print('\nFinished checking after {} cells completed'.format(nwrttn))
+        QApplication.processEvents()
+
+    return nwrttn, last_time
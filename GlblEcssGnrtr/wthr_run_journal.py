@@ -0,0 +1,193 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        wthr_run_journal.py
+# Purpose:     journal of completed weather cells and latitude bands so that an interrupted run can be resumed
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+__prog__ = 'wthr_run_journal.py'
+__version__ = '0.0.1'
+__author__ = 's03mm5'
+
+from os.path import join, isfile, isdir
+from os import fsync, makedirs
+from PyQt5.QtWidgets import QApplication
+
+from wthr_cell_archive import find_cell_rel_dir
+from wthr_coords_lookup import CoordsLookupWriter
+from grid_cell_keys import key_to_gran_coord, gran_coord_to_key
+
+JOURNAL_FN = 'wthr_journal.txt'
+
+# each journal line comprises a record type and a value:
+#   R - run key identifying the weather sets and AOI, always the first line
+#   C - granular coordinate of a completed cell e.g. 04320_22080, held in memory as a packed key
+#   B - number of a completed latitude band, all cells of the band being complete
+# =============================================================================
+REC_RUN = 'R'
+REC_CELL = 'C'
+REC_BAND = 'B'
+
+WARN_STR = '*** Warning *** '
+
+def open_run_journal(form, site_obj, run_key):
+    """
+    return journal for the weather output directory, resuming the previous run if requested
+    """
+    resume_flag = form.w_resume.isChecked()
+    journal = WthrRunJournal(site_obj.wthr_prj_dir, run_key, resume_flag, site_obj.shard_size)
+    journal.coords_writer = CoordsLookupWriter(site_obj.wthr_prj_dir)
+    if journal.resumed:
+        mess = 'Resuming weather generation - journal has {} completed cells'.format(len(journal.completed))
+        if len(journal.completed_bands) > 0:
+            mess += ' and {} completed bands'.format(len(journal.completed_bands))
+        print(mess)
+        QApplication.processEvents()
+
+    return journal
+
+class WthrRunJournal(object,):
+    """
+    append only text file - cells are journaled once their met files are on disk and bands once all their cells
+    are journaled; an incomplete last line, left by a crash, is ignored on reading
+    journaled cells are also appended to the coordinates lookup when a lookup writer is attached
+    """
+    def __init__(self, wthr_out_dir, run_key, resume_flag=False, shard_size=0):
+
+        self.wthr_out_dir = wthr_out_dir
+        self.journal_fn = join(wthr_out_dir, JOURNAL_FN)
+        self.run_key = run_key
+        self.shard_size = shard_size
+        self.completed = set()
+        self.completed_bands = set()    # a band with failed cells is not journaled though later bands may be
+        self.pending = []           # cells handed to a writer queue but not yet known to be on disk
+        self.nfailed = 0            # cells of the current band which could not be written
+        self.nskipped = 0
+        self.coords_writer = None
+
+        self.resumed = False
+        if resume_flag and isfile(self.journal_fn):
+            self.resumed = self._read()
+
+        if not isdir(wthr_out_dir):
+            makedirs(wthr_out_dir)
+
+        if self.resumed:
+            self.fobj = open(self.journal_fn, 'a')
+        else:
+            self.fobj = open(self.journal_fn, 'w')
+            self.fobj.write('{} {}\n'.format(REC_RUN, run_key))
+            self.fobj.flush()
+
+    def _read(self):
+        """
+        read existing journal, returns False if it was written by a run with different weather sets or AOI
+        """
+        with open(self.journal_fn, 'r') as fobj:
+            lines = fobj.read().split('\n')
+
+        if len(lines) == 0 or lines[0] != '{} {}'.format(REC_RUN, self.run_key):
+            print(WARN_STR + 'journal ' + self.journal_fn + ' is for a different run - starting afresh')
+            QApplication.processEvents()
+            return False
+
+        for line in lines[1:]:
+            fields = line.split()
+            if len(fields) != 2:
+                continue
+
+            rec_type, val = fields
+            if rec_type == REC_CELL and val.count('_') == 1 and val.replace('_', '').isdigit():
+                self.completed.add(gran_coord_to_key(val))
+            elif rec_type == REC_BAND and val.lstrip('-').isdigit():
+                self.completed_bands.add(int(val))
+
+        return True
+
+    def band_complete(self, num_band):
+        """
+        only bands which were themselves journaled are complete - an earlier band may have had failed cells
+        """
+        return num_band in self.completed_bands
+
+    def cell_complete(self, cell_key):
+        """
+        a journaled cell is accepted if its directory or archive is still present, in either layout
+        """
+        if cell_key not in self.completed:
+            return False
+
+        if find_cell_rel_dir(self.wthr_out_dir, key_to_gran_coord(cell_key), self.shard_size) is not None:
+            self.nskipped += 1
+            return True
+
+        return False
+
+    def add_cell(self, cell_key, clim_dir=None, pending_flag=False):
+        """
+        journal a completed cell - if pending_flag is set then the cell, whose files are being written to clim_dir
+        by the writer queue, is journaled on the next commit
+        """
+        if pending_flag:
+            self.pending.append((cell_key, clim_dir))
+        else:
+            self._write_cell(cell_key)
+
+        return
+
+    def _write_cell(self, cell_key):
+        """
+        C
+        """
+        self.fobj.write('{} {}\n'.format(REC_CELL, key_to_gran_coord(cell_key)))
+        self.completed.add(cell_key)
+        if self.coords_writer is not None:
+            self.coords_writer.add(cell_key)
+
+        return
+
+    def add_failure(self, ncells=1):
+        """
+        record cells which could not be written so that their band is not journaled as complete
+        """
+        self.nfailed += ncells
+
+        return
+
+    def commit(self, num_band=None, writer=None):
+        """
+        journal pending cells, once the writer queue has written them, and optionally a completed band
+        then force the journal to disk
+        """
+        if writer is not None:
+            failed_dirs = writer.flush()
+        else:
+            failed_dirs = set()
+
+        for cell_key, clim_dir in self.pending:
+            if clim_dir not in failed_dirs:
+                self._write_cell(cell_key)
+        self.pending = []
+
+        if num_band is not None and len(failed_dirs) == 0 and self.nfailed == 0:
+            self.fobj.write('{} {}\n'.format(REC_BAND, num_band))
+            self.completed_bands.add(num_band)
+        self.nfailed = 0
+
+        self.fobj.flush()
+        fsync(self.fobj.fileno())
+        if self.coords_writer is not None:
+            self.coords_writer.flush()
+
+        return
+
+    def close(self):
+        """
+        C
+        """
+        self.fobj.close()
+        if self.coords_writer is not None:
+            self.coords_writer.close()
@@ -0,0 +1,205 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        wthr_tile_cache.py
+# Purpose:     persistent on-disk cache of extracted and converted weather held in fixed size spatial tiles
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+__prog__ = 'wthr_tile_cache.py'
+__version__ = '0.0.1'
+__author__ = 's03mm5'
+
+from os.path import join, isdir, isfile, normpath, abspath, dirname
+from os import makedirs, stat, scandir, remove, replace, utime
+from hashlib import sha1
+from threading import Lock
+from numpy import empty, zeros, float32, savez, load
+
+from wthr_nc_extract import fetch_converted_slice
+
+TILE_SIZE = 32          # number of grid cells along each side of a tile
+TILE_EXT = '.npz'
+EVICT_FRACTION = 0.9    # when cap is exceeded, evict least recently used tiles until below this fraction of the cap
+
+ERROR_STR = '*** Error *** '
+WARNING = '*** Warning *** '
+
+def open_tile_cache(settings):
+    """
+    return tile cache if a cache directory has been specified in the run settings, otherwise None
+    """
+    cache_dir = settings.get('wthr_cache_dir')
+    if cache_dir is None or cache_dir == '':
+        return None
+
+    try:
+        tile_cache = WthrTileCache(cache_dir, settings.get('wthr_cache_max_gb', 10))
+    except OSError as err:
+        print(WARNING + 'could not open weather tile cache ' + cache_dir + ' - ' + str(err))
+        return None
+
+    return tile_cache
+
+class WthrTileCache(object,):
+    """
+    converted values for each tile are stored, together with the cell mask, as an uncompressed numpy archive
+    tiles are keyed by dataset file path, modification time and size, variable, conversion, month window
+    and tile position so that a replaced dataset file invalidates its tiles
+    a size capped least recently used policy is applied, recency being recorded by the file modification time
+    """
+    def __init__(self, cache_dir, max_gb=10):
+
+        cache_dir = normpath(cache_dir)
+        if not isdir(cache_dir):
+            makedirs(cache_dir)
+
+        self.cache_dir = cache_dir
+        self.max_bytes = int(float(max_gb)*1024**3)
+        self.nhits = 0
+        self.nmisses = 0
+        self.lock = Lock()
+        self.cache_bytes = sum(entry.stat().st_size for entry in self._tile_entries())
+
+    def _tile_entries(self):
+        """
+        C
+        """
+        entries = []
+        for sub_dir in scandir(self.cache_dir):
+            if sub_dir.is_dir():
+                entries += [entry for entry in scandir(sub_dir.path) if entry.name.endswith(TILE_EXT)]
+
+        return entries
+
+    def _tile_path(self, descr, metric, mnth_window, tile_lat, tile_lon):
+        """
+        C
+        """
+        fname = descr.fnames[metric]
+        fstat = stat(fname)
+        key_parts = [normpath(abspath(fname)), fstat.st_mtime_ns, fstat.st_size, descr.cnvrsns[metric],
+                     descr.time_last, descr.any_time_mask, descr.year_start, mnth_window, TILE_SIZE, tile_lat, tile_lon]
+        key = sha1('|'.join([str(part) for part in key_parts]).encode()).hexdigest()
+
+        return join(self.cache_dir, key[:2], key + TILE_EXT)
+
+    def _fetch_tile(self, descr, metric, mnth_window, tile_lat, tile_lon):
+        """
+        return converted values ordered [time, lat, lon] and cell mask for a tile, reading NetCDF only if absent
+        """
+        tile_path = self._tile_path(descr, metric, mnth_window, tile_lat, tile_lon)
+        if isfile(tile_path):
+            try:
+                with load(tile_path) as npz:
+                    vals, cell_mask = npz['vals'], npz['mask']
+                utime(tile_path)
+                with self.lock:
+                    self.nhits += 1
+                return vals, cell_mask
+            except (OSError, ValueError, KeyError):
+                pass    # evicted by another thread or incomplete - read again
+
+        lat_indx_min = tile_lat*TILE_SIZE
+        lat_indx_max = min(lat_indx_min + TILE_SIZE, len(descr.latitudes)) - 1
+        lon_indx_min = tile_lon*TILE_SIZE
+        lon_indx_max = min(lon_indx_min + TILE_SIZE, len(descr.longitudes)) - 1
+        tile_indices = (lat_indx_min, lat_indx_max, lon_indx_min, lon_indx_max)
+
+        vals, cell_mask = fetch_converted_slice(descr, metric, tile_indices, mnth_window)
+        vals = vals.astype(float32)
+        self._store_tile(tile_path, vals, cell_mask)
+
+        return vals, cell_mask
+
+    def _store_tile(self, tile_path, vals, cell_mask):
+        """
+        write to temporary file then rename so that partially written tiles are never read
+        """
+        tile_dir = dirname(tile_path)
+        try:
+            if not isdir(tile_dir):
+                makedirs(tile_dir, exist_ok=True)
+            tmp_path = tile_path + '.tmp'
+            with open(tmp_path, 'wb') as fobj:
+                savez(fobj, vals=vals, mask=cell_mask)
+            replace(tmp_path, tile_path)
+            nbytes = stat(tile_path).st_size
+        except OSError as err:
+            print(WARNING + 'could not write weather tile ' + tile_path + ' - ' + str(err))
+            return
+
+        with self.lock:
+            self.nmisses += 1
+            self.cache_bytes += nbytes
+            if self.cache_bytes > self.max_bytes:
+                self._evict()
+
+        return
+
+    def _evict(self):
+        """
+        remove least recently used tiles - caller must hold the lock
+        """
+        entries = sorted(self._tile_entries(), key=lambda entry: entry.stat().st_mtime)
+        self.cache_bytes = sum(entry.stat().st_size for entry in entries)
+        target_bytes = int(self.max_bytes*EVICT_FRACTION)
+        nevicted = 0
+        for entry in entries:
+            if self.cache_bytes <= target_bytes:
+                break
+            try:
+                nbytes = entry.stat().st_size
+                remove(entry.path)
+            except OSError:
+                continue
+            self.cache_bytes -= nbytes
+            nevicted += 1
+
+        print('Evicted {} tiles from weather tile cache, size now {} MB'
+                                                        .format(nevicted, round(self.cache_bytes/1024**2, 1)))
+        return
+
+    def fetch_converted_slice(self, descr, metric, aoi_indices, mnth_window=None):
+        """
+        same signature and result as wthr_nc_extract.fetch_converted_slice but assembled from cached tiles
+        """
+        lat_indx_min, lat_indx_max, lon_indx_min, lon_indx_max = aoi_indices
+        nlats = lat_indx_max - lat_indx_min + 1
+        nlons = lon_indx_max - lon_indx_min + 1
+
+        vals_aoi = None
+        for tile_lat in range(lat_indx_min//TILE_SIZE, lat_indx_max//TILE_SIZE + 1):
+            for tile_lon in range(lon_indx_min//TILE_SIZE, lon_indx_max//TILE_SIZE + 1):
+                vals, cell_mask = self._fetch_tile(descr, metric, mnth_window, tile_lat, tile_lon)
+                if vals_aoi is None:
+                    vals_aoi = empty((vals.shape[0], nlats, nlons), dtype=float32)
+                    mask_aoi = zeros((nlats, nlons), dtype=bool)
+
+                # overlap of tile and AOI in grid indices
+                # ========================================
+                tile_lat_min = tile_lat*TILE_SIZE
+                tile_lon_min = tile_lon*TILE_SIZE
+                ilat_strt = max(lat_indx_min, tile_lat_min)
+                ilat_end = min(lat_indx_max, tile_lat_min + vals.shape[1] - 1) + 1
+                ilon_strt = max(lon_indx_min, tile_lon_min)
+                ilon_end = min(lon_indx_max, tile_lon_min + vals.shape[2] - 1) + 1
+
+                aoi_lats = slice(ilat_strt - lat_indx_min, ilat_end - lat_indx_min)
+                aoi_lons = slice(ilon_strt - lon_indx_min, ilon_end - lon_indx_min)
+                tile_lats = slice(ilat_strt - tile_lat_min, ilat_end - tile_lat_min)
+                tile_lons = slice(ilon_strt - tile_lon_min, ilon_end - tile_lon_min)
+
+                vals_aoi[:, aoi_lats, aoi_lons] = vals[:, tile_lats, tile_lons]
+                mask_aoi[aoi_lats, aoi_lons] = cell_mask[tile_lats, tile_lons]
+
+        return vals_aoi, mask_aoi
+
+    def report(self):
+        """
+        C
+        """
+        return 'Weather tile cache: {} hits {} misses, size {} MB'.format(self.nhits, self.nmisses,
+                                                                        round(self.cache_bytes/1024**2, 1))
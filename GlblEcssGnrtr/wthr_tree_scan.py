@@ -0,0 +1,161 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        wthr_tree_scan.py
+# Purpose:     scan a weather tree, flat or sharded, of cell directories and archives using a pool of threads
+#              and return a compact table of the status of each cell
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+__prog__ = 'wthr_tree_scan.py'
+__version__ = '0.0.1'
+__author__ = 's03mm5'
+
+from os import scandir
+from os.path import join
+from concurrent.futures import ThreadPoolExecutor
+from zipfile import BadZipFile
+
+from wthr_cell_archive import ARCHIVE_EXT, archive_path, WthrCellArchive
+from dir_shard_fns import cell_parent_dirs, is_shard_name
+
+NUM_SCAN_THREADS = 16       # listing is bound by file system latency rather than processing
+LTA_RECS_FN = 'lta_ave.txt'
+AVEMET_FN = 'AVEMET.DAT'
+
+ERROR_STR = '*** Error *** '
+
+class CellStatusTable(object,):
+    """
+    status of each cell held as parallel lists - a cell held both as a directory and as an archive, i.e. one
+    which has been exploded, is represented by its directory
+    nfiles is the number of files counted, counting stops at the limit, or -1 if the cell was not listed
+    """
+    def __init__(self):
+
+        self.gran_coords = []
+        self.cell_dirs = []         # for archives this is the directory the archive would explode to
+        self.archive_flags = []
+        self.nfiles = []
+        self.lta_flags = []
+        self.avemet_flags = []
+
+    def __len__(self):
+        return len(self.gran_coords)
+
+    def append(self, gran_coord, cell_dir, archive_flag, nfiles=-1, lta_flag=False, avemet_flag=False):
+        """
+        C
+        """
+        self.gran_coords.append(gran_coord)
+        self.cell_dirs.append(cell_dir)
+        self.archive_flags.append(archive_flag)
+        self.nfiles.append(nfiles)
+        self.lta_flags.append(lta_flag)
+        self.avemet_flags.append(avemet_flag)
+
+        return
+
+    def rows(self):
+        """
+        C
+        """
+        return zip(self.gran_coords, self.cell_dirs, self.archive_flags, self.nfiles, self.lta_flags,
+                                                                                                self.avemet_flags)
+
+def _scan_cell_dir(cell_dir, count_limit):
+    """
+    count files of a cell directory noting presence of lta_ave.txt and AVEMET.DAT - listing stops once the
+    limit is reached since the cell is then known to be complete
+    """
+    nfiles = 0
+    lta_flag = False
+    avemet_flag = False
+    try:
+        with scandir(cell_dir) as entries:
+            for entry in entries:
+                nfiles += 1
+                if entry.name == LTA_RECS_FN:
+                    lta_flag = True
+                elif entry.name == AVEMET_FN:
+                    avemet_flag = True
+                if nfiles >= count_limit:
+                    break
+    except OSError as err:
+        print(ERROR_STR + 'could not list ' + cell_dir + ' - ' + str(err))
+        return -1, False, False
+
+    return nfiles, lta_flag, avemet_flag
+
+def _scan_cell_archive(cell_dir):
+    """
+    C
+    """
+    try:
+        with WthrCellArchive(archive_path(cell_dir)) as wthr_arc:
+            fnames = wthr_arc.namelist()
+    except (OSError, BadZipFile) as err:
+        print(ERROR_STR + 'could not read ' + archive_path(cell_dir) + ' - ' + str(err))
+        return -1, False, False
+
+    return len(fnames), LTA_RECS_FN in fnames, AVEMET_FN in fnames
+
+def _scan_cell(cell, count_limit, inspect_archives):
+    """
+    cell comprises granular coordinate, cell directory and archive flag
+    """
+    gran_coord, cell_dir, archive_flag = cell
+    if archive_flag:
+        if inspect_archives:
+            return _scan_cell_archive(cell_dir)
+        else:
+            return -1, False, False
+
+    return _scan_cell_dir(cell_dir, count_limit)
+
+def _scan_parent_dir(parent_dir):
+    """
+    return names of cell directories and of cells held as archives directly under a scenario or shard directory
+    """
+    cell_names = []
+    arc_names = []
+    with scandir(parent_dir) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                if not is_shard_name(entry.name):
+                    cell_names.append(entry.name)
+            elif entry.name.endswith(ARCHIVE_EXT):
+                arc_names.append(entry.name[:-len(ARCHIVE_EXT)])
+
+    return cell_names, arc_names
+
+def scan_cells(root_dir, count_limit=None, inspect_archives=False, num_threads=NUM_SCAN_THREADS):
+    """
+    return CellStatusTable for the cells of a weather tree e.g. Wthr/ssp126 or EcosseSims/AfUKESM1-0-LL_126
+    cell directories are only listed, in parallel, if count_limit is given and archives only read if requested
+    """
+    parent_dirs = cell_parent_dirs(root_dir)
+
+    cell_table = CellStatusTable()
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+
+        # shard directories are listed in parallel
+        # ========================================
+        cells = []
+        for parent_dir, (cell_names, arc_names) in zip(parent_dirs, executor.map(_scan_parent_dir, parent_dirs)):
+            dir_names = set(cell_names)
+            cells += [(name, join(parent_dir, name), False) for name in sorted(cell_names)]
+            cells += [(name, join(parent_dir, name), True) for name in sorted(arc_names) if name not in dir_names]
+
+        if count_limit is None:
+            statuses = [(-1, False, False)]*len(cells)
+        else:
+            nlen = len(cells)
+            statuses = executor.map(_scan_cell, cells, [count_limit]*nlen, [inspect_archives]*nlen)
+
+        for (gran_coord, cell_dir, archive_flag), (nfiles, lta_flag, avemet_flag) in zip(cells, statuses):
+            cell_table.append(gran_coord, cell_dir, archive_flag, nfiles, lta_flag, avemet_flag)
+
+    return cell_table
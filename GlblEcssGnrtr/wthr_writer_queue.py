@@ -0,0 +1,189 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        wthr_writer_queue.py
+# Purpose:     bounded queue drained by writer threads so that weather computation and disk output overlap
+# Author:      s03mm5
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+__prog__ = 'wthr_writer_queue.py'
+__version__ = '0.0.1'
+__author__ = 's03mm5'
+
+from os.path import join, isdir
+from os import makedirs
+from queue import Queue
+from threading import Thread, Lock
+from time import time
+
+from wthr_cell_archive import write_cell_archive
+from hist_met_store import write_buffer
+
+MAX_PENDING_CELLS = 64      # compute stage blocks once this many cells are waiting to be written
+
+ERROR_STR = '*** Error *** '
+
+def open_met_writer(form, hist_store=None):
+    """
+    return writer queue if writer threads are requested in the run settings, otherwise None
+    """
+    num_threads = form.settings.get('num_writer_threads', 0)
+    if num_threads is None or num_threads <= 0:
+        return None
+
+    print('Met files will be written by {} background writer threads'.format(num_threads))
+
+    return MetWriterQueue(num_threads, out_format=form.settings.get('wthr_out_format', 'dirs'), hist_store=hist_store)
+
+class MetWriterQueue(object,):
+    """
+    accepts finished sets of files for a cell, each a list of file name and contents pairs, from the compute
+    stage - put blocks when the queue is full thereby applying back-pressure when the disk falls behind
+    files for each cell are written either to a directory or to an archive depending on out_format
+    historic met files are linked to the store of historic met files, if supplied, when put identifies them
+    cells which could not be written because of an OSError are returned by flush; any other exception is a fault
+    so the first is kept and raised by flush or close
+    """
+    def __init__(self, num_threads=2, max_pending=MAX_PENDING_CELLS, out_format='dirs', hist_store=None):
+
+        self.out_format = out_format
+        self.hist_store = hist_store
+        self.queue = Queue(maxsize=max_pending)
+        self.lock = Lock()
+        self.ncells = 0
+        self.nfiles = 0
+        self.nbytes = 0
+        self.wait_time = 0.0        # time compute stage spent blocked on a full queue
+        self.errors = []
+        self.failed_dirs = set()    # cell directories which could not be written since the last flush
+        self.first_error = None     # first exception, other than OSError, raised by a writer thread
+        self.start_time = time()
+
+        self.threads = []
+        for ithread in range(num_threads):
+            thread = Thread(target=self._drain, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def put(self, clim_dir, file_bufs, hist_fnames=None):
+        """
+        queue contents of files for a cell directory, blocking if the queue is full
+        """
+        if self.queue.full():
+            start_time = time()
+            self.queue.put((clim_dir, file_bufs, hist_fnames))
+            self.wait_time += time() - start_time
+        else:
+            self.queue.put((clim_dir, file_bufs, hist_fnames))
+
+        return
+
+    def _drain(self):
+        """
+        writer thread: a None item signals that there is no more work
+        """
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                break
+
+            clim_dir, file_bufs, hist_fnames = item
+            nbytes = 0
+            try:
+                nbytes = self._write_cell(clim_dir, file_bufs, hist_fnames)
+            except OSError as err:
+                with self.lock:
+                    self.errors.append(str(err))
+                    self.failed_dirs.add(clim_dir)
+            except Exception as err:
+                with self.lock:
+                    self.errors.append(str(err))
+                    self.failed_dirs.add(clim_dir)
+                    if self.first_error is None:
+                        self.first_error = err
+            finally:
+                with self.lock:
+                    self.ncells += 1
+                    self.nfiles += len(file_bufs)
+                    self.nbytes += nbytes
+
+                self.queue.task_done()     # must always be called otherwise flush would never return
+
+        return
+
+    def _write_cell(self, clim_dir, file_bufs, hist_fnames):
+        """
+        returns number of bytes written
+        """
+        nbytes = 0
+        if self.out_format == 'archive':
+            write_cell_archive(clim_dir, file_bufs)
+            nbytes = sum([len(buffer) for fname, buffer in file_bufs])
+        elif self.hist_store is not None and hist_fnames is not None:
+            if not isdir(clim_dir):
+                makedirs(clim_dir, exist_ok=True)
+            nbytes = self.hist_store.write_met_files(clim_dir, file_bufs, hist_fnames)
+        else:
+            if not isdir(clim_dir):
+                makedirs(clim_dir, exist_ok=True)
+            for fname, buffer in file_bufs:
+                write_buffer(join(clim_dir, fname), buffer, self.hist_store is not None)
+                nbytes += len(buffer)
+
+        return nbytes
+
+    def _raise_first_error(self):
+        """
+        raise, once, the first fault of the writer threads
+        """
+        with self.lock:
+            first_error = self.first_error
+            self.first_error = None
+        if first_error is not None:
+            raise first_error
+
+        return
+
+    def flush(self):
+        """
+        wait for all queued files to be written, returns cell directories which could not be written since
+        the previous flush
+        """
+        self.queue.join()
+        self._raise_first_error()
+        with self.lock:
+            failed_dirs = self.failed_dirs
+            self.failed_dirs = set()
+
+        return failed_dirs
+
+    def report(self):
+        """
+        C
+        """
+        elapsed = max(time() - self.start_time, 1.0e-6)
+        with self.lock:
+            mess = 'Writer queue depth: {}\tcells written: {}\tfiles: {}\tthroughput: {} MB/s'\
+                        .format(self.queue.qsize(), self.ncells, self.nfiles, round(self.nbytes/elapsed/1.0e6, 2))
+        mess += '\tcompute stage blocked for {} seconds'.format(round(self.wait_time, 1))
+
+        return mess
+
+    def close(self):
+        """
+        wait for all queued files to be written then stop writer threads, returns number of write errors
+        """
+        for thread in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+
+        for err in self.errors[:10]:
+            print(ERROR_STR + 'writing met files - ' + err)
+
+        self._raise_first_error()
+
+        return len(self.errors)